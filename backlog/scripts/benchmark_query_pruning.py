@@ -0,0 +1,52 @@
+import time
+
+from src.core.config import settings
+from src.services.embedding_service import get_embedding_service
+from src.services.index_backend import get_index_backend
+from src.utils.embedding_utils import prune_query_tokens
+
+QUERIES = ["author", "introduction", "conclusion", "table", "figure", "results", "method", "references"]
+SETTINGS = [(0, 0.95), (0, 0.9), (16, 0.95), (8, 0.95)]
+TOP_K = 5
+
+
+def _search(backend, query_embeddings):
+    start = time.perf_counter()
+    results = backend.search_pages(query_embeddings, top_k=TOP_K, rerank_candidates=0)
+    elapsed = time.perf_counter() - start
+    return [(r["doc_id"], r["page_number"]) for r in results], elapsed
+
+
+def benchmark_query_pruning():
+    backend = get_index_backend()
+    embedding_service = get_embedding_service()
+    queries = {query: embedding_service.encode_query(query).squeeze(0) for query in QUERIES}
+
+    baseline = {query: _search(backend, emb) for query, emb in queries.items()}
+    baseline_tokens = sum(emb.shape[0] for emb in queries.values()) / len(queries)
+    baseline_ms = sum(elapsed for _, elapsed in baseline.values()) * 1000 / len(queries)
+    print(f"Backend: {settings.retrieval_backend}, queries: {len(queries)}")
+    print(f"Unpruned: {baseline_tokens:.1f} tokens/query, {baseline_ms:.1f} ms/query")
+
+    for max_tokens, similarity in SETTINGS:
+        tokens = []
+        latencies = []
+        recalls = []
+        for query, query_embeddings in queries.items():
+            pruned = prune_query_tokens(query_embeddings, max_tokens=max_tokens, similarity_threshold=similarity)
+            results, elapsed = _search(backend, pruned)
+            expected = baseline[query][0]
+
+            tokens.append(pruned.shape[0])
+            latencies.append(elapsed)
+            recalls.append(len(set(results) & set(expected)) / max(1, len(expected)))
+
+        print(f"\nmax_tokens={max_tokens or 'none'}, similarity={similarity}")
+        print("-" * 40)
+        print(f"  Tokens: {sum(tokens) / len(tokens):.1f}/query")
+        print(f"  Latency: {sum(latencies) * 1000 / len(latencies):.1f} ms/query")
+        print(f"  Recall@{TOP_K} vs unpruned: {sum(recalls) / len(recalls):.1%}")
+
+
+if __name__ == "__main__":
+    benchmark_query_pruning()
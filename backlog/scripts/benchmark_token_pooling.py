@@ -0,0 +1,66 @@
+import time
+
+import torch
+
+from src.core.config import settings
+from src.services.document_catalog import get_document_catalog
+from src.services.embedding_service import get_embedding_service
+from src.services.index_backend import get_index_backend
+from src.utils.embedding_utils import pool_patch_embeddings
+from src.utils.scoring_utils import maxsim_scores
+
+QUERIES = ["author", "introduction", "conclusion", "table", "figure", "results", "method", "references"]
+POOL_FACTORS = [2, 3, 4]
+TOP_K = 5
+
+
+def _rank(query_embeddings, pages):
+    keys = list(pages)
+    doc_embeddings = torch.cat([pages[key] for key in keys])
+    page_index = torch.cat([torch.full((len(pages[key]),), i, dtype=torch.long) for i, key in enumerate(keys)])
+    scores = maxsim_scores(query_embeddings, doc_embeddings, page_index, len(keys))
+    order = scores.argsort(descending=True).tolist()
+    return [keys[i] for i in order], {keys[i]: scores[i].item() for i in order}
+
+
+def benchmark_token_pooling():
+    backend = get_index_backend()
+    documents = get_document_catalog(settings.documents_dir).list_documents()
+    keys = [(doc.doc_id, page) for doc in documents for page in range(1, doc.page_count + 1)]
+    pages = {key: torch.from_numpy(emb) for key, emb in backend.get_page_embeddings(keys).items()}
+
+    if not pages:
+        print("No stored pages found, ingest some documents first")
+        return
+
+    total_patches = sum(len(emb) for emb in pages.values())
+    print(f"Pages: {len(pages)}, stored patches: {total_patches}")
+
+    embedding_service = get_embedding_service()
+    queries = {query: embedding_service.encode_query(query).squeeze(0).float() for query in QUERIES}
+    baseline = {query: _rank(emb, pages) for query, emb in queries.items()}
+
+    for pool_factor in POOL_FACTORS:
+        start = time.perf_counter()
+        pooled = {key: pool_patch_embeddings(emb, pool_factor) for key, emb in pages.items()}
+        pool_seconds = time.perf_counter() - start
+        pooled_patches = sum(len(emb) for emb in pooled.values())
+
+        overlaps = []
+        score_ratios = []
+        for query, query_embeddings in queries.items():
+            exact_order, exact_scores = baseline[query]
+            pooled_order, pooled_scores = _rank(query_embeddings, pooled)
+            overlaps.append(len(set(exact_order[:TOP_K]) & set(pooled_order[:TOP_K])) / TOP_K)
+            score_ratios.extend(pooled_scores[key] / exact_scores[key] for key in exact_order[:TOP_K])
+
+        print(f"\nPool factor {pool_factor}")
+        print("-" * 40)
+        print(f"  Patches: {pooled_patches} ({pooled_patches / total_patches:.1%} of baseline)")
+        print(f"  Pooling time: {pool_seconds * 1000 / len(pages):.1f} ms/page")
+        print(f"  Top-{TOP_K} overlap with unpooled MaxSim: {sum(overlaps) / len(overlaps):.1%}")
+        print(f"  Mean top-{TOP_K} score ratio: {sum(score_ratios) / len(score_ratios):.3f}")
+
+
+if __name__ == "__main__":
+    benchmark_token_pooling()
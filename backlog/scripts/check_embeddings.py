@@ -40,7 +40,7 @@ def check_embeddings():
         if len(page_nums) < 2:
             continue
 
-        print("\n  Patch 0 (CLS token - should be identical):")
+        print("\n  Patch 0 (prompt token if ingested before image-token masking, otherwise image content):")
         for i in range(min(3, len(page_nums) - 1)):
             p1, p2 = page_nums[i], page_nums[i + 1]
             if 0 in pages[p1] and 0 in pages[p2]:
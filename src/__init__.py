@@ -1,3 +1,11 @@
-from src.app import app
-
 __all__ = ["app"]
+
+
+def __getattr__(name: str):
+    # Imported lazily so that light modules such as src.services.pdf_render_worker can be loaded in
+    # render worker processes without pulling in the application and torch.
+    if name == "app":
+        from src.app import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -17,6 +17,7 @@ from src.services.document_service import (
     handle_document_upload,
     list_documents,
 )
+from src.utils.upload_utils import UploadTooLargeError
 
 router = APIRouter()
 
@@ -40,6 +41,9 @@ async def upload_document(file: UploadFile = File(...)):  # noqa: B008
             pdf_path=str(pdf_path),
         )
 
+    except UploadTooLargeError as exc:
+        logger.warning(f"Upload rejected: {exc}")
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
     except ValueError as exc:
         logger.error(f"Validation error: {exc}")
         raise HTTPException(status_code=400, detail=str(exc)) from exc
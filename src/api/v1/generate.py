@@ -1,18 +1,65 @@
+import asyncio
 import time
+from collections.abc import AsyncIterator
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
 from src.core.config import settings
-from src.models.document import GenerateRequest, GenerateResponse, SourceReference
-from src.services.generation_service import get_generation_service
+from src.core.inference_executor import InferenceQueueFullError, get_inference_executor
+from src.models.document import GenerateRequest, GenerateResponse, GenerateStreamEvent, SourceReference
+from src.services.generation_service import PageImage, get_generation_service
 from src.services.search_service import get_search_service
 from src.utils.document_utils import get_doc_id_to_name_mapping, get_page_image_path
 
 router = APIRouter()
 
 DATA_DIR = Path(settings.documents_dir)
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+async def _retrieve_sources(request: GenerateRequest) -> tuple[list[PageImage], list[SourceReference]]:
+    search_service = get_search_service()
+    search_response = await get_inference_executor().run(
+        search_service.search,
+        query=request.query,
+        top_k=request.top_k,
+        doc_id_filter=request.doc_id,
+    )
+
+    if not search_response.results:
+        raise ValueError("No relevant documents found for the query")
+
+    doc_id_to_name = get_doc_id_to_name_mapping(DATA_DIR, [result.doc_id for result in search_response.results])
+
+    page_images = []
+    sources = []
+    for result in search_response.results:
+        doc_name = doc_id_to_name.get(result.doc_id)
+        if not doc_name:
+            logger.warning(f"Could not find doc_name for doc_id: {result.doc_id}")
+            continue
+
+        image_path = get_page_image_path(DATA_DIR, doc_name, result.page_number)
+        if not image_path.exists():
+            logger.warning(f"Image not found: {image_path}")
+            continue
+
+        page_images.append(PageImage(doc_id=result.doc_id, page_number=result.page_number, path=image_path))
+        sources.append(
+            SourceReference(
+                doc_id=result.doc_id,
+                page_number=result.page_number,
+                score=result.score,
+            )
+        )
+
+    if not page_images:
+        raise ValueError("Could not load any document images")
+
+    return page_images, sources
 
 
 @router.post("/generate", response_model=GenerateResponse)
@@ -20,47 +67,12 @@ async def generate_answer(request: GenerateRequest) -> GenerateResponse:
     try:
         start_time = time.perf_counter()
 
-        search_service = get_search_service()
-        search_response = search_service.search(
-            query=request.query,
-            top_k=request.top_k,
-            doc_id_filter=request.doc_id,
-        )
-
-        if not search_response.results:
-            raise ValueError("No relevant documents found for the query")
-
-        doc_id_to_name = get_doc_id_to_name_mapping(DATA_DIR)
-
-        image_paths = []
-        sources = []
-        for result in search_response.results:
-            doc_name = doc_id_to_name.get(result.doc_id)
-            if not doc_name:
-                logger.warning(f"Could not find doc_name for doc_id: {result.doc_id}")
-                continue
-
-            image_path = get_page_image_path(DATA_DIR, doc_name, result.page_number)
-            if not image_path.exists():
-                logger.warning(f"Image not found: {image_path}")
-                continue
-
-            image_paths.append(image_path)
-            sources.append(
-                SourceReference(
-                    doc_id=result.doc_id,
-                    page_number=result.page_number,
-                    score=result.score,
-                )
-            )
-
-        if not image_paths:
-            raise ValueError("Could not load any document images")
+        page_images, sources = await _retrieve_sources(request)
 
         generation_service = get_generation_service()
         answer = await generation_service.generate_answer(
             query=request.query,
-            images=image_paths,
+            images=page_images,
         )
 
         elapsed_ms = (time.perf_counter() - start_time) * 1000
@@ -76,9 +88,91 @@ async def generate_answer(request: GenerateRequest) -> GenerateResponse:
             generation_time_ms=round(elapsed_ms, 2),
         )
 
+    except InferenceQueueFullError as e:
+        logger.warning(f"Generation rejected: {e}")
+        raise HTTPException(status_code=503, detail="Server is busy, retry later") from None
+    except ValueError as e:
+        logger.warning(f"Invalid generate request: {e}")
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    except Exception as e:
+        logger.error(f"Generation failed: {e}")
+        raise HTTPException(status_code=500, detail="Generation failed") from None
+
+
+def _ndjson(event: GenerateStreamEvent) -> str:
+    return event.model_dump_json(exclude_none=True) + "\n"
+
+
+async def _wait_for_disconnect(http_request: Request) -> None:
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def _stream_events(
+    http_request: Request,
+    request: GenerateRequest,
+    page_images: list[PageImage],
+    sources: list[SourceReference],
+    start_time: float,
+) -> AsyncIterator[str]:
+    yield _ndjson(GenerateStreamEvent(type="sources", sources=sources))
+
+    tokens = get_generation_service().stream_answer(query=request.query, images=page_images)
+    # Race every token against the client going away, so a disconnect during a slow prefill or between tokens
+    # cancels the upstream stream instead of waiting for the next token to notice.
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    next_token: asyncio.Future[str] | None = None
+    try:
+        while True:
+            next_token = asyncio.ensure_future(anext(tokens))
+            await asyncio.wait({next_token, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_token.done():
+                logger.info(f"Client disconnected, cancelling generation: query='{request.query[:50]}...'")
+                return
+
+            try:
+                text = next_token.result()
+            except StopAsyncIteration:
+                break
+            yield _ndjson(GenerateStreamEvent(type="token", text=text))
+    except Exception as e:
+        logger.error(f"Streamed generation failed: {e}")
+        yield _ndjson(GenerateStreamEvent(type="error", detail="Generation failed"))
+        return
+    finally:
+        disconnected.cancel()
+        if next_token is not None and not next_token.done():
+            # The generator cannot be closed while a step is running; cancelling the step unwinds it instead.
+            next_token.cancel()
+            await asyncio.wait({next_token})
+        await tokens.aclose()
+
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    logger.info(
+        f"Streamed generation completed: query='{request.query[:50]}...', sources={len(sources)}, "
+        f"time={elapsed_ms:.2f}ms"
+    )
+    yield _ndjson(GenerateStreamEvent(type="done", generation_time_ms=round(elapsed_ms, 2)))
+
+
+@router.post("/generate/stream")
+async def generate_answer_stream(http_request: Request, request: GenerateRequest) -> StreamingResponse:
+    try:
+        start_time = time.perf_counter()
+        page_images, sources = await _retrieve_sources(request)
+
+    except InferenceQueueFullError as e:
+        logger.warning(f"Generation rejected: {e}")
+        raise HTTPException(status_code=503, detail="Server is busy, retry later") from None
     except ValueError as e:
         logger.warning(f"Invalid generate request: {e}")
         raise HTTPException(status_code=400, detail=str(e)) from None
     except Exception as e:
         logger.error(f"Generation failed: {e}")
         raise HTTPException(status_code=500, detail="Generation failed") from None
+
+    return StreamingResponse(
+        _stream_events(http_request, request, page_images, sources, start_time),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,43 +1,67 @@
-from pathlib import Path
-
 from fastapi import APIRouter, File, HTTPException, UploadFile
 from loguru import logger
 
 from src.core.config import settings
-from src.models.document import IngestionResponse
-from src.services.ingestion_service import ingest_uploaded_pdf
+from src.models.document import IngestionJobResponse
+from src.services.ingestion_jobs import (
+    IngestionJob,
+    enqueue_uploaded_pdf,
+    get_ingestion_job_store,
+    get_ingestion_worker_pool,
+)
+from src.utils.upload_utils import UploadTooLargeError
 
 router = APIRouter()
 
-TEMP_DIR = Path(settings.documents_dir) / "temp"
+
+def _to_response(job: IngestionJob) -> IngestionJobResponse:
+    return IngestionJobResponse(**job.model_dump(exclude={"pdf_path", "dpi", "max_pages"}))
 
 
-@router.post("/ingest", response_model=IngestionResponse)
+@router.post("/ingest", response_model=IngestionJobResponse, status_code=202)
 async def ingest_document(
     file: UploadFile = File(...),  # noqa: B008
 ):
     try:
-        result_doc_id, pages_indexed, patches_stored = await ingest_uploaded_pdf(
-            file=file,
-            temp_dir=TEMP_DIR,
-            dpi=settings.pdf_dpi,
-        )
-
-        status = "skipped" if pages_indexed == 0 and patches_stored == 0 else "completed"
-
-        return IngestionResponse(
-            doc_id=result_doc_id,
-            pages_indexed=pages_indexed,
-            patches_stored=patches_stored,
-            status=status,
-        )
+        job = await enqueue_uploaded_pdf(file=file, dpi=settings.pdf_dpi)
+        return _to_response(job)
 
+    except UploadTooLargeError as e:
+        logger.warning(f"Upload rejected: {e}")
+        raise HTTPException(status_code=413, detail=str(e)) from e
     except ValueError as e:
         logger.error(f"Validation error during ingestion: {e}")
         raise HTTPException(status_code=400, detail=str(e)) from e
-    except FileNotFoundError as e:
-        logger.error(f"File not found during ingestion: {e}")
-        raise HTTPException(status_code=404, detail=str(e)) from e
     except Exception as e:
-        logger.opt(exception=e).error("Ingestion failed")
+        logger.opt(exception=e).error("Failed to queue ingestion")
         raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: str):
+    job = get_ingestion_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
+    return _to_response(job)
+
+
+@router.post("/ingest/jobs/{job_id}/cancel", response_model=IngestionJobResponse)
+async def cancel_ingestion_job(job_id: str):
+    job = get_ingestion_worker_pool().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
+    if job.status in ("completed", "skipped"):
+        raise HTTPException(status_code=409, detail=f"Ingestion job '{job_id}' already {job.status}")
+    return _to_response(job)
+
+
+@router.post("/ingest/jobs/{job_id}/resume", response_model=IngestionJobResponse)
+async def resume_ingestion_job(job_id: str):
+    job = get_ingestion_worker_pool().resume(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
+    if job.status != "queued":
+        raise HTTPException(
+            status_code=409, detail=f"Ingestion job '{job_id}' is {job.status}, only failed jobs resume"
+        )
+    return _to_response(job)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from loguru import logger
 
+from src.core.inference_executor import InferenceQueueFullError, get_inference_executor
 from src.models.document import SearchRequest, SearchResponse
 from src.services.search_service import get_search_service
 
@@ -11,11 +12,15 @@ router = APIRouter()
 async def search_documents(request: SearchRequest) -> SearchResponse:
     try:
         search_service = get_search_service()
-        return search_service.search(
+        return await get_inference_executor().run(
+            search_service.search,
             query=request.query,
             top_k=request.top_k,
             doc_id_filter=request.doc_id,
         )
+    except InferenceQueueFullError as e:
+        logger.warning(f"Search rejected: {e}")
+        raise HTTPException(status_code=503, detail="Server is busy, retry later") from None
     except ValueError as e:
         logger.warning(f"Invalid search request: {e}")
         raise HTTPException(status_code=400, detail=str(e)) from None
@@ -5,22 +5,30 @@ from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
 from src.api.v1.router import api_router
-from src.core.milvus_client import milvus_client
+from src.core.config import settings
+from src.core.inference_executor import get_inference_executor
 from src.core.model_loader import get_model_loader
+from src.services.embedding_service import get_query_batcher
 from src.services.generation_service import get_generation_service
+from src.services.ingestion_jobs import get_ingestion_worker_pool
+from src.services.milvus_service import get_milvus_service
+from src.services.pdf_processor import get_pdf_render_pool
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up Visual RAG API...")
 
-    try:
-        logger.info("Connecting to Milvus...")
-        milvus_client.connect()
-        milvus_client.create_collection(dimension=128)
-        logger.success("Milvus connected and collection ready")
-    except Exception as exc:
-        logger.opt(exception=exc).error("Failed to connect to Milvus")
+    if settings.retrieval_backend == "milvus":
+        try:
+            logger.info("Connecting to Milvus...")
+            get_milvus_service()._ensure_collection()
+            logger.success("Milvus connected and collection ready")
+        except ValueError as exc:
+            logger.opt(exception=exc).error("Milvus collection does not match the configuration")
+            raise
+        except Exception as exc:
+            logger.opt(exception=exc).error("Failed to connect to Milvus")
 
     try:
         logger.info("Loading ColQwen2 model...")
@@ -30,6 +38,11 @@ async def lifespan(app: FastAPI):
     except Exception as exc:
         logger.opt(exception=exc).error("Failed to load ColQwen2 model")
 
+    try:
+        get_ingestion_worker_pool().start()
+    except Exception as exc:
+        logger.opt(exception=exc).error("Failed to start ingestion workers")
+
     yield
 
     logger.info("Shutting down Visual RAG API...")
@@ -42,8 +55,27 @@ async def lifespan(app: FastAPI):
         logger.opt(exception=exc).warning("Error closing generation service")
 
     try:
-        milvus_client.disconnect()
-        logger.info("Disconnected from Milvus")
+        get_ingestion_worker_pool().stop(timeout=30)
+    except Exception as exc:
+        logger.opt(exception=exc).warning("Error stopping ingestion workers")
+
+    try:
+        get_inference_executor().shutdown()
+    except Exception as exc:
+        logger.opt(exception=exc).warning("Error shutting down inference executor")
+
+    try:
+        get_query_batcher().close()
+    except Exception as exc:
+        logger.opt(exception=exc).warning("Error stopping query batcher")
+
+    try:
+        get_pdf_render_pool().shutdown()
+    except Exception as exc:
+        logger.opt(exception=exc).warning("Error stopping PDF render pool")
+
+    try:
+        get_milvus_service().disconnect()
     except Exception as exc:
         logger.opt(exception=exc).warning("Error disconnecting from Milvus")
 
@@ -77,7 +109,7 @@ def health():
     model_loaded = False
 
     try:
-        client = milvus_client._get_client()
+        client = get_milvus_service()._get_client()
         if client:
             milvus_connected = True
     except Exception:
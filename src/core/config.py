@@ -8,21 +8,73 @@ class Settings(BaseSettings):
     milvus_host: str = Field(default="localhost")
     milvus_port: int = Field(default=19530)
     milvus_collection_name: str = Field(default="visual_rag_patches")
+    milvus_search_batch_size: int = Field(default=64)
+    milvus_insert_batch_rows: int = Field(default=16384)
+    milvus_consistency_level: str = Field(default="Bounded")
+    milvus_read_your_writes_seconds: float = Field(default=10.0)
+    milvus_vector_type: str = Field(default="float")
+    milvus_binary_nlist: int = Field(default=1024)
+    milvus_binary_nprobe: int = Field(default=32)
+    milvus_binary_rescore_candidates: int = Field(default=100)
+    milvus_page_summary_enabled: bool = Field(default=False)
+    milvus_page_summary_vectors: int = Field(default=4)
+    milvus_page_summary_candidates: int = Field(default=200)
 
     colqwen2_model_name: str = Field(default="vidore/colqwen2-v1.0-hf")
     colqwen2_device: str = Field(default="mps")
     colqwen2_batch_size: int = Field(default=4)
+    colqwen2_image_tokens_only: bool = Field(default=True)
+
+    query_cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    query_cache_ttl_seconds: float = Field(default=0.0)
+    query_batching_enabled: bool = Field(default=True)
+    query_batch_window_ms: float = Field(default=5.0)
+    query_batch_max_size: int = Field(default=16)
+    query_pruning_enabled: bool = Field(default=False)
+    query_prune_max_tokens: int = Field(default=0)
+    query_prune_similarity: float = Field(default=0.95)
+
+    inference_max_concurrency: int = Field(default=4)
+    inference_max_queue_size: int = Field(default=32)
+    inference_queue_timeout_seconds: float = Field(default=5.0)
+
+    ingest_queue_depth: int = Field(default=4)
+    ingest_render_workers: int = Field(default=2)
+    ingest_workers: int = Field(default=1)
+    ingest_job_poll_seconds: float = Field(default=1.0)
+    page_dedup_enabled: bool = Field(default=True)
+    ingest_token_pool_factor: int = Field(default=1)
 
     ollama_base_url: str = Field(default="http://localhost:11434")
     vlm_model_name: str = Field(default="qwen3-vl:8b")
     vlm_timeout_seconds: int = Field(default=120)
+    vlm_image_max_size: int = Field(default=0)
+    vlm_image_format: str = Field(default="PNG")
+    page_payload_cache_max_bytes: int = Field(default=128 * 1024 * 1024)
 
     pdf_dpi: int = Field(default=150)
     pdf_max_pages: int = Field(default=100)
+    pdf_render_backend: str = Field(default="process")
+    pdf_render_processes: int = Field(default=0)
+    pdf_render_chunk_pages: int = Field(default=8)
     documents_dir: str = Field(default="data")
+    upload_max_bytes: int = Field(default=512 * 1024 * 1024)
+    upload_chunk_bytes: int = Field(default=1024 * 1024)
 
     top_k: int = Field(default=5)
     similarity_threshold: float = Field(default=0.7)
+    retrieval_rerank_enabled: bool = Field(default=False)
+    retrieval_rerank_candidates: int = Field(default=50)
+    retrieval_backend: str = Field(default="milvus")
+
+    plaid_index_dir: str = Field(default="data/plaid_index")
+    plaid_num_centroids: int = Field(default=1024)
+    plaid_residual_bits: int = Field(default=2)
+    plaid_train_min_patches: int = Field(default=50000)
+    plaid_train_sample_size: int = Field(default=262144)
+    plaid_nprobe: int = Field(default=4)
+    plaid_candidate_pages: int = Field(default=64)
+    plaid_compact_dead_ratio: float = Field(default=0.25)
 
 
 settings = Settings()
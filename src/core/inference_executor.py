@@ -0,0 +1,88 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+from loguru import logger
+
+from src.core.config import settings
+
+T = TypeVar("T")
+
+
+class InferenceQueueFullError(RuntimeError):
+    pass
+
+
+class InferenceExecutor:
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_size: int,
+        queue_timeout_seconds: float,
+        worker_threads: int | None = None,
+    ) -> None:
+        if max_concurrency <= 0:
+            raise ValueError(f"max_concurrency must be positive, got {max_concurrency}")
+
+        if max_queue_size < 0:
+            raise ValueError(f"max_queue_size must not be negative, got {max_queue_size}")
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(max_concurrency, worker_threads or 0),
+            thread_name_prefix="inference",
+        )
+        self._admission = asyncio.Semaphore(max_concurrency + max_queue_size)
+        self._queue_timeout_seconds = queue_timeout_seconds
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        await self._admit()
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        finally:
+            self._admission.release()
+
+    async def _admit(self) -> None:
+        if self._queue_timeout_seconds <= 0:
+            if self._admission.locked():
+                raise InferenceQueueFullError("Inference queue is full")
+            await self._admission.acquire()
+            return
+
+        try:
+            await asyncio.wait_for(self._admission.acquire(), timeout=self._queue_timeout_seconds)
+        except TimeoutError as exc:
+            raise InferenceQueueFullError(
+                f"Inference queue is full, waited {self._queue_timeout_seconds} seconds"
+            ) from exc
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        logger.info("Shut down inference executor")
+
+
+_inference_executor: InferenceExecutor | None = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    global _inference_executor
+    if _inference_executor is None:
+        admitted = settings.inference_max_concurrency + settings.inference_max_queue_size
+        if settings.query_batching_enabled and admitted < settings.query_batch_max_size:
+            logger.warning(
+                f"Query micro-batches are capped at {admitted} admitted searches, "
+                f"below QUERY_BATCH_MAX_SIZE={settings.query_batch_max_size}"
+            )
+        _inference_executor = InferenceExecutor(
+            max_concurrency=settings.inference_max_concurrency,
+            max_queue_size=settings.inference_max_queue_size,
+            queue_timeout_seconds=settings.inference_queue_timeout_seconds,
+            # A search holds its thread while its query waits in the micro-batcher, so fewer threads than
+            # QUERY_BATCH_MAX_SIZE would cap every batch at the thread count. Waiting threads cost no model compute;
+            # the batcher still runs one encode at a time.
+            worker_threads=settings.query_batch_max_size if settings.query_batching_enabled else None,
+        )
+    return _inference_executor
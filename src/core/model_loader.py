@@ -1,3 +1,4 @@
+import threading
 from typing import Optional
 
 import torch
@@ -6,6 +7,8 @@ from loguru import logger
 
 from src.core.config import settings
 
+MODEL_DTYPE = torch.bfloat16
+
 
 def _get_device(preferred_device: str) -> torch.device:
     if preferred_device == "cuda" and torch.cuda.is_available():
@@ -30,38 +33,47 @@ class ColQwen2ModelLoader:
     _instance: Optional["ColQwen2ModelLoader"] = None
     _model: ColQwen2 | None = None
     _processor: ColQwen2Processor | None = None
+    _load_lock = threading.Lock()
+    inference_lock = threading.Lock()
 
     def __new__(cls) -> "ColQwen2ModelLoader":
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
+        with cls._load_lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
         return cls._instance
 
     def _load_model(self) -> None:
         if self._model is not None:
             return
 
+        with self._load_lock:
+            if self._model is None:
+                self._load_model_locked()
+
+    def _load_model_locked(self) -> None:
         logger.info(f"Loading ColQwen2 model: {settings.colqwen2_model_name}")
 
         device = _get_device(settings.colqwen2_device)
         logger.info(f"Using device: {device}")
 
         if device.type in ["mps", "cpu"]:
-            self._model = (
+            model = (
                 ColQwen2.from_pretrained(
                     settings.colqwen2_model_name,
-                    dtype=torch.bfloat16,
+                    dtype=MODEL_DTYPE,
                 )
                 .to(device)
                 .eval()
             )
         else:
-            self._model = ColQwen2.from_pretrained(
+            model = ColQwen2.from_pretrained(
                 settings.colqwen2_model_name,
-                dtype=torch.bfloat16,
+                dtype=MODEL_DTYPE,
                 device_map=device.type,
             ).eval()
 
         self._processor = ColQwen2Processor.from_pretrained(settings.colqwen2_model_name)
+        self._model = model
 
         logger.success(f"Model loaded successfully on {device}")
 
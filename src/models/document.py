@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -13,6 +16,8 @@ class DocumentInfo(BaseModel):
     doc_name: str = Field(description="Document name (filename without extension)")
     page_count: int = Field(description="Number of pages in the document")
     pdf_path: str = Field(description="Path to the PDF file")
+    size_bytes: int | None = Field(default=None, description="Size of the PDF file in bytes")
+    ingest_status: str | None = Field(default=None, description="Last ingestion status, if the document was ingested")
 
 
 class DocumentListResponse(BaseModel):
@@ -20,11 +25,22 @@ class DocumentListResponse(BaseModel):
     total: int = Field(description="Total number of documents")
 
 
-class IngestionResponse(BaseModel):
+class IngestionJobResponse(BaseModel):
+    job_id: str = Field(description="Ingestion job identifier")
+    status: str = Field(description="Job status: queued, running, completed, skipped, failed or cancelled")
     doc_id: str = Field(description="Document identifier (SHA256 hash or custom)")
-    pages_indexed: int = Field(description="Number of pages processed")
-    patches_stored: int = Field(description="Total embedding patches stored in Milvus")
-    status: str = Field(description="Ingestion status: completed or failed")
+    filename: str = Field(description="Uploaded file name")
+    pages_total: int = Field(description="Number of pages that will be processed")
+    pages_indexed: int = Field(description="Number of pages stored so far")
+    patches_stored: int = Field(description="Total embedding patches stored so far")
+    cancel_requested: bool = Field(default=False, description="Whether cancellation was requested for a running job")
+    error: str | None = Field(default=None, description="Failure reason for failed jobs")
+    stage_utilization: dict[str, float] = Field(
+        default_factory=dict,
+        description="Fraction of wall time each pipeline stage (render, encode, insert) was busy",
+    )
+    created_at: datetime = Field(description="When the job was enqueued")
+    updated_at: datetime = Field(description="When the job last changed")
 
 
 class SearchRequest(BaseModel):
@@ -71,6 +87,14 @@ class GenerateResponse(BaseModel):
     generation_time_ms: float = Field(description="Total generation time in milliseconds")
 
 
+class GenerateStreamEvent(BaseModel):
+    type: Literal["sources", "token", "done", "error"] = Field(description="Event kind")
+    sources: list[SourceReference] | None = Field(default=None, description="Source pages, sent first")
+    text: str | None = Field(default=None, description="Answer text fragment")
+    generation_time_ms: float | None = Field(default=None, description="Total time, sent with the done event")
+    detail: str | None = Field(default=None, description="Error message if generation failed mid-stream")
+
+
 def validate_filename(filename: str) -> str:
     if not filename:
         raise ValueError("Filename cannot be empty")
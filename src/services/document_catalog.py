@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from src.core.sqlite_store import SQLiteStore
+from src.models.document import DocumentInfo
+from src.services.pdf_processor import count_pdf_pages, generate_doc_id, limit_page_count
+
+CATALOG_FILENAME = "catalog.db"
+ORIGINAL_PDF_NAME = "original.pdf"
+
+
+class DocumentCatalog(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            doc_name TEXT PRIMARY KEY,
+            doc_id TEXT NOT NULL,
+            page_count INTEGER NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            pdf_path TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_documents_doc_id ON documents (doc_id);
+        CREATE TABLE IF NOT EXISTS ingest_status (
+            doc_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ingested_pages (
+            doc_id TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            pool_factor INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (doc_id, page_number)
+        );
+    """
+
+    def __init__(self, data_dir: str | Path) -> None:
+        self.data_dir = Path(data_dir)
+        self.documents_dir = self.data_dir / "documents"
+        super().__init__(self.data_dir / CATALOG_FILENAME)
+
+    def record_document(self, doc_name: str, doc_id: str | None = None, page_count: int | None = None) -> DocumentInfo:
+        pdf_path = self._pdf_path(doc_name)
+        stat = pdf_path.stat()
+
+        if doc_id is None:
+            doc_id = generate_doc_id(pdf_path)
+        if page_count is None:
+            page_count = limit_page_count(count_pdf_pages(pdf_path))
+
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_name, doc_id, page_count, size_bytes, mtime_ns, pdf_path) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_name, doc_id, page_count, stat.st_size, stat.st_mtime_ns, str(pdf_path)),
+            )
+
+        logger.debug(f"Cataloged document: doc_name={doc_name}, doc_id={doc_id}, pages={page_count}")
+        return self._fetch_by_name(doc_name)
+
+    def set_ingest_status(self, doc_id: str, status: str) -> None:
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingest_status (doc_id, status, updated_at) VALUES (?, ?, ?)",
+                (doc_id, status, time.time()),
+            )
+
+    def get_ingest_status(self, doc_id: str) -> str | None:
+        row = self.fetchone("SELECT status FROM ingest_status WHERE doc_id = ?", (doc_id,))
+        return row["status"] if row else None
+
+    def record_ingested_pages(self, doc_id: str, page_numbers: list[int], pool_factor: int = 1) -> None:
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO ingested_pages (doc_id, page_number, pool_factor) VALUES (?, ?, ?)",
+                [(doc_id, page_number, pool_factor) for page_number in page_numbers],
+            )
+
+    def get_ingested_pages(self, doc_id: str) -> set[int]:
+        rows = self.fetchall("SELECT page_number FROM ingested_pages WHERE doc_id = ?", (doc_id,))
+        return {row["page_number"] for row in rows}
+
+    def get_pool_factors(self) -> set[int]:
+        rows = self.fetchall("SELECT DISTINCT pool_factor FROM ingested_pages")
+        return {row["pool_factor"] for row in rows}
+
+    def clear_ingested_pages(self, doc_id: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM ingested_pages WHERE doc_id = ?", (doc_id,))
+
+    def get_by_name(self, doc_name: str) -> DocumentInfo | None:
+        row = self.fetchone("SELECT * FROM documents WHERE doc_name = ?", (doc_name,))
+        return self._validated(doc_name, row)
+
+    def get_by_id(self, doc_id: str) -> DocumentInfo | None:
+        for row in self.fetchall("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)):
+            document = self._validated(row["doc_name"], row)
+            if document is not None and document.doc_id == doc_id:
+                return document
+
+        self.reconcile()
+        row = self.fetchone("SELECT doc_name FROM documents WHERE doc_id = ?", (doc_id,))
+        return self._fetch_by_name(row["doc_name"]) if row else None
+
+    def list_documents(self) -> list[DocumentInfo]:
+        self.reconcile()
+        rows = self.fetchall(
+            "SELECT d.*, s.status AS ingest_status FROM documents d "
+            "LEFT JOIN ingest_status s ON s.doc_id = d.doc_id ORDER BY d.doc_name"
+        )
+        return [self._to_info(row) for row in rows]
+
+    def doc_id_to_name(self, doc_ids: list[str] | None = None) -> dict[str, str]:
+        if doc_ids is None:
+            self.reconcile()
+            rows = self.fetchall("SELECT doc_id, doc_name FROM documents")
+            return {row["doc_id"]: row["doc_name"] for row in rows}
+
+        wanted = list(dict.fromkeys(doc_ids))
+        mapping = self._lookup_names(wanted)
+        if len(mapping) < len(wanted):
+            self.reconcile()
+            mapping = self._lookup_names(wanted)
+        return mapping
+
+    def _lookup_names(self, doc_ids: list[str]) -> dict[str, str]:
+        if not doc_ids:
+            return {}
+
+        placeholders = ", ".join("?" for _ in doc_ids)
+        rows = self.fetchall(f"SELECT * FROM documents WHERE doc_id IN ({placeholders})", tuple(doc_ids))
+
+        mapping = {}
+        for row in rows:
+            document = self._validated(row["doc_name"], row)
+            if document is not None and document.doc_id in doc_ids:
+                mapping[document.doc_id] = document.doc_name
+        return mapping
+
+    def reconcile(self) -> None:
+        known = {row["doc_name"]: row for row in self.fetchall("SELECT * FROM documents")}
+        on_disk = set()
+
+        if self.documents_dir.exists():
+            for entry in os.scandir(self.documents_dir):
+                if not entry.is_dir():
+                    continue
+
+                on_disk.add(entry.name)
+                row = known.get(entry.name)
+                if row is None or self._is_stale(row):
+                    self._validated(entry.name, row)
+
+        removed = [doc_name for doc_name in known if doc_name not in on_disk]
+        if removed:
+            with self.transaction() as conn:
+                conn.executemany("DELETE FROM documents WHERE doc_name = ?", [(name,) for name in removed])
+            logger.info(f"Removed {len(removed)} documents from catalog that no longer exist on disk")
+
+    def remove_document(self, doc_name: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM documents WHERE doc_name = ?", (doc_name,))
+
+    def _pdf_path(self, doc_name: str) -> Path:
+        return self.documents_dir / doc_name / ORIGINAL_PDF_NAME
+
+    def _is_stale(self, row: sqlite3.Row) -> bool:
+        try:
+            stat = Path(row["pdf_path"]).stat()
+        except FileNotFoundError:
+            return True
+        return stat.st_size != row["size_bytes"] or stat.st_mtime_ns != row["mtime_ns"]
+
+    def _validated(self, doc_name: str, row: sqlite3.Row | None) -> DocumentInfo | None:
+        if row is not None and not self._is_stale(row):
+            return self._fetch_by_name(doc_name)
+
+        if not self._pdf_path(doc_name).exists():
+            if row is not None:
+                self.remove_document(doc_name)
+            else:
+                logger.warning(f"No {ORIGINAL_PDF_NAME} found for {doc_name}")
+            return None
+
+        try:
+            logger.info(f"Refreshing catalog entry for {doc_name}")
+            return self.record_document(doc_name)
+        except Exception as exc:
+            logger.opt(exception=exc).warning(f"Failed to get info for {doc_name}")
+            return None
+
+    def _fetch_by_name(self, doc_name: str) -> DocumentInfo | None:
+        row = self.fetchone(
+            "SELECT d.*, s.status AS ingest_status FROM documents d "
+            "LEFT JOIN ingest_status s ON s.doc_id = d.doc_id WHERE d.doc_name = ?",
+            (doc_name,),
+        )
+        return self._to_info(row) if row else None
+
+    @staticmethod
+    def _to_info(row: sqlite3.Row) -> DocumentInfo:
+        return DocumentInfo(
+            doc_id=row["doc_id"],
+            doc_name=row["doc_name"],
+            page_count=row["page_count"],
+            pdf_path=row["pdf_path"],
+            size_bytes=row["size_bytes"],
+            ingest_status=row["ingest_status"],
+        )
+
+
+_catalogs: dict[Path, DocumentCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_document_catalog(data_dir: str | Path) -> DocumentCatalog:
+    key = Path(data_dir).resolve()
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = DocumentCatalog(data_dir)
+        return _catalogs[key]
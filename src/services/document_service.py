@@ -3,12 +3,17 @@ from pathlib import Path
 from fastapi import UploadFile
 from loguru import logger
 
+from src.core.config import settings
 from src.models.document import DocumentInfo, validate_filename
-from src.services.milvus_service import get_milvus_service
-from src.services.pdf_processor import count_pdf_pages, generate_doc_id, process_pdf_document
+from src.services.document_catalog import get_document_catalog
+from src.services.generation_service import invalidate_page_payloads
+from src.services.index_backend import get_index_backend
+from src.services.page_hash_index import get_page_hash_index
+from src.services.pdf_processor import process_pdf_document
+from src.utils.upload_utils import UploadTooLargeError, stream_upload_to_file
 
 
-async def save_uploaded_file(file: UploadFile, temp_dir: Path) -> Path:
+async def save_uploaded_file(file: UploadFile, temp_dir: Path) -> tuple[Path, str]:
     try:
         if not file.filename:
             raise ValueError("No filename provided")
@@ -17,12 +22,17 @@ async def save_uploaded_file(file: UploadFile, temp_dir: Path) -> Path:
 
         temp_path = temp_dir / f"temp_{file.filename}"
 
-        content = await file.read()
-        with open(temp_path, "wb") as f:
-            f.write(content)
+        doc_id, _ = await stream_upload_to_file(
+            file,
+            temp_path,
+            max_bytes=settings.upload_max_bytes,
+            chunk_bytes=settings.upload_chunk_bytes,
+        )
 
         logger.info(f"Saved uploaded file to {temp_path}")
-        return temp_path
+        return temp_path, doc_id
+    except UploadTooLargeError:
+        raise
     except Exception as exc:
         logger.opt(exception=exc).error("Failed to save uploaded file")
         raise ValueError(f"Failed to save uploaded file: {exc}") from exc
@@ -35,10 +45,12 @@ def process_uploaded_document(
     dpi: int = 144,
     use_parallel: bool = True,
     max_workers: int = 4,
+    doc_id: str | None = None,
 ) -> tuple[str, Path, int]:
     try:
         doc_id, saved_pdf_path, image_paths, images = process_pdf_document(
             pdf_path=pdf_path,
+            doc_id=doc_id,
             output_dir=output_dir,
             doc_name=doc_name,
             dpi=dpi,
@@ -50,6 +62,8 @@ def process_uploaded_document(
 
         page_count = len(images)
 
+        get_document_catalog(output_dir).record_document(doc_name, doc_id=doc_id, page_count=page_count)
+
         logger.info(f"Processed document: doc_id={doc_id}, doc_name={doc_name}, pages={page_count}")
 
         return doc_id, saved_pdf_path, page_count
@@ -72,7 +86,7 @@ async def handle_document_upload(
 
         doc_name = Path(file.filename).stem
 
-        temp_pdf_path = await save_uploaded_file(file, data_dir)
+        temp_pdf_path, doc_id = await save_uploaded_file(file, data_dir)
 
         try:
             doc_id, saved_pdf_path, page_count = process_uploaded_document(
@@ -82,6 +96,7 @@ async def handle_document_upload(
                 dpi=dpi,
                 use_parallel=True,
                 max_workers=4,
+                doc_id=doc_id,
             )
 
             return doc_id, doc_name, saved_pdf_path, page_count
@@ -91,21 +106,31 @@ async def handle_document_upload(
                 temp_pdf_path.unlink()
                 logger.debug(f"Cleaned up temporary file: {temp_pdf_path}")
 
+    except UploadTooLargeError:
+        raise
     except Exception as exc:
         logger.opt(exception=exc).error(f"Failed to handle document upload: {file.filename}")
         raise ValueError(f"Failed to handle document upload: {exc}") from exc
 
 
 def delete_document(doc_name: str, data_dir: Path) -> tuple[str, int]:
-    doc_path = data_dir / "documents" / doc_name / "original.pdf"
+    catalog = get_document_catalog(data_dir)
+    document = catalog.get_by_name(doc_name)
 
-    if not doc_path.exists():
+    if document is None:
         raise FileNotFoundError(f"Document '{doc_name}' not found")
 
-    doc_id = generate_doc_id(doc_path)
+    doc_id = document.doc_id
 
-    milvus_service = get_milvus_service()
+    page_hash_index = get_page_hash_index()
+    if page_hash_index is not None:
+        page_hash_index.remove_document(doc_id)
+
+    milvus_service = get_index_backend()
     patches_deleted = milvus_service.delete_document(doc_id)
+    catalog.clear_ingested_pages(doc_id)
+    catalog.set_ingest_status(doc_id, "deleted")
+    invalidate_page_payloads(doc_id)
 
     logger.info(f"Deleted document: doc_name={doc_name}, doc_id={doc_id}, patches={patches_deleted}")
 
@@ -113,83 +138,24 @@ def delete_document(doc_name: str, data_dir: Path) -> tuple[str, int]:
 
 
 def list_documents(data_dir: Path) -> list[DocumentInfo]:
-    documents_dir = data_dir / "documents"
-    if not documents_dir.exists():
-        return []
-
-    documents = []
-    for doc_path in documents_dir.iterdir():
-        if not doc_path.is_dir():
-            continue
-
-        doc_name = doc_path.name
-        pdf_path = doc_path / "original.pdf"
-
-        if not pdf_path.exists():
-            logger.warning(f"No original.pdf found for {doc_name}")
-            continue
-
-        try:
-            doc_id = generate_doc_id(pdf_path)
-            page_count = count_pdf_pages(pdf_path)
-            documents.append(
-                DocumentInfo(
-                    doc_id=doc_id,
-                    doc_name=doc_name,
-                    page_count=page_count,
-                    pdf_path=str(pdf_path),
-                )
-            )
-        except Exception as exc:
-            logger.opt(exception=exc).warning(f"Failed to get info for {doc_name}")
-
+    documents = get_document_catalog(data_dir).list_documents()
     logger.info(f"Listed {len(documents)} documents")
     return documents
 
 
 def get_document_by_name(doc_name: str, data_dir: Path) -> DocumentInfo:
-    pdf_path = data_dir / "documents" / doc_name / "original.pdf"
+    document = get_document_catalog(data_dir).get_by_name(doc_name)
 
-    if not pdf_path.exists():
+    if document is None:
         raise FileNotFoundError(f"Document '{doc_name}' not found")
 
-    doc_id = generate_doc_id(pdf_path)
-    page_count = count_pdf_pages(pdf_path)
-
-    return DocumentInfo(
-        doc_id=doc_id,
-        doc_name=doc_name,
-        page_count=page_count,
-        pdf_path=str(pdf_path),
-    )
+    return document
 
 
 def get_document_by_id(doc_id: str, data_dir: Path) -> DocumentInfo:
-    documents_dir = data_dir / "documents"
-    if not documents_dir.exists():
-        raise FileNotFoundError(f"Document with id '{doc_id}' not found")
+    document = get_document_catalog(data_dir).get_by_id(doc_id)
 
-    for doc_path in documents_dir.iterdir():
-        if not doc_path.is_dir():
-            continue
-
-        doc_name = doc_path.name
-        pdf_path = doc_path / "original.pdf"
-
-        if not pdf_path.exists():
-            continue
+    if document is None:
+        raise FileNotFoundError(f"Document with id '{doc_id}' not found")
 
-        try:
-            current_doc_id = generate_doc_id(pdf_path)
-            if current_doc_id == doc_id:
-                page_count = count_pdf_pages(pdf_path)
-                return DocumentInfo(
-                    doc_id=doc_id,
-                    doc_name=doc_name,
-                    page_count=page_count,
-                    pdf_path=str(pdf_path),
-                )
-        except Exception as exc:
-            logger.opt(exception=exc).warning(f"Failed to check doc_id for {doc_name}")
-
-    raise FileNotFoundError(f"Document with id '{doc_id}' not found")
+    return document
@@ -1,8 +1,14 @@
+import unicodedata
+
 import torch
 from loguru import logger
 from PIL import Image
+from transformers import BatchFeature
 
-from src.core.model_loader import get_model_loader
+from src.core.config import settings
+from src.core.model_loader import MODEL_DTYPE, get_model_loader
+from src.services.query_batcher import QueryBatcher
+from src.utils.cache_utils import ByteSizeLRUCache
 
 
 class EmbeddingService:
@@ -10,6 +16,10 @@ class EmbeddingService:
         self._loader = get_model_loader()
 
     def encode_images(self, images: list[Image.Image]) -> torch.Tensor:
+        image_embeddings, _ = self.encode_images_with_mask(images)
+        return image_embeddings
+
+    def encode_images_with_mask(self, images: list[Image.Image]) -> tuple[torch.Tensor, torch.Tensor]:
         if not images:
             raise ValueError("Images list cannot be empty")
 
@@ -21,36 +31,86 @@ class EmbeddingService:
 
             batch_images = processor.process_images(images).to(model.device)
 
-            with torch.no_grad():
+            with self._loader.inference_lock, torch.no_grad():
                 image_embeddings = model(**batch_images)
 
             logger.success(f"Generated embeddings with shape: {image_embeddings.shape}")
-            return image_embeddings
+            return image_embeddings, self._page_token_mask(batch_images)
 
         except Exception as e:
             logger.error(f"Failed to encode images: {e}")
             raise
 
+    def _page_token_mask(self, batch_images: BatchFeature) -> torch.Tensor:
+        attention_mask = batch_images["attention_mask"].bool()
+        if not settings.colqwen2_image_tokens_only:
+            return attention_mask
+
+        token_mask = attention_mask & self._loader.processor.get_image_mask(batch_images).bool()
+
+        missing = ~token_mask.any(dim=1)
+        if missing.any():
+            logger.warning(f"{int(missing.sum())} images have no image tokens, keeping all attended tokens")
+            token_mask[missing] = attention_mask[missing]
+
+        return token_mask
+
+    def encode_page_images(self, images: list[Image.Image]) -> list[torch.Tensor]:
+        image_embeddings, token_mask = self.encode_images_with_mask(images)
+
+        page_embeddings = [embeddings[mask] for embeddings, mask in zip(image_embeddings, token_mask, strict=True)]
+
+        logger.debug(
+            f"Kept {int(token_mask.sum())} of {token_mask.numel()} token rows for {len(page_embeddings)} pages"
+        )
+        return page_embeddings
+
     def encode_query(self, query: str) -> torch.Tensor:
         if not query or not query.strip():
             raise ValueError("Query cannot be empty")
 
+        cache = get_query_embedding_cache()
+        cache_key = (settings.colqwen2_model_name, normalize_query(query))
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Query embedding cache hit: {query}")
+            return cached.to(dtype=MODEL_DTYPE)
+
+        query_embeddings = self._encode_query_uncached(query)
+        cache.put(cache_key, query_embeddings.detach().to(device="cpu", dtype=torch.float16))
+        return query_embeddings
+
+    def _encode_query_uncached(self, query: str) -> torch.Tensor:
+        if settings.query_batching_enabled:
+            return get_query_batcher().encode(query)
+        return self.encode_queries([query])[0]
+
+    def encode_queries(self, queries: list[str]) -> list[torch.Tensor]:
+        if not queries:
+            raise ValueError("Queries list cannot be empty")
+
         try:
-            logger.info(f"Encoding query: {query}")
+            logger.info(f"Encoding {len(queries)} queries")
 
             model = self._loader.model
             processor = self._loader.processor
 
-            batch_query = processor.process_queries([query]).to(model.device)
+            batch_query = processor.process_queries(queries).to(model.device)
 
-            with torch.no_grad():
+            with self._loader.inference_lock, torch.no_grad():
                 query_embeddings = model(**batch_query)
 
+            attention_mask = batch_query["attention_mask"].bool()
+            per_query = [
+                embeddings[mask].unsqueeze(0) for embeddings, mask in zip(query_embeddings, attention_mask, strict=True)
+            ]
+
             logger.success(f"Generated query embeddings with shape: {query_embeddings.shape}")
-            return query_embeddings
+            return per_query
 
         except Exception as e:
-            logger.error(f"Failed to encode query: {e}")
+            logger.error(f"Failed to encode queries: {e}")
             raise
 
     def encode_images_batch(self, images: list[Image.Image], batch_size: int) -> list[torch.Tensor]:
@@ -77,5 +137,41 @@ class EmbeddingService:
             raise
 
 
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+def _tensor_nbytes(tensor: torch.Tensor) -> int:
+    return tensor.element_size() * tensor.nelement()
+
+
+_query_embedding_cache: ByteSizeLRUCache[tuple[str, str], torch.Tensor] | None = None
+
+
+def get_query_embedding_cache() -> ByteSizeLRUCache[tuple[str, str], torch.Tensor]:
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        _query_embedding_cache = ByteSizeLRUCache(
+            max_bytes=settings.query_cache_max_bytes,
+            size_of=_tensor_nbytes,
+            ttl_seconds=settings.query_cache_ttl_seconds,
+        )
+    return _query_embedding_cache
+
+
+_query_batcher: QueryBatcher | None = None
+
+
+def get_query_batcher() -> QueryBatcher:
+    global _query_batcher
+    if _query_batcher is None:
+        _query_batcher = QueryBatcher(
+            encode_batch=EmbeddingService().encode_queries,
+            window_ms=settings.query_batch_window_ms,
+            max_batch_size=settings.query_batch_max_size,
+        )
+    return _query_batcher
+
+
 def get_embedding_service() -> EmbeddingService:
     return EmbeddingService()
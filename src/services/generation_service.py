@@ -1,12 +1,17 @@
+import asyncio
 import base64
 import io
+import json
+from collections.abc import AsyncIterator
 from pathlib import Path
 
 import httpx
 from loguru import logger
 from PIL import Image
+from pydantic import BaseModel
 
 from src.core.config import settings
+from src.utils.cache_utils import ByteSizeLRUCache
 
 PROMPT_TEMPLATE = """You are a helpful assistant that answers questions based on the provided document images.
 
@@ -16,6 +21,15 @@ Please analyze the document images and provide a clear, accurate answer based so
 visible in the images. If the answer cannot be found in the images, say so."""
 
 
+class PageImage(BaseModel):
+    doc_id: str
+    page_number: int
+    path: Path
+
+
+PagePayloadKey = tuple[str, int, int, str]
+
+
 class GenerationService:
     def __init__(self) -> None:
         self._client: httpx.AsyncClient | None = None
@@ -40,12 +54,40 @@ class GenerationService:
             raise FileNotFoundError(f"Image not found: {path}")
         return Image.open(path).convert("RGB")
 
-    async def generate_answer(
+    async def _page_payload(self, page: PageImage) -> str:
+        max_size = max(0, settings.vlm_image_max_size)
+        image_format = settings.vlm_image_format.upper()
+        key: PagePayloadKey = (page.doc_id, page.page_number, max_size, image_format)
+
+        cache = get_page_payload_cache()
+        payload = cache.get(key)
+        if payload is None:
+            payload = await asyncio.to_thread(self._encode_page_file, page.path, max_size, image_format)
+            cache.put(key, payload)
+        return payload
+
+    def _encode_page_file(self, path: Path, max_size: int, image_format: str) -> str:
+        if not path.exists():
+            raise FileNotFoundError(f"Image not found: {path}")
+
+        if max_size == 0 and image_format == "PNG" and path.suffix.lower() == ".png":
+            return base64.b64encode(path.read_bytes()).decode("utf-8")
+
+        image = self._load_image_from_path(path)
+        if max_size and max(image.size) > max_size:
+            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format)
+        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+    async def _build_payload(
         self,
         query: str,
-        images: list[Image.Image | Path | str],
-        model: str | None = None,
-    ) -> str:
+        images: list[Image.Image | PageImage | Path | str],
+        model: str | None,
+        stream: bool,
+    ) -> dict:
         if not query or not query.strip():
             raise ValueError("Query cannot be empty")
 
@@ -57,19 +99,30 @@ class GenerationService:
 
         base64_images = []
         for img in images:
+            if isinstance(img, PageImage):
+                base64_images.append(await self._page_payload(img))
+                continue
             if isinstance(img, (Path, str)):
                 img = self._load_image_from_path(img)
             base64_images.append(self._image_to_base64(img))
 
         logger.info(f"Generating answer: query='{query[:50]}...', images={len(base64_images)}, model={model}")
 
-        payload = {
+        return {
             "model": model,
             "prompt": prompt,
             "images": base64_images,
-            "stream": False,
+            "stream": stream,
         }
 
+    async def generate_answer(
+        self,
+        query: str,
+        images: list[Image.Image | PageImage | Path | str],
+        model: str | None = None,
+    ) -> str:
+        payload = await self._build_payload(query, images, model, stream=False)
+
         try:
             client = await self._get_client()
             response = await client.post("/api/generate", json=payload)
@@ -93,6 +146,59 @@ class GenerationService:
             logger.opt(exception=exc).error("Failed to generate answer")
             raise RuntimeError(f"Failed to generate answer: {exc}") from exc
 
+    async def stream_answer(
+        self,
+        query: str,
+        images: list[Image.Image | PageImage | Path | str],
+        model: str | None = None,
+    ) -> AsyncIterator[str]:
+        payload = await self._build_payload(query, images, model, stream=True)
+        num_chars = 0
+
+        try:
+            client = await self._get_client()
+            async with client.stream("POST", "/api/generate", json=payload) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(f"Ollama stream error: {chunk['error']}")
+
+                    text = chunk.get("response", "")
+                    if text:
+                        num_chars += len(text)
+                        yield text
+
+                    if chunk.get("done"):
+                        break
+
+            logger.info(f"Streamed generation completed: {num_chars} characters")
+
+        except httpx.TimeoutException as exc:
+            logger.error(f"Ollama stream stalled for {settings.vlm_timeout_seconds}s")
+            raise TimeoutError(f"Generation timed out after {settings.vlm_timeout_seconds} seconds") from exc
+
+        except httpx.HTTPStatusError as exc:
+            logger.error(f"Ollama returned error: {exc.response.status_code}")
+            raise RuntimeError(f"Ollama API error: {exc.response.status_code} - {exc.response.text}") from exc
+
+        except (GeneratorExit, asyncio.CancelledError):
+            logger.info(f"Streamed generation cancelled after {num_chars} characters")
+            raise
+
+        except RuntimeError:
+            raise
+
+        except Exception as exc:
+            logger.opt(exception=exc).error("Failed to stream answer")
+            raise RuntimeError(f"Failed to generate answer: {exc}") from exc
+
     async def close(self) -> None:
         if self._client is not None:
             await self._client.aclose()
@@ -100,6 +206,20 @@ class GenerationService:
             logger.info("Closed generation service HTTP client")
 
 
+_page_payload_cache: ByteSizeLRUCache[PagePayloadKey, str] | None = None
+
+
+def get_page_payload_cache() -> ByteSizeLRUCache[PagePayloadKey, str]:
+    global _page_payload_cache
+    if _page_payload_cache is None:
+        _page_payload_cache = ByteSizeLRUCache(max_bytes=settings.page_payload_cache_max_bytes, size_of=len)
+    return _page_payload_cache
+
+
+def invalidate_page_payloads(doc_id: str) -> int:
+    return get_page_payload_cache().invalidate(lambda key: key[0] == doc_id)
+
+
 _generation_service: GenerationService | None = None
 
 
@@ -0,0 +1,15 @@
+from src.core.config import settings
+from src.services.milvus_service import MilvusService, get_milvus_service
+from src.services.plaid_index import PlaidIndexService, get_plaid_index_service
+
+IndexBackend = MilvusService | PlaidIndexService
+
+
+def get_index_backend() -> IndexBackend:
+    if settings.retrieval_backend == "plaid":
+        return get_plaid_index_service()
+
+    if settings.retrieval_backend != "milvus":
+        raise ValueError(f"Unknown retrieval backend: {settings.retrieval_backend}")
+
+    return get_milvus_service()
@@ -0,0 +1,417 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from fastapi import UploadFile
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from src.core.config import settings
+from src.core.sqlite_store import SQLiteStore
+from src.models.document import validate_filename
+from src.services.ingestion_pipeline import IngestionCancelledError, IngestionInterruptedError
+from src.services.ingestion_service import IngestionService
+from src.services.pdf_processor import count_pdf_pages, limit_page_count
+from src.utils.upload_utils import stream_upload_to_file
+
+JOB_STORE_FILENAME = "ingest_jobs.db"
+JOB_QUEUE_DIRNAME = "ingest_queue"
+
+FINISHED_STATUSES = ("completed", "skipped", "failed", "cancelled")
+
+
+class IngestionJob(BaseModel):
+    job_id: str
+    status: str
+    doc_id: str
+    filename: str
+    pdf_path: str
+    dpi: int
+    max_pages: int | None
+    pages_total: int
+    pages_indexed: int = 0
+    patches_stored: int = 0
+    cancel_requested: bool = False
+    error: str | None = None
+    stage_utilization: dict[str, float] = Field(default_factory=dict)
+    created_at: datetime
+    updated_at: datetime
+
+
+class IngestionJobStore(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            pdf_path TEXT NOT NULL,
+            dpi INTEGER NOT NULL,
+            max_pages INTEGER,
+            pages_total INTEGER NOT NULL,
+            pages_indexed INTEGER NOT NULL DEFAULT 0,
+            patches_stored INTEGER NOT NULL DEFAULT 0,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            stage_utilization TEXT NOT NULL DEFAULT '{}',
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+    """
+
+    def create(
+        self,
+        job_id: str,
+        doc_id: str,
+        filename: str,
+        pdf_path: Path,
+        dpi: int,
+        max_pages: int | None,
+        pages_total: int,
+    ) -> IngestionJob:
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, doc_id, filename, pdf_path, dpi, max_pages, pages_total, "
+                "created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, doc_id, filename, str(pdf_path), dpi, max_pages, pages_total, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> IngestionJob | None:
+        row = self.fetchone("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return self._to_job(row) if row else None
+
+    def claim_next(self) -> IngestionJob | None:
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1",
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE job_id = ?",
+                (time.time(), row["job_id"]),
+            )
+        return self.get(row["job_id"])
+
+    def update_progress(self, job_id: str, pages_indexed: int, patches_stored: int) -> None:
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET pages_indexed = ?, patches_stored = ?, updated_at = ? WHERE job_id = ?",
+                (pages_indexed, patches_stored, time.time(), job_id),
+            )
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        pages_indexed: int = 0,
+        patches_stored: int = 0,
+        error: str | None = None,
+        stage_utilization: dict[str, float] | None = None,
+    ) -> None:
+        if status not in FINISHED_STATUSES:
+            raise ValueError(f"Invalid final job status '{status}', expected one of {FINISHED_STATUSES}")
+
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, pages_indexed = ?, patches_stored = ?, error = ?, "
+                "stage_utilization = ?, updated_at = ? WHERE job_id = ?",
+                (
+                    status,
+                    pages_indexed,
+                    patches_stored,
+                    error,
+                    json.dumps(stage_utilization or {}),
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def request_cancel(self, job_id: str) -> IngestionJob | None:
+        with self.transaction() as conn:
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? "
+                "WHERE job_id = ? AND status IN ('queued', 'failed')",
+                (now, job_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE job_id = ? AND status = 'running'",
+                (now, job_id),
+            )
+        return self.get(job_id)
+
+    def requeue(self, job_id: str) -> None:
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', pages_indexed = 0, patches_stored = 0, updated_at = ? "
+                "WHERE job_id = ?",
+                (time.time(), job_id),
+            )
+
+    def resume(self, job_id: str) -> IngestionJob | None:
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', error = NULL, cancel_requested = 0, updated_at = ? "
+                "WHERE job_id = ? AND status = 'failed'",
+                (time.time(), job_id),
+            )
+        return self.get(job_id)
+
+    def cancel_interrupted(self) -> list[IngestionJob]:
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'running' AND cancel_requested = 1",
+            ).fetchall()
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', pages_indexed = 0, patches_stored = 0, updated_at = ? "
+                "WHERE status = 'running' AND cancel_requested = 1",
+                (time.time(),),
+            )
+        return [self.get(row["job_id"]) for row in rows]
+
+    def requeue_interrupted(self) -> int:
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', pages_indexed = 0, patches_stored = 0, updated_at = ? "
+                "WHERE status = 'running'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> IngestionJob:
+        return IngestionJob(
+            job_id=row["job_id"],
+            status=row["status"],
+            doc_id=row["doc_id"],
+            filename=row["filename"],
+            pdf_path=row["pdf_path"],
+            dpi=row["dpi"],
+            max_pages=row["max_pages"],
+            pages_total=row["pages_total"],
+            pages_indexed=row["pages_indexed"],
+            patches_stored=row["patches_stored"],
+            cancel_requested=bool(row["cancel_requested"]),
+            error=row["error"],
+            stage_utilization=json.loads(row["stage_utilization"]),
+            created_at=datetime.fromtimestamp(row["created_at"], tz=UTC),
+            updated_at=datetime.fromtimestamp(row["updated_at"], tz=UTC),
+        )
+
+
+class IngestionWorkerPool:
+    def __init__(
+        self,
+        store: IngestionJobStore,
+        num_workers: int,
+        poll_interval_seconds: float = 1.0,
+        service_factory: Callable[[], Any] = IngestionService,
+    ) -> None:
+        if num_workers <= 0:
+            raise ValueError(f"num_workers must be positive, got {num_workers}")
+
+        self._store = store
+        self._num_workers = num_workers
+        self._poll_interval_seconds = poll_interval_seconds
+        self._service_factory = service_factory
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._running: dict[str, threading.Event] = {}
+        self._running_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+
+        for job in self._store.cancel_interrupted():
+            self._discard(job)
+            logger.info(f"Rolled back ingestion job {job.job_id}, cancelled before a previous shutdown")
+
+        requeued = self._store.requeue_interrupted()
+        if requeued:
+            logger.info(f"Re-queued {requeued} ingestion jobs interrupted by a previous shutdown")
+
+        self._stop.clear()
+        for i in range(self._num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"Started {self._num_workers} ingestion workers")
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info("Stopped ingestion workers")
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def cancel(self, job_id: str) -> IngestionJob | None:
+        previous = self._store.get(job_id)
+        job = self._store.request_cancel(job_id)
+        with self._running_lock:
+            cancel_event = self._running.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+
+        # Queued jobs may be resumes of interrupted runs and failed jobs keep their pages; neither has a worker.
+        if previous is not None and previous.status in ("queued", "failed") and job.status == "cancelled":
+            self._discard(job)
+        return job
+
+    def _discard(self, job: IngestionJob) -> None:
+        try:
+            self._service_factory().discard_partial_document(job.doc_id)
+        except Exception as exc:
+            logger.opt(exception=exc).error(f"Failed to roll back doc_id={job.doc_id} for job {job.job_id}")
+        Path(job.pdf_path).unlink(missing_ok=True)
+
+    def resume(self, job_id: str) -> IngestionJob | None:
+        job = self._store.resume(job_id)
+        if job is not None and job.status == "queued":
+            self.notify()
+        return job
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._store.claim_next()
+            except Exception as exc:
+                logger.opt(exception=exc).error("Failed to claim ingestion job")
+                job = None
+
+            if job is None:
+                self._wake.wait(self._poll_interval_seconds)
+                self._wake.clear()
+                continue
+
+            self._run_job(job)
+
+    def _run_job(self, job: IngestionJob) -> None:
+        cancel_event = threading.Event()
+        with self._running_lock:
+            self._running[job.job_id] = cancel_event
+        if self._store.get(job.job_id).cancel_requested:
+            cancel_event.set()
+
+        service = self._service_factory()
+        keep_upload = False
+        logger.info(f"Running ingestion job {job.job_id} for doc_id={job.doc_id}")
+
+        try:
+            doc_id, pages_indexed, patches_stored = service.ingest_pdf_from_path(
+                Path(job.pdf_path),
+                job.dpi,
+                job.max_pages,
+                job.doc_id,
+                should_cancel=cancel_event.is_set,
+                should_interrupt=self._stop.is_set,
+                on_progress=lambda pages, patches: self._store.update_progress(job.job_id, pages, patches),
+            )
+            status = "skipped" if pages_indexed == 0 and patches_stored == 0 else "completed"
+            self._store.finish(
+                job.job_id,
+                status,
+                pages_indexed=pages_indexed,
+                patches_stored=patches_stored,
+                stage_utilization={stage.name: stage.utilization for stage in service.last_stage_stats},
+            )
+            logger.success(f"Ingestion job {job.job_id} {status}: pages={pages_indexed}, patches={patches_stored}")
+        except IngestionInterruptedError:
+            self._store.requeue(job.job_id)
+            keep_upload = True
+            logger.info(f"Ingestion job {job.job_id} interrupted by shutdown, re-queued")
+        except IngestionCancelledError:
+            self._store.finish(job.job_id, "cancelled")
+            logger.info(f"Ingestion job {job.job_id} cancelled")
+        except Exception as exc:
+            logger.opt(exception=exc).error(f"Ingestion job {job.job_id} failed")
+            progress = self._store.get(job.job_id)
+            self._store.finish(
+                job.job_id,
+                "failed",
+                pages_indexed=progress.pages_indexed,
+                patches_stored=progress.patches_stored,
+                error=str(exc),
+            )
+            keep_upload = True
+        finally:
+            with self._running_lock:
+                self._running.pop(job.job_id, None)
+            if not keep_upload:
+                Path(job.pdf_path).unlink(missing_ok=True)
+
+
+async def enqueue_uploaded_pdf(
+    file: UploadFile,
+    dpi: int = 144,
+    max_pages: int | None = None,
+) -> IngestionJob:
+    if not file.filename:
+        raise ValueError("No filename provided")
+
+    validate_filename(file.filename)
+
+    queue_dir = Path(settings.documents_dir) / JOB_QUEUE_DIRNAME
+    queue_dir.mkdir(parents=True, exist_ok=True)
+
+    job_id = uuid.uuid4().hex
+    pdf_path = queue_dir / f"{job_id}.pdf"
+
+    doc_id, _ = await stream_upload_to_file(
+        file,
+        pdf_path,
+        max_bytes=settings.upload_max_bytes,
+        chunk_bytes=settings.upload_chunk_bytes,
+    )
+
+    try:
+        pages_total = limit_page_count(count_pdf_pages(pdf_path), max_pages)
+        job = get_ingestion_job_store().create(job_id, doc_id, file.filename, pdf_path, dpi, max_pages, pages_total)
+    except Exception:
+        pdf_path.unlink(missing_ok=True)
+        raise
+
+    get_ingestion_worker_pool().notify()
+    logger.info(f"Queued ingestion job {job_id} for doc_id={doc_id}, pages={pages_total}")
+    return job
+
+
+_ingestion_job_store: IngestionJobStore | None = None
+_ingestion_worker_pool: IngestionWorkerPool | None = None
+
+
+def get_ingestion_job_store() -> IngestionJobStore:
+    global _ingestion_job_store
+    if _ingestion_job_store is None:
+        _ingestion_job_store = IngestionJobStore(Path(settings.documents_dir) / JOB_STORE_FILENAME)
+    return _ingestion_job_store
+
+
+def get_ingestion_worker_pool() -> IngestionWorkerPool:
+    global _ingestion_worker_pool
+    if _ingestion_worker_pool is None:
+        _ingestion_worker_pool = IngestionWorkerPool(
+            get_ingestion_job_store(),
+            num_workers=settings.ingest_workers,
+            poll_interval_seconds=settings.ingest_job_poll_seconds,
+        )
+    return _ingestion_worker_pool
@@ -0,0 +1,319 @@
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import torch
+from loguru import logger
+from PIL import Image
+from pydantic import BaseModel
+
+from src.services.embedding_service import EmbeddingService
+from src.services.index_backend import IndexBackend
+from src.services.page_hash_index import PageHashIndex
+from src.utils.embedding_utils import pool_patch_embeddings
+from src.utils.image_utils import hash_page_image
+
+_END = object()
+
+
+class IngestionCancelledError(RuntimeError):
+    pass
+
+
+class IngestionInterruptedError(IngestionCancelledError):
+    pass
+
+
+class StageStats(BaseModel):
+    name: str
+    items: int
+    busy_seconds: float
+    utilization: float
+
+
+class _StageTimer:
+    def __init__(self, name: str, workers: int = 1) -> None:
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def busy(self, items: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(time.perf_counter() - start, items)
+
+    def add(self, busy_seconds: float, items: int) -> None:
+        with self._lock:
+            self.busy_seconds += busy_seconds
+            self.items += items
+
+    def stats(self, wall_seconds: float) -> StageStats:
+        capacity = wall_seconds * self.workers
+        utilization = self.busy_seconds / capacity if capacity > 0 else 0.0
+        return StageStats(
+            name=self.name,
+            items=self.items,
+            busy_seconds=round(self.busy_seconds, 4),
+            utilization=round(min(utilization, 1.0), 4),
+        )
+
+
+class IngestionPipeline:
+    POLL_INTERVAL_SECONDS = 0.1
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        index_backend: IndexBackend,
+        batch_size: int,
+        queue_depth: int,
+        insert_batch_rows: int = 16384,
+        pool_factor: int = 1,
+        page_hash_index: PageHashIndex | None = None,
+        should_cancel: Callable[[], bool] | None = None,
+        on_progress: Callable[[int, int], None] | None = None,
+        on_pages_stored: Callable[[list[int]], None] | None = None,
+    ) -> None:
+        if batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+        if queue_depth <= 0:
+            raise ValueError("Queue depth must be positive")
+        if pool_factor < 1:
+            raise ValueError("Pool factor must be at least 1")
+
+        self._embedding_service = embedding_service
+        self._index_backend = index_backend
+        self._batch_size = batch_size
+        self._queue_depth = queue_depth
+        self._insert_batch_rows = insert_batch_rows
+        self._pool_factor = pool_factor
+        self._page_hash_index = page_hash_index
+        self._page_hashes: dict[int, str] = {}
+        self._should_cancel = should_cancel
+        self._on_progress = on_progress
+        self._on_pages_stored = on_pages_stored
+
+        self._render_timer = _StageTimer("render")
+        self._encode_timer = _StageTimer("encode")
+        self._insert_timer = _StageTimer("insert")
+        self._wall_seconds = 0.0
+
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._total_patches = 0
+        self.pages_indexed = 0
+        self.pages_reused = 0
+        self.patches_encoded = 0
+        self.patches_pooled = 0
+
+    def run(
+        self,
+        doc_id: str,
+        pages: Iterable[tuple[int, Image.Image]],
+    ) -> int:
+        render_queue: queue.Queue[Any] = queue.Queue(maxsize=self._queue_depth)
+        write_queue: queue.Queue[Any] = queue.Queue(maxsize=self._queue_depth)
+
+        start = time.perf_counter()
+
+        render_thread = threading.Thread(
+            target=self._guard,
+            args=(self._render_stage, pages, render_queue),
+            name=f"ingest-render-{doc_id[:8]}",
+            daemon=True,
+        )
+        writer_thread = threading.Thread(
+            target=self._guard,
+            args=(self._insert_stage, doc_id, write_queue),
+            name=f"ingest-writer-{doc_id[:8]}",
+            daemon=True,
+        )
+
+        render_thread.start()
+        writer_thread.start()
+
+        try:
+            self._guard(self._encode_stage, render_queue, write_queue)
+        finally:
+            render_thread.join()
+            writer_thread.join()
+            self._wall_seconds = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+
+        logger.info(
+            "Pipeline stage utilization: "
+            + ", ".join(f"{s.name}={s.utilization:.0%}" for s in self.stage_stats())
+            + f" over {self._wall_seconds:.2f}s"
+            + (f", {self.pages_reused} pages reused" if self.pages_reused else "")
+            + (f", pooled {self.patches_encoded} patches into {self.patches_pooled}" if self._pool_factor > 1 else "")
+        )
+        return self._total_patches
+
+    def stage_stats(self) -> list[StageStats]:
+        return [
+            timer.stats(self._wall_seconds) for timer in (self._render_timer, self._encode_timer, self._insert_timer)
+        ]
+
+    def _guard(self, stage: Callable[..., None], *args: Any) -> None:
+        try:
+            stage(*args)
+        except BaseException as exc:
+            if self._error is None:
+                self._error = exc
+            self._stop.set()
+
+    def _put(self, target: queue.Queue[Any], item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=self.POLL_INTERVAL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue[Any]) -> Any:
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=self.POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _render_stage(
+        self,
+        pages: Iterable[tuple[int, Image.Image]],
+        render_queue: queue.Queue[Any],
+    ) -> None:
+        page_iterator = iter(pages)
+        try:
+            while not self._stop.is_set():
+                if self._should_cancel is not None and self._should_cancel():
+                    raise IngestionCancelledError("Ingestion cancelled")
+
+                start = time.perf_counter()
+                page = next(page_iterator, _END)
+                if page is not _END and self._page_hash_index is not None:
+                    self._page_hashes[page[0]] = hash_page_image(page[1])
+                self._render_timer.add(time.perf_counter() - start, 0 if page is _END else 1)
+                if page is _END:
+                    break
+                if not self._put(render_queue, page):
+                    return
+        finally:
+            close = getattr(page_iterator, "close", None)
+            if close is not None:
+                close()
+
+        self._put(render_queue, _END)
+
+    def _encode_stage(self, render_queue: queue.Queue[Any], write_queue: queue.Queue[Any]) -> None:
+        finished = False
+
+        while not finished:
+            batch: list[tuple[int, Image.Image]] = []
+            while len(batch) < self._batch_size:
+                item = self._get(render_queue)
+                if item is _END:
+                    finished = True
+                    break
+                batch.append(item)
+
+            if self._stop.is_set():
+                return
+
+            if batch:
+                reused = self._reuse_embeddings(batch) if self._page_hash_index is not None else {}
+                to_encode = [(page_number, image) for page_number, image in batch if page_number not in reused]
+
+                encoded: dict[int, torch.Tensor] = {}
+                if to_encode:
+                    with self._encode_timer.busy(len(to_encode)):
+                        page_embeddings = self._embedding_service.encode_page_images([image for _, image in to_encode])
+                        self.patches_encoded += sum(emb.shape[0] for emb in page_embeddings)
+                        if self._pool_factor > 1:
+                            page_embeddings = [pool_patch_embeddings(emb, self._pool_factor) for emb in page_embeddings]
+                            self.patches_pooled += sum(emb.shape[0] for emb in page_embeddings)
+                    encoded = {
+                        page_number: emb for (page_number, _), emb in zip(to_encode, page_embeddings, strict=True)
+                    }
+
+                for page_number, _ in batch:
+                    embeddings = reused[page_number] if page_number in reused else encoded[page_number]
+                    if not self._put(write_queue, (page_number, embeddings)):
+                        return
+
+        self._put(write_queue, _END)
+
+    def _reuse_embeddings(self, batch: list[tuple[int, Image.Image]]) -> dict[int, torch.Tensor]:
+        page_hashes = {page_number: self._page_hashes[page_number] for page_number, _ in batch}
+        sources = self._page_hash_index.lookup(list(set(page_hashes.values())))
+        if not sources:
+            return {}
+
+        stored = self._index_backend.get_page_embeddings(list(set(sources.values())))
+
+        reused = {}
+        for page_number, page_hash in page_hashes.items():
+            source = sources.get(page_hash)
+            if source is None:
+                continue
+
+            embeddings = stored.get(source)
+            if embeddings is None:
+                logger.warning(f"Page hash source {source} is missing from the index, re-encoding")
+                self._page_hash_index.discard(*source)
+                continue
+
+            reused[page_number] = torch.from_numpy(embeddings)
+
+        if reused:
+            self.pages_reused += len(reused)
+            logger.debug(f"Reused stored embeddings for pages {sorted(reused)}")
+        return reused
+
+    def _insert_stage(self, doc_id: str, write_queue: queue.Queue[Any]) -> None:
+        buffered: list[tuple[int, torch.Tensor]] = []
+        buffered_rows = 0
+
+        while True:
+            item = self._get(write_queue)
+            if item is _END:
+                break
+
+            buffered.append(item)
+            buffered_rows += item[1].shape[0]
+
+            if buffered_rows >= self._insert_batch_rows:
+                self._flush_pages(doc_id, buffered)
+                buffered, buffered_rows = [], 0
+
+        if buffered and not self._stop.is_set():
+            self._flush_pages(doc_id, buffered)
+
+    def _flush_pages(self, doc_id: str, pages: list[tuple[int, torch.Tensor]]) -> None:
+        with self._insert_timer.busy(len(pages)):
+            num_patches = self._index_backend.insert_pages(doc_id, pages)
+
+        if self._page_hash_index is not None:
+            self._page_hash_index.add(
+                doc_id, [(page_number, self._page_hashes[page_number]) for page_number, _ in pages]
+            )
+
+        if self._on_pages_stored is not None:
+            self._on_pages_stored([page_number for page_number, _ in pages])
+
+        self._total_patches += num_patches
+        self.pages_indexed += len(pages)
+        if self._on_progress is not None:
+            self._on_progress(self.pages_indexed, self._total_patches)
+        logger.debug(f"Pages {pages[0][0]}-{pages[-1][0]}: stored {num_patches} patches")
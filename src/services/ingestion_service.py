@@ -1,24 +1,44 @@
+import threading
+from collections.abc import Callable, Iterable
+from functools import partial
 from pathlib import Path
-import asyncio
 
-from fastapi import UploadFile
 from loguru import logger
 from PIL import Image
 
-from src.models.document import validate_filename
+from src.core.config import settings
+from src.services.document_catalog import DocumentCatalog, get_document_catalog
 from src.services.embedding_service import EmbeddingService, get_embedding_service
-from src.services.milvus_service import MilvusService, get_milvus_service
-from src.services.pdf_processor import convert_pdf_to_images, generate_doc_id
+from src.services.index_backend import IndexBackend, get_index_backend
+from src.services.ingestion_pipeline import (
+    IngestionCancelledError,
+    IngestionInterruptedError,
+    IngestionPipeline,
+    StageStats,
+)
+from src.services.page_hash_index import PageHashIndex, get_page_hash_index
+from src.services.pdf_processor import generate_doc_id, iter_pdf_pages
+
+PARTIAL_INGEST_STATUSES = ("in_progress", "partial")
+
+_active_doc_ids: set[str] = set()
+_active_doc_ids_lock = threading.Lock()
 
 
 class IngestionService:
     def __init__(
         self,
         embedding_service: EmbeddingService | None = None,
-        milvus_service: MilvusService | None = None,
+        milvus_service: IndexBackend | None = None,
+        document_catalog: DocumentCatalog | None = None,
+        page_hash_index: PageHashIndex | None = None,
     ) -> None:
         self._embedding_service = embedding_service
         self._milvus_service = milvus_service
+        self._document_catalog = document_catalog
+        self._page_hash_index = page_hash_index
+        self.last_stage_stats: list[StageStats] = []
+        self.last_pages_indexed = 0
 
     @property
     def embedding_service(self) -> EmbeddingService:
@@ -27,125 +47,201 @@ class IngestionService:
         return self._embedding_service
 
     @property
-    def milvus_service(self) -> MilvusService:
+    def milvus_service(self) -> IndexBackend:
         if self._milvus_service is None:
-            self._milvus_service = get_milvus_service()
+            self._milvus_service = get_index_backend()
         return self._milvus_service
 
+    @property
+    def document_catalog(self) -> DocumentCatalog:
+        if self._document_catalog is None:
+            self._document_catalog = get_document_catalog(settings.documents_dir)
+        return self._document_catalog
+
+    @property
+    def page_hash_index(self) -> PageHashIndex | None:
+        if self._page_hash_index is None:
+            self._page_hash_index = get_page_hash_index()
+        return self._page_hash_index
+
+    def document_state(self, doc_id: str) -> str:
+        status = self.document_catalog.get_ingest_status(doc_id)
+        if status in PARTIAL_INGEST_STATUSES:
+            return "partial"
+        if self.milvus_service.document_exists(doc_id):
+            return "complete"
+        return "absent"
+
     def ingest_pdf_from_path(
         self,
         pdf_path: Path,
         dpi: int = 144,
         max_pages: int | None = None,
+        doc_id: str | None = None,
+        should_cancel: Callable[[], bool] | None = None,
+        on_progress: Callable[[int, int], None] | None = None,
+        should_interrupt: Callable[[], bool] | None = None,
     ) -> tuple[str, int, int]:
         if not pdf_path.exists():
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
-        doc_id = generate_doc_id(pdf_path)
-
-        if self.milvus_service.document_exists(doc_id):
-            logger.info(f"Document already exists with doc_id={doc_id}, skipping ingestion")
-            return doc_id, 0, 0
+        if doc_id is None:
+            doc_id = generate_doc_id(pdf_path)
 
-        logger.info(f"Starting ingestion for doc_id={doc_id}, path={pdf_path}")
+        with _active_doc_ids_lock:
+            if doc_id in _active_doc_ids:
+                raise ValueError(f"Document {doc_id} is already being ingested")
+            _active_doc_ids.add(doc_id)
 
-        images = convert_pdf_to_images(pdf_path, dpi=dpi)
-
-        if max_pages is not None and max_pages > 0:
-            images = images[:max_pages]
-
-        pages_indexed = len(images)
-
-        total_patches = self._process_and_store_pages_atomic(doc_id, images)
-
-        logger.success(f"Ingestion complete: doc_id={doc_id}, pages={pages_indexed}, patches={total_patches}")
-
-        return doc_id, pages_indexed, total_patches
+        try:
+            return self._ingest_document(pdf_path, doc_id, dpi, max_pages, should_cancel, should_interrupt, on_progress)
+        finally:
+            with _active_doc_ids_lock:
+                _active_doc_ids.discard(doc_id)
 
-    def _process_and_store_pages_atomic(
+    def _ingest_document(
         self,
+        pdf_path: Path,
         doc_id: str,
-        images: list[tuple[int, Image.Image]],
-    ) -> int:
-        total_patches = 0
+        dpi: int,
+        max_pages: int | None,
+        should_cancel: Callable[[], bool] | None,
+        should_interrupt: Callable[[], bool] | None,
+        on_progress: Callable[[int, int], None] | None,
+    ) -> tuple[str, int, int]:
+        state = self.document_state(doc_id)
+        if state == "complete":
+            logger.info(f"Document already exists with doc_id={doc_id}, skipping ingestion")
+            return doc_id, 0, 0
 
+        completed_pages: set[int] = set()
+        if state == "partial":
+            completed_pages = self.document_catalog.get_ingested_pages(doc_id)
+            self.milvus_service.delete_document(doc_id, except_pages=completed_pages)
+            logger.info(f"Resuming ingestion for doc_id={doc_id}, {len(completed_pages)} pages already stored")
+        else:
+            self.document_catalog.clear_ingested_pages(doc_id)
+            logger.info(f"Starting ingestion for doc_id={doc_id}, path={pdf_path}")
+
+        # MaxSim sums one best match per query token, so pooled and unpooled pages score on different scales.
+        pool_factor = settings.ingest_token_pool_factor
+        stored_factors = self.document_catalog.get_pool_factors() - {pool_factor}
+        if stored_factors:
+            raise ValueError(
+                f"Index holds pages pooled with factor {sorted(stored_factors)}, "
+                f"but INGEST_TOKEN_POOL_FACTOR={pool_factor}; re-ingest those documents before changing it"
+            )
+
+        def report_progress(pages_indexed: int, patches_stored: int) -> None:
+            if on_progress is not None:
+                on_progress(len(completed_pages) + pages_indexed, patches_stored)
+
+        def cancel_requested() -> bool:
+            return should_cancel is not None and should_cancel()
+
+        def stop_requested() -> bool:
+            return cancel_requested() or (should_interrupt is not None and should_interrupt())
+
+        self.document_catalog.set_ingest_status(doc_id, "in_progress")
         try:
-            for page_number, image in images:
-                patches_stored = self._process_single_page(doc_id, page_number, image)
-                total_patches += patches_stored
-                logger.debug(f"Page {page_number}: stored {patches_stored} patches")
+            pages = iter_pdf_pages(
+                pdf_path,
+                dpi=dpi,
+                max_pages=max_pages,
+                workers=settings.ingest_render_workers,
+                skip_pages=completed_pages,
+            )
+            total_patches = self._process_and_store_pages(
+                doc_id,
+                pages,
+                should_cancel=stop_requested,
+                on_progress=report_progress,
+                on_pages_stored=partial(self.document_catalog.record_ingested_pages, doc_id, pool_factor=pool_factor),
+            )
+        except IngestionCancelledError as exc:
+            if not cancel_requested():
+                self.document_catalog.set_ingest_status(doc_id, "partial")
+                raise IngestionInterruptedError(f"Ingestion of doc_id={doc_id} interrupted") from exc
+
+            logger.info(f"Ingestion cancelled, rolling back doc_id={doc_id}")
+            self._cancel_document(doc_id)
+            raise
         except Exception:
-            logger.error(f"Ingestion failed at page processing, rolling back doc_id={doc_id}")
-            self._rollback(doc_id)
+            self.document_catalog.set_ingest_status(doc_id, "partial")
             raise
 
-        return total_patches
+        self.document_catalog.set_ingest_status(doc_id, "completed")
+
+        page_count = len(completed_pages) + self.last_pages_indexed
+        logger.success(f"Ingestion complete: doc_id={doc_id}, pages={page_count}, patches={total_patches}")
 
-    def _process_single_page(
+        return doc_id, page_count, total_patches
+
+    def _process_and_store_pages(
         self,
         doc_id: str,
-        page_number: int,
-        image: Image.Image,
+        pages: Iterable[tuple[int, Image.Image]],
+        should_cancel: Callable[[], bool] | None = None,
+        on_progress: Callable[[int, int], None] | None = None,
+        on_pages_stored: Callable[[list[int]], None] | None = None,
     ) -> int:
-        embeddings = self.embedding_service.encode_images([image])
-        page_embeddings = embeddings[0]
+        pipeline = IngestionPipeline(
+            embedding_service=self.embedding_service,
+            index_backend=self.milvus_service,
+            batch_size=max(1, settings.colqwen2_batch_size),
+            queue_depth=settings.ingest_queue_depth,
+            insert_batch_rows=settings.milvus_insert_batch_rows,
+            pool_factor=settings.ingest_token_pool_factor,
+            page_hash_index=self.page_hash_index,
+            should_cancel=should_cancel,
+            on_progress=on_progress,
+            on_pages_stored=on_pages_stored,
+        )
 
-        num_patches = page_embeddings.shape[0]
+        try:
+            return pipeline.run(doc_id, pages)
+        except IngestionCancelledError:
+            raise
+        except Exception:
+            logger.error(
+                f"Ingestion failed for doc_id={doc_id} after {pipeline.pages_indexed} stored pages; "
+                "stored pages are kept and the next ingest of this document resumes"
+            )
+            raise
+        finally:
+            self.last_stage_stats = pipeline.stage_stats()
+            self.last_pages_indexed = pipeline.pages_indexed
 
-        self.milvus_service.insert_page_embeddings(
-            doc_id=doc_id,
-            page_number=page_number,
-            embeddings=page_embeddings,
-        )
+    def discard_partial_document(self, doc_id: str) -> bool:
+        with _active_doc_ids_lock:
+            if doc_id in _active_doc_ids:
+                return False
+            _active_doc_ids.add(doc_id)
 
-        return num_patches
+        try:
+            if self.document_state(doc_id) != "partial":
+                return False
+            logger.info(f"Rolling back partially ingested doc_id={doc_id}")
+            self._cancel_document(doc_id)
+            return True
+        finally:
+            with _active_doc_ids_lock:
+                _active_doc_ids.discard(doc_id)
+
+    def _cancel_document(self, doc_id: str) -> None:
+        self._rollback(doc_id)
+        self.document_catalog.clear_ingested_pages(doc_id)
+        self.document_catalog.set_ingest_status(doc_id, "cancelled")
 
     def _rollback(self, doc_id: str) -> None:
         try:
+            if self.page_hash_index is not None:
+                self.page_hash_index.remove_document(doc_id)
             deleted = self.milvus_service.delete_document(doc_id)
             logger.info(f"Rollback complete: deleted {deleted} patches for doc_id={doc_id}")
         except Exception as e:
             logger.error(f"Rollback failed for doc_id={doc_id}: {e}")
 
 
-async def save_upload_to_temp(file: UploadFile, temp_dir: Path) -> Path:
-    if not file.filename:
-        raise ValueError("No filename provided")
-
-    validate_filename(file.filename)
-
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    temp_path = temp_dir / f"ingest_{file.filename}"
-
-    content = await file.read()
-    with open(temp_path, "wb") as f:
-        f.write(content)
-
-    logger.debug(f"Saved upload to temp: {temp_path}")
-    return temp_path
-
-
-async def ingest_uploaded_pdf(
-    file: UploadFile,
-    temp_dir: Path,
-    dpi: int = 144,
-    max_pages: int | None = None,
-) -> tuple[str, int, int]:
-    temp_path = await save_upload_to_temp(file, temp_dir)
-
-    try:
-        service = IngestionService()
-        return await asyncio.to_thread(
-            service.ingest_pdf_from_path,
-            temp_path,
-            dpi,
-            max_pages,
-        )
-    finally:
-        if temp_path.exists():
-            temp_path.unlink()
-            logger.debug(f"Cleaned up temp file: {temp_path}")
-
-
 def get_ingestion_service() -> IngestionService:
     return IngestionService()
@@ -1,18 +1,54 @@
+import math
+import time
+from collections.abc import Callable, Collection
 from typing import Any
 
+import numpy as np
 import torch
 from loguru import logger
 from pymilvus import DataType, MilvusClient
 
 from src.core.config import settings
+from src.services.patch_vector_store import PatchVectorStore, get_patch_vector_store
+from src.utils.embedding_utils import (
+    binarize_embeddings,
+    hamming_to_similarity,
+    pool_patch_embeddings,
+    stack_page_embeddings,
+)
+from src.utils.scoring_utils import maxsim_scores
 
 
 class MilvusService:
     EMBEDDING_DIM = 128
     MAX_PATCHES_PER_PAGE = 1030
+    QUERY_RESULT_LIMIT = 16384
 
-    def __init__(self) -> None:
+    CONSISTENCY_LEVELS = ("Strong", "Session", "Bounded", "Eventually")
+    VECTOR_TYPES = ("float", "binary")
+
+    def __init__(self, vector_store: PatchVectorStore | None = None) -> None:
         self._client: MilvusClient | None = None
+        self._last_write_at: float | None = None
+        self._vector_store = vector_store
+        self._vector_type_checked = False
+
+    @property
+    def binary_vectors(self) -> bool:
+        vector_type = settings.milvus_vector_type
+        if vector_type not in self.VECTOR_TYPES:
+            raise ValueError(f"Unknown Milvus vector type: {vector_type}")
+        return vector_type == "binary"
+
+    @property
+    def summary_collection_name(self) -> str:
+        return f"{settings.milvus_collection_name}_pages"
+
+    @property
+    def vector_store(self) -> PatchVectorStore:
+        if self._vector_store is None:
+            self._vector_store = get_patch_vector_store()
+        return self._vector_store
 
     def _get_client(self) -> MilvusClient:
         if self._client is None:
@@ -21,9 +57,47 @@ class MilvusService:
             logger.info(f"Connected to Milvus at {uri}")
         return self._client
 
+    def _record_write(self) -> None:
+        self._last_write_at = time.monotonic()
+
+    def _read_consistency_level(self) -> str:
+        level = settings.milvus_consistency_level
+        if level not in self.CONSISTENCY_LEVELS:
+            raise ValueError(f"Unknown Milvus consistency level: {level}")
+
+        # Only writes made through this process are tracked: another API replica or worker process writing to the
+        # same collection does not shorten its reads here, and those reads see its writes after the level's bound.
+        recently_written = (
+            self._last_write_at is not None
+            and time.monotonic() - self._last_write_at < settings.milvus_read_your_writes_seconds
+        )
+        if level in ("Bounded", "Eventually") and recently_written:
+            return "Session"
+
+        return level
+
     def _ensure_collection(self) -> None:
-        client = self._get_client()
+        self._ensure_named_collection(settings.milvus_collection_name, self._create_collection)
+        if not self._vector_type_checked:
+            self._check_vector_type()
+            self._vector_type_checked = True
+        if settings.milvus_page_summary_enabled:
+            self._ensure_named_collection(self.summary_collection_name, self._create_summary_collection)
+
+    def _check_vector_type(self) -> None:
         collection_name = settings.milvus_collection_name
+        fields = self._get_client().describe_collection(collection_name)["fields"]
+        stored = DataType(next(field["type"] for field in fields if field["name"] == "embedding"))
+        expected = DataType.BINARY_VECTOR if self.binary_vectors else DataType.FLOAT_VECTOR
+
+        if stored != expected:
+            raise ValueError(
+                f"Collection {collection_name} stores {stored.name} embeddings but "
+                f"MILVUS_VECTOR_TYPE={settings.milvus_vector_type}; drop it or set a new MILVUS_COLLECTION_NAME"
+            )
+
+    def _ensure_named_collection(self, collection_name: str, create: Callable[[], None]) -> None:
+        client = self._get_client()
 
         if client.has_collection(collection_name):
             logger.info(f"Collection {collection_name} already exists")
@@ -35,7 +109,7 @@ class MilvusService:
                 logger.info(f"Collection {collection_name} already loaded")
             return
 
-        self._create_collection()
+        create()
 
     def _create_collection(self) -> None:
         client = self._get_client()
@@ -63,11 +137,15 @@ class MilvusService:
         )
         schema.add_field(
             field_name="embedding",
-            datatype=DataType.FLOAT_VECTOR,
+            datatype=DataType.BINARY_VECTOR if self.binary_vectors else DataType.FLOAT_VECTOR,
             dim=self.EMBEDDING_DIM,
         )
 
-        client.create_collection(collection_name=collection_name, schema=schema)
+        client.create_collection(
+            collection_name=collection_name,
+            schema=schema,
+            consistency_level=settings.milvus_consistency_level,
+        )
         logger.info(f"Created collection: {collection_name}")
 
         self._create_indexes()
@@ -78,12 +156,20 @@ class MilvusService:
 
         index_params = client.prepare_index_params()
 
-        index_params.add_index(
-            field_name="embedding",
-            index_type="HNSW",
-            metric_type="IP",
-            params={"M": 16, "efConstruction": 256},
-        )
+        if self.binary_vectors:
+            index_params.add_index(
+                field_name="embedding",
+                index_type="BIN_IVF_FLAT",
+                metric_type="HAMMING",
+                params={"nlist": settings.milvus_binary_nlist},
+            )
+        else:
+            index_params.add_index(
+                field_name="embedding",
+                index_type="HNSW",
+                metric_type="IP",
+                params={"M": 16, "efConstruction": 256},
+            )
 
         index_params.add_index(
             field_name="doc_id",
@@ -91,115 +177,373 @@ class MilvusService:
         )
 
         client.create_index(collection_name=collection_name, index_params=index_params)
-        logger.info("Created HNSW index on embedding")
+        logger.info(f"Created {'BIN_IVF_FLAT' if self.binary_vectors else 'HNSW'} index on embedding")
 
         client.load_collection(collection_name=collection_name)
         logger.info(f"Loaded collection: {collection_name}")
 
+    def _create_summary_collection(self) -> None:
+        client = self._get_client()
+        collection_name = self.summary_collection_name
+
+        schema = client.create_schema(auto_id=True, enable_dynamic_fields=False)
+        schema.add_field(field_name="summary_id", datatype=DataType.INT64, is_primary=True)
+        schema.add_field(field_name="doc_id", datatype=DataType.VARCHAR, max_length=64)
+        schema.add_field(field_name="page_number", datatype=DataType.INT32)
+        schema.add_field(field_name="embedding", datatype=DataType.FLOAT_VECTOR, dim=self.EMBEDDING_DIM)
+
+        client.create_collection(
+            collection_name=collection_name,
+            schema=schema,
+            consistency_level=settings.milvus_consistency_level,
+        )
+
+        index_params = client.prepare_index_params()
+        index_params.add_index(
+            field_name="embedding",
+            index_type="HNSW",
+            metric_type="IP",
+            params={"M": 16, "efConstruction": 256},
+        )
+        index_params.add_index(field_name="doc_id", index_type="Trie")
+        client.create_index(collection_name=collection_name, index_params=index_params)
+
+        client.load_collection(collection_name=collection_name)
+        logger.info(f"Created and loaded page summary collection: {collection_name}")
+
     def insert_page_embeddings(
         self,
         doc_id: str,
         page_number: int,
         embeddings: torch.Tensor,
     ) -> int:
-        self._ensure_collection()
-        client = self._get_client()
-
-        if embeddings.dim() != 2:
-            raise ValueError(f"Expected 2D tensor, got {embeddings.dim()}D")
-
-        num_patches = embeddings.shape[0]
-        embedding_dim = embeddings.shape[1]
+        embedding_matrix, page_numbers, patch_indexes = stack_page_embeddings(
+            [(page_number, embeddings)],
+            max_patches_per_page=self.MAX_PATCHES_PER_PAGE,
+            embedding_dim=self.EMBEDDING_DIM,
+        )
+        return self.insert_patches(doc_id, embedding_matrix, page_numbers, patch_indexes)
 
-        if embedding_dim != self.EMBEDDING_DIM:
-            raise ValueError(f"Expected embedding dim {self.EMBEDDING_DIM}, got {embedding_dim}")
+    def insert_pages(
+        self,
+        doc_id: str,
+        pages: list[tuple[int, torch.Tensor]],
+    ) -> int:
+        embedding_matrix, page_numbers, patch_indexes = stack_page_embeddings(
+            pages,
+            max_patches_per_page=self.MAX_PATCHES_PER_PAGE,
+            embedding_dim=self.EMBEDDING_DIM,
+        )
+        return self.insert_patches(doc_id, embedding_matrix, page_numbers, patch_indexes)
 
-        if num_patches > self.MAX_PATCHES_PER_PAGE:
-            logger.warning(f"Truncating patches from {num_patches} to {self.MAX_PATCHES_PER_PAGE}")
-            embeddings = embeddings[: self.MAX_PATCHES_PER_PAGE]
-            num_patches = self.MAX_PATCHES_PER_PAGE
+    def insert_patches(
+        self,
+        doc_id: str,
+        embeddings: np.ndarray,
+        page_numbers: np.ndarray,
+        patch_indexes: np.ndarray,
+    ) -> int:
+        self._ensure_collection()
+        client = self._get_client()
 
-        embeddings_list = embeddings.cpu().float().numpy().tolist()
+        if embeddings.ndim != 2:
+            raise ValueError(f"Expected 2D embedding matrix, got {embeddings.ndim}D")
 
-        data = [
-            {
-                "doc_id": doc_id,
-                "page_number": page_number,
-                "patch_index": i,
-                "embedding": emb,
-            }
-            for i, emb in enumerate(embeddings_list)
-        ]
+        if embeddings.shape[1] != self.EMBEDDING_DIM:
+            raise ValueError(f"Expected embedding dim {self.EMBEDDING_DIM}, got {embeddings.shape[1]}")
 
-        client.insert(collection_name=settings.milvus_collection_name, data=data)
-        logger.info(f"Inserted {num_patches} patches for doc={doc_id}, page={page_number}")
+        num_patches = embeddings.shape[0]
+        if len(page_numbers) != num_patches or len(patch_indexes) != num_patches:
+            raise ValueError("Embedding, page_number and patch_index columns must have the same length")
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        batch_rows = max(1, settings.milvus_insert_batch_rows)
+
+        vectors: np.ndarray | list[bytes] = embeddings
+        if self.binary_vectors:
+            self.vector_store.add_pages(doc_id, self._split_pages(embeddings, page_numbers, patch_indexes))
+            vectors = [row.tobytes() for row in binarize_embeddings(embeddings)]
+
+        # MilvusClient.insert only takes row dicts and pymilvus calls .tolist() on every float32 row; its column
+        # path (Collection.insert) flattens to a Python float list as well. Stacking pages into one matrix saves
+        # insert round trips, not the float conversion.
+        for start in range(0, num_patches, batch_rows):
+            end = start + batch_rows
+            data = [
+                {
+                    "doc_id": doc_id,
+                    "page_number": page_number,
+                    "patch_index": patch_index,
+                    "embedding": embedding,
+                }
+                for page_number, patch_index, embedding in zip(
+                    page_numbers[start:end].tolist(),
+                    patch_indexes[start:end].tolist(),
+                    vectors[start:end],
+                    strict=True,
+                )
+            ]
+            client.insert(collection_name=settings.milvus_collection_name, data=data)
+            self._record_write()
+
+        if settings.milvus_page_summary_enabled:
+            self._insert_page_summaries(client, doc_id, self._split_pages(embeddings, page_numbers, patch_indexes))
+
+        num_pages = len(np.unique(page_numbers))
+        logger.info(f"Inserted {num_patches} patches across {num_pages} pages for doc={doc_id}")
 
         return num_patches
 
+    def _insert_page_summaries(
+        self,
+        client: MilvusClient,
+        doc_id: str,
+        pages: list[tuple[int, np.ndarray]],
+    ) -> None:
+        vectors_per_page = max(1, settings.milvus_page_summary_vectors)
+        data = []
+        for page_number, page_embeddings in pages:
+            pool_factor = max(1, math.ceil(len(page_embeddings) / vectors_per_page))
+            summary = pool_patch_embeddings(torch.from_numpy(page_embeddings), pool_factor).numpy()
+            data.extend({"doc_id": doc_id, "page_number": page_number, "embedding": embedding} for embedding in summary)
+
+        if data:
+            client.insert(collection_name=self.summary_collection_name, data=data)
+            self._record_write()
+            logger.debug(f"Inserted {len(data)} page summary vectors for doc={doc_id}")
+
+    @staticmethod
+    def _split_pages(
+        embeddings: np.ndarray,
+        page_numbers: np.ndarray,
+        patch_indexes: np.ndarray,
+    ) -> list[tuple[int, np.ndarray]]:
+        pages = []
+        for page_number in np.unique(page_numbers):
+            rows = np.flatnonzero(page_numbers == page_number)
+            rows = rows[np.argsort(patch_indexes[rows], kind="stable")]
+            pages.append((int(page_number), embeddings[rows]))
+        return pages
+
     def search_pages(
         self,
         query_embeddings: torch.Tensor,
         top_k: int = 10,
         doc_id_filter: str | None = None,
+        rerank_candidates: int = 0,
     ) -> list[dict[str, Any]]:
         self._ensure_collection()
         client = self._get_client()
 
-        try:
-            client.flush(collection_name=settings.milvus_collection_name)
-        except Exception as exc:
-            logger.opt(exception=exc).error("Flush failed during search")
-
         if query_embeddings.dim() == 1:
             query_embeddings = query_embeddings.unsqueeze(0)
 
-        query_list = query_embeddings.cpu().float().numpy().tolist()
-
-        search_params = {
-            "metric_type": "IP",
-            "params": {"ef": 128},
-        }
+        query_vectors = query_embeddings.cpu().float().numpy()
 
         expr = None
         if doc_id_filter:
             expr = f'doc_id == "{doc_id_filter}"'
 
-        page_scores: dict[tuple[str, int], float] = {}
+        if settings.milvus_page_summary_enabled:
+            candidate_pages = self._coarse_candidate_pages(client, query_vectors, expr)
+            if candidate_pages:
+                expr = self._pages_filter(candidate_pages)
+            else:
+                logger.warning("Page summary search found no candidates, searching all patches")
 
-        for query_vector in query_list:
+        token_hits = self._search_token_hits(client, query_vectors, expr)
+        page_scores = self._aggregate_page_scores(token_hits, self.EMBEDDING_DIM if self.binary_vectors else None)
+
+        aggregated = [
+            {"doc_id": doc_id, "page_number": page_number, "score": score}
+            for (doc_id, page_number), score in page_scores.items()
+        ]
+        aggregated.sort(key=lambda x: x["score"], reverse=True)
+
+        if self.binary_vectors:
+            rerank_candidates = max(rerank_candidates, settings.milvus_binary_rescore_candidates)
+
+        if rerank_candidates > 0:
+            candidates = aggregated[: max(rerank_candidates, top_k)]
+            aggregated = self._rerank_exact(query_embeddings, candidates)
+
+        matches = aggregated[:top_k]
+        logger.info(f"Search returned {len(matches)} page results")
+        return matches
+
+    def _search_token_hits(
+        self,
+        client: MilvusClient,
+        query_vectors: np.ndarray,
+        expr: str | None,
+        limit: int = 100,
+    ) -> list[list[dict[str, Any]]]:
+        if self.binary_vectors:
+            search_params = {
+                "metric_type": "HAMMING",
+                "params": {"nprobe": settings.milvus_binary_nprobe},
+            }
+            search_data: np.ndarray | list[bytes] = [row.tobytes() for row in binarize_embeddings(query_vectors)]
+        else:
+            search_params = {
+                "metric_type": "IP",
+                "params": {"ef": 128},
+            }
+            search_data = query_vectors
+
+        batch_size = max(1, settings.milvus_search_batch_size)
+        token_hits: list[list[dict[str, Any]]] = []
+
+        for start in range(0, len(search_data), batch_size):
+            batch = search_data[start : start + batch_size]
             results = client.search(
                 collection_name=settings.milvus_collection_name,
-                data=[query_vector],
+                data=batch.tolist() if isinstance(batch, np.ndarray) else batch,
+                anns_field="embedding",
+                search_params=search_params,
+                limit=limit,
+                filter=expr,
+                output_fields=["doc_id", "page_number"],
+                consistency_level=self._read_consistency_level(),
+            )
+            token_hits.extend(results)
+
+        logger.debug(f"Searched {len(query_vectors)} query tokens with batch size {batch_size}")
+        return token_hits
+
+    def _coarse_candidate_pages(
+        self,
+        client: MilvusClient,
+        query_vectors: np.ndarray,
+        expr: str | None,
+    ) -> list[tuple[str, int]]:
+        limit = max(1, min(settings.milvus_page_summary_candidates, self.QUERY_RESULT_LIMIT))
+        search_params = {
+            "metric_type": "IP",
+            "params": {"ef": max(128, limit)},
+        }
+
+        batch_size = max(1, settings.milvus_search_batch_size)
+        token_hits: list[list[dict[str, Any]]] = []
+
+        for start in range(0, len(query_vectors), batch_size):
+            results = client.search(
+                collection_name=self.summary_collection_name,
+                data=query_vectors[start : start + batch_size].tolist(),
                 anns_field="embedding",
                 search_params=search_params,
-                limit=100,
+                limit=limit,
                 filter=expr,
                 output_fields=["doc_id", "page_number"],
+                consistency_level=self._read_consistency_level(),
             )
+            token_hits.extend(results)
 
+        page_scores = self._aggregate_page_scores(token_hits)
+        candidates = sorted(page_scores, key=page_scores.__getitem__, reverse=True)[:limit]
+
+        logger.debug(f"Page summary search selected {len(candidates)} candidate pages")
+        return candidates
+
+    @staticmethod
+    def _aggregate_page_scores(
+        token_hits: list[list[dict[str, Any]]],
+        hamming_dim: int | None = None,
+    ) -> dict[tuple[str, int], float]:
+        page_scores: dict[tuple[str, int], float] = {}
+
+        for hits in token_hits:
             token_page_max: dict[tuple[str, int], float] = {}
-            for hits in results:
-                for hit in hits:
-                    doc_id = hit["entity"].get("doc_id")
-                    page_number = hit["entity"].get("page_number")
-                    score = hit["distance"]
-                    key = (doc_id, page_number)
+            for hit in hits:
+                doc_id = hit["entity"].get("doc_id")
+                page_number = hit["entity"].get("page_number")
+                score = hit["distance"]
+                if hamming_dim is not None:
+                    score = hamming_to_similarity(score, hamming_dim)
+                key = (doc_id, page_number)
 
-                    if score > token_page_max.get(key, float("-inf")):
-                        token_page_max[key] = score
+                if score > token_page_max.get(key, float("-inf")):
+                    token_page_max[key] = score
 
             for key, score in token_page_max.items():
                 page_scores[key] = page_scores.get(key, 0.0) + score
 
-        aggregated = [
-            {"doc_id": doc_id, "page_number": page_number, "score": score}
-            for (doc_id, page_number), score in page_scores.items()
+        return page_scores
+
+    def _rerank_exact(
+        self,
+        query_embeddings: torch.Tensor,
+        candidates: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        if not candidates:
+            return candidates
+
+        pages = [(c["doc_id"], c["page_number"]) for c in candidates]
+        page_embeddings = self.get_page_embeddings(pages)
+
+        scored_pages = [page for page in pages if page in page_embeddings]
+        if not scored_pages:
+            logger.warning("No patch vectors found for candidate pages, keeping ANN scores")
+            return candidates
+
+        doc_embeddings = torch.from_numpy(np.concatenate([page_embeddings[page] for page in scored_pages]))
+        page_index = torch.cat(
+            [torch.full((len(page_embeddings[page]),), i, dtype=torch.long) for i, page in enumerate(scored_pages)]
+        )
+
+        scores = maxsim_scores(query_embeddings.cpu().float(), doc_embeddings, page_index, len(scored_pages))
+
+        reranked = [
+            {"doc_id": doc_id, "page_number": page_number, "score": float(score)}
+            for (doc_id, page_number), score in zip(scored_pages, scores.tolist(), strict=True)
         ]
-        aggregated.sort(key=lambda x: x["score"], reverse=True)
+        reranked.sort(key=lambda x: x["score"], reverse=True)
 
-        matches = aggregated[:top_k]
-        logger.info(f"Search returned {len(matches)} page results")
-        return matches
+        logger.debug(f"Re-ranked {len(reranked)} candidate pages with exact MaxSim")
+        return reranked
+
+    def get_page_embeddings(self, pages: list[tuple[str, int]]) -> dict[tuple[str, int], np.ndarray]:
+        if self.binary_vectors:
+            return self.vector_store.get_pages(pages)
+
+        self._ensure_collection()
+        client = self._get_client()
+
+        pages_per_query = max(1, self.QUERY_RESULT_LIMIT // self.MAX_PATCHES_PER_PAGE)
+        rows_by_page: dict[tuple[str, int], list[tuple[int, list[float]]]] = {}
+
+        for start in range(0, len(pages), pages_per_query):
+            chunk = pages[start : start + pages_per_query]
+            results = client.query(
+                collection_name=settings.milvus_collection_name,
+                filter=self._pages_filter(chunk),
+                output_fields=["doc_id", "page_number", "patch_index", "embedding"],
+                limit=self.QUERY_RESULT_LIMIT,
+                consistency_level=self._read_consistency_level(),
+            )
+
+            for row in results:
+                key = (row["doc_id"], row["page_number"])
+                rows_by_page.setdefault(key, []).append((row["patch_index"], row["embedding"]))
+
+        page_embeddings = {}
+        for key, rows in rows_by_page.items():
+            rows.sort(key=lambda x: x[0])
+            page_embeddings[key] = np.asarray([emb for _, emb in rows], dtype=np.float32)
+
+        return page_embeddings
+
+    @staticmethod
+    def _pages_filter(pages: list[tuple[str, int]]) -> str:
+        pages_by_doc: dict[str, list[int]] = {}
+        for doc_id, page_number in pages:
+            pages_by_doc.setdefault(doc_id, []).append(page_number)
+
+        clauses = [
+            f'(doc_id == "{doc_id}" and page_number in {sorted(page_numbers)})'
+            for doc_id, page_numbers in pages_by_doc.items()
+        ]
+        return " or ".join(clauses)
 
     def document_exists(self, doc_id: str) -> bool:
         self._ensure_collection()
@@ -210,30 +554,36 @@ class MilvusService:
             filter=f'doc_id == "{doc_id}"',
             output_fields=["doc_id"],
             limit=1,
+            consistency_level=self._read_consistency_level(),
         )
 
         return len(results) > 0
 
-    def delete_document(self, doc_id: str) -> int:
+    def delete_document(self, doc_id: str, except_pages: Collection[int] | None = None) -> int:
         self._ensure_collection()
         client = self._get_client()
 
-        try:
-            client.flush(collection_name=settings.milvus_collection_name)
-        except Exception as exc:
-            logger.opt(exception=exc).error("Flush failed before delete")
-
         expr = f'doc_id == "{doc_id}"'
-        result = client.delete(collection_name=settings.milvus_collection_name, filter=expr)
+        if except_pages:
+            expr += f" and page_number not in {sorted(except_pages)}"
+        result = client.delete(
+            collection_name=settings.milvus_collection_name,
+            filter=expr,
+            consistency_level=self._read_consistency_level(),
+        )
+        if settings.milvus_page_summary_enabled:
+            client.delete(
+                collection_name=self.summary_collection_name,
+                filter=expr,
+                consistency_level=self._read_consistency_level(),
+            )
 
         delete_count = result.get("delete_count", 0)
+        self._record_write()
+        if self.binary_vectors:
+            self.vector_store.remove_document(doc_id, except_pages)
         logger.info(f"Deleted {delete_count} pages for doc={doc_id}")
 
-        try:
-            client.flush(collection_name=settings.milvus_collection_name)
-        except Exception as exc:
-            logger.opt(exception=exc).error("Flush failed after delete")
-
         return delete_count
 
     def get_collection_stats(self) -> dict[str, Any]:
@@ -247,9 +597,11 @@ class MilvusService:
         client = self._get_client()
         collection_name = settings.milvus_collection_name
 
-        if client.has_collection(collection_name):
-            client.drop_collection(collection_name)
-            logger.info(f"Dropped collection: {collection_name}")
+        for name in (collection_name, self.summary_collection_name):
+            if client.has_collection(name):
+                client.drop_collection(name)
+                logger.info(f"Dropped collection: {name}")
+        self._vector_type_checked = False
 
     def disconnect(self) -> None:
         if self._client is not None:
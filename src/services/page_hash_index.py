@@ -0,0 +1,64 @@
+import threading
+from pathlib import Path
+
+from src.core.config import settings
+from src.core.sqlite_store import SQLiteStore
+
+PAGE_HASH_INDEX_FILENAME = "page_hashes.db"
+
+
+class PageHashIndex(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS page_hashes (
+            doc_id TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            page_hash TEXT NOT NULL,
+            PRIMARY KEY (doc_id, page_number)
+        );
+        CREATE INDEX IF NOT EXISTS idx_page_hashes_hash ON page_hashes (page_hash);
+    """
+
+    def lookup(self, page_hashes: list[str]) -> dict[str, tuple[str, int]]:
+        if not page_hashes:
+            return {}
+
+        placeholders = ", ".join("?" for _ in page_hashes)
+        rows = self.fetchall(
+            f"SELECT page_hash, doc_id, page_number FROM page_hashes WHERE page_hash IN ({placeholders})",
+            tuple(page_hashes),
+        )
+
+        sources: dict[str, tuple[str, int]] = {}
+        for row in rows:
+            sources.setdefault(row["page_hash"], (row["doc_id"], row["page_number"]))
+        return sources
+
+    def add(self, doc_id: str, pages: list[tuple[int, str]]) -> None:
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO page_hashes (doc_id, page_number, page_hash) VALUES (?, ?, ?)",
+                [(doc_id, page_number, page_hash) for page_number, page_hash in pages],
+            )
+
+    def discard(self, doc_id: str, page_number: int) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM page_hashes WHERE doc_id = ? AND page_number = ?", (doc_id, page_number))
+
+    def remove_document(self, doc_id: str) -> int:
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM page_hashes WHERE doc_id = ?", (doc_id,)).rowcount
+
+
+_page_hash_index: PageHashIndex | None = None
+_page_hash_index_lock = threading.Lock()
+
+
+def get_page_hash_index() -> PageHashIndex | None:
+    global _page_hash_index
+    if not settings.page_dedup_enabled:
+        return None
+
+    with _page_hash_index_lock:
+        if _page_hash_index is None:
+            _page_hash_index = PageHashIndex(Path(settings.documents_dir) / PAGE_HASH_INDEX_FILENAME)
+        return _page_hash_index
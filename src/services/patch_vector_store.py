@@ -0,0 +1,80 @@
+import threading
+from collections.abc import Collection
+from pathlib import Path
+
+import numpy as np
+
+from src.core.config import settings
+from src.core.sqlite_store import SQLiteStore
+
+PATCH_VECTOR_STORE_FILENAME = "patch_vectors.db"
+
+
+class PatchVectorStore(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS page_vectors (
+            doc_id TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            num_patches INTEGER NOT NULL,
+            vectors BLOB NOT NULL,
+            PRIMARY KEY (doc_id, page_number)
+        );
+    """
+
+    def add_pages(self, doc_id: str, pages: list[tuple[int, np.ndarray]]) -> None:
+        rows = []
+        for page_number, vectors in pages:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            if vectors.ndim != 2:
+                raise ValueError(f"Expected 2D patch matrix, got {vectors.ndim}D")
+            rows.append((doc_id, page_number, vectors.shape[0], vectors.tobytes()))
+
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO page_vectors (doc_id, page_number, num_patches, vectors) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def get_pages(self, pages: list[tuple[str, int]]) -> dict[tuple[str, int], np.ndarray]:
+        page_vectors: dict[tuple[str, int], np.ndarray] = {}
+
+        for doc_id, page_numbers in self._group_by_doc(pages).items():
+            placeholders = ", ".join("?" for _ in page_numbers)
+            rows = self.fetchall(
+                "SELECT page_number, num_patches, vectors FROM page_vectors "
+                f"WHERE doc_id = ? AND page_number IN ({placeholders})",
+                (doc_id, *page_numbers),
+            )
+            for row in rows:
+                vectors = np.frombuffer(row["vectors"], dtype=np.float32)
+                page_vectors[(doc_id, row["page_number"])] = vectors.reshape(row["num_patches"], -1)
+
+        return page_vectors
+
+    def remove_document(self, doc_id: str, except_pages: Collection[int] | None = None) -> int:
+        keep = sorted(except_pages or ())
+        sql = "DELETE FROM page_vectors WHERE doc_id = ?"
+        if keep:
+            sql += f" AND page_number NOT IN ({', '.join('?' for _ in keep)})"
+
+        with self.transaction() as conn:
+            return conn.execute(sql, (doc_id, *keep)).rowcount
+
+    @staticmethod
+    def _group_by_doc(pages: list[tuple[str, int]]) -> dict[str, list[int]]:
+        pages_by_doc: dict[str, list[int]] = {}
+        for doc_id, page_number in pages:
+            pages_by_doc.setdefault(doc_id, []).append(page_number)
+        return pages_by_doc
+
+
+_patch_vector_store: PatchVectorStore | None = None
+_patch_vector_store_lock = threading.Lock()
+
+
+def get_patch_vector_store() -> PatchVectorStore:
+    global _patch_vector_store
+    with _patch_vector_store_lock:
+        if _patch_vector_store is None:
+            _patch_vector_store = PatchVectorStore(Path(settings.documents_dir) / PATCH_VECTOR_STORE_FILENAME)
+        return _patch_vector_store
@@ -1,13 +1,26 @@
 import hashlib
-import io
+import math
+import multiprocessing
+import os
 import shutil
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import deque
+from collections.abc import Collection, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
 from pathlib import Path
 
 import pymupdf
 from loguru import logger
 from PIL import Image
 
+from src.core.config import settings
+from src.services import pdf_render_worker
+
+RENDER_BACKENDS = ("thread", "process")
+HASH_CHUNK_BYTES = 1024 * 1024
+
 
 def generate_doc_id(file_path: str | Path) -> str:
     try:
@@ -17,7 +30,7 @@ def generate_doc_id(file_path: str | Path) -> str:
 
         sha256_hash = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
+            for byte_block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
                 sha256_hash.update(byte_block)
 
         doc_id = sha256_hash.hexdigest()
@@ -44,12 +57,108 @@ def count_pdf_pages(file_path: str | Path) -> int:
         raise ValueError(f"Failed to count PDF pages: {exc}") from exc
 
 
+def limit_page_count(page_count: int, max_pages: int | None = None) -> int:
+    limits = [page_count]
+    if max_pages is not None and max_pages > 0:
+        limits.append(max_pages)
+    if settings.pdf_max_pages > 0:
+        limits.append(settings.pdf_max_pages)
+    return min(limits)
+
+
+def iter_pdf_pages(
+    file_path: str | Path,
+    dpi: int = 144,
+    max_pages: int | None = None,
+    workers: int = 1,
+    skip_pages: Collection[int] | None = None,
+    backend: str | None = None,
+) -> Iterator[tuple[int, Image.Image]]:
+    file_path = Path(file_path)
+    if not file_path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    if dpi <= 0:
+        raise ValueError(f"DPI must be positive, got {dpi}")
+
+    if workers <= 0:
+        raise ValueError(f"workers must be positive, got {workers}")
+
+    backend = backend or settings.pdf_render_backend
+    if backend not in RENDER_BACKENDS:
+        raise ValueError(f"Unknown render backend '{backend}', expected one of {RENDER_BACKENDS}")
+
+    with pymupdf.open(file_path) as pdf_document:
+        page_count = limit_page_count(len(pdf_document), max_pages)
+
+    skip = set(skip_pages or ())
+    page_numbers = [page_number for page_number in range(1, page_count + 1) if page_number not in skip]
+
+    if backend == "process":
+        # Keep `workers` chunks in flight so ingestion memory stays bounded while the pool renders ahead.
+        return get_pdf_render_pool().iter_render(file_path, dpi, page_numbers, lookahead=workers)
+
+    zoom = dpi / 72
+    matrix = pymupdf.Matrix(zoom, zoom)
+
+    if workers == 1:
+        return _iter_pages_sequential(file_path, page_numbers, matrix)
+    return _iter_pages_threaded(file_path, page_numbers, matrix, workers)
+
+
+def _iter_pages_sequential(
+    file_path: Path,
+    page_numbers: list[int],
+    matrix: pymupdf.Matrix,
+) -> Iterator[tuple[int, Image.Image]]:
+    with pymupdf.open(file_path) as pdf_document:
+        for page_number in page_numbers:
+            yield page_number, _rasterize_page(pdf_document[page_number - 1], matrix)
+
+
+def _iter_pages_threaded(
+    file_path: Path,
+    page_numbers: list[int],
+    matrix: pymupdf.Matrix,
+    workers: int,
+) -> Iterator[tuple[int, Image.Image]]:
+    local = threading.local()
+    handles: list[pymupdf.Document] = []
+    handles_lock = threading.Lock()
+
+    def render(page_number: int) -> Image.Image:
+        if not hasattr(local, "document"):
+            local.document = pymupdf.open(file_path)
+            with handles_lock:
+                handles.append(local.document)
+        return _rasterize_page(local.document[page_number - 1], matrix)
+
+    pending = deque(page_numbers)
+    in_flight: deque[tuple[int, Future[Image.Image]]] = deque()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-render")
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < workers:
+                page_number = pending.popleft()
+                in_flight.append((page_number, executor.submit(render, page_number)))
+
+            page_number, future = in_flight.popleft()
+            yield page_number, future.result()
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
+        for document in handles:
+            document.close()
+
+
 def convert_pdf_to_images(
     file_path: str | Path,
     dpi: int = 144,
     thread_count: int | None = None,
     output_dir: str | Path | None = None,
     save_format: str = "PNG",
+    max_pages: int | None = None,
 ) -> list[tuple[int, Image.Image]]:
     try:
         file_path = Path(file_path)
@@ -64,26 +173,7 @@ def convert_pdf_to_images(
 
         logger.info(f"Converting PDF to images: {file_path} with DPI={dpi}")
 
-        zoom = dpi / 72
-        matrix = pymupdf.Matrix(zoom, zoom)
-
-        pdf_document = pymupdf.open(file_path)
-        results = []
-
-        try:
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
-                pix = page.get_pixmap(matrix=matrix)
-
-                img_data = pix.tobytes("png")
-                image = Image.open(io.BytesIO(img_data))
-
-                if image.mode != "RGB":
-                    image = image.convert("RGB")
-
-                results.append((page_num + 1, image))
-        finally:
-            pdf_document.close()
+        results = list(iter_pdf_pages(file_path, dpi=dpi, max_pages=max_pages))
 
         if output_dir:
             doc_name = file_path.stem
@@ -97,12 +187,26 @@ def convert_pdf_to_images(
         raise ValueError(f"Failed to convert PDF to images: {exc}") from exc
 
 
+def render_pdf_page(
+    file_path: str | Path,
+    page_number: int,
+    dpi: int = 144,
+) -> Image.Image:
+    if dpi <= 0:
+        raise ValueError(f"DPI must be positive, got {dpi}")
+
+    zoom = dpi / 72
+    return _process_page(Path(file_path), page_number - 1, pymupdf.Matrix(zoom, zoom))
+
+
 def convert_pdf_to_images_parallel(
     file_path: str | Path,
     dpi: int = 144,
     max_workers: int = 4,
     output_dir: str | Path | None = None,
     save_format: str = "PNG",
+    backend: str | None = None,
+    max_pages: int | None = None,
 ) -> list[tuple[int, Image.Image]]:
     try:
         file_path = Path(file_path)
@@ -118,39 +222,25 @@ def convert_pdf_to_images_parallel(
         if max_workers <= 0:
             raise ValueError(f"max_workers must be positive, got {max_workers}")
 
-        logger.info(f"Converting PDF to images (parallel): {file_path} with DPI={dpi}, max_workers={max_workers}")
-
-        zoom = dpi / 72
-        matrix = pymupdf.Matrix(zoom, zoom)
-
-        pdf_document = pymupdf.open(file_path)
-        page_count = len(pdf_document)
+        backend = backend or settings.pdf_render_backend
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend '{backend}', expected one of {RENDER_BACKENDS}")
 
-        results = []
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_page = {
-                executor.submit(_process_page, file_path, page_num, matrix): page_num + 1
-                for page_num in range(page_count)
-            }
-
-            for future in as_completed(future_to_page):
-                page_num = future_to_page[future]
-                try:
-                    image = future.result()
-                    results.append((page_num, image))
-                except Exception as exc:
-                    logger.opt(exception=exc).error(f"Failed to process page {page_num}")
-                    raise
+        logger.info(f"Converting PDF to images ({backend}): {file_path} with DPI={dpi}, max_workers={max_workers}")
 
-        pdf_document.close()
+        with pymupdf.open(file_path) as pdf_document:
+            page_count = limit_page_count(len(pdf_document), max_pages)
 
-        results.sort(key=lambda x: x[0])
+        if backend == "process":
+            results = get_pdf_render_pool().render(file_path, dpi, list(range(1, page_count + 1)))
+        else:
+            results = _render_with_threads(file_path, dpi, page_count, max_workers)
 
         if output_dir:
             doc_name = file_path.stem
             save_images(results, output_dir, doc_name, save_format)
 
-        logger.info(f"Successfully converted PDF to {len(results)} images (parallel): {file_path}")
+        logger.info(f"Successfully converted PDF to {len(results)} images ({backend}): {file_path}")
         return results
 
     except Exception as exc:
@@ -158,6 +248,147 @@ def convert_pdf_to_images_parallel(
         raise ValueError(f"Failed to convert PDF to images: {exc}") from exc
 
 
+def _render_with_threads(
+    file_path: Path,
+    dpi: int,
+    page_count: int,
+    max_workers: int,
+) -> list[tuple[int, Image.Image]]:
+    zoom = dpi / 72
+    matrix = pymupdf.Matrix(zoom, zoom)
+    chunks = _page_chunks(list(range(1, page_count + 1)), max_workers, settings.pdf_render_chunk_pages)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_render_chunk_images, file_path, chunk, matrix) for chunk in chunks]
+        for future in futures:
+            results.extend(future.result())
+
+    return results
+
+
+def _render_chunk_images(
+    file_path: Path,
+    page_numbers: list[int],
+    matrix: pymupdf.Matrix,
+) -> list[tuple[int, Image.Image]]:
+    with pymupdf.open(file_path) as pdf_document:
+        return [(page_number, _rasterize_page(pdf_document[page_number - 1], matrix)) for page_number in page_numbers]
+
+
+def _page_chunks(page_numbers: list[int], workers: int, max_chunk_pages: int) -> list[list[int]]:
+    if not page_numbers:
+        return []
+
+    chunk_size = max(1, min(max_chunk_pages, math.ceil(len(page_numbers) / workers)))
+    return [page_numbers[i : i + chunk_size] for i in range(0, len(page_numbers), chunk_size)]
+
+
+def _images_from_shared_memory(
+    shm_name: str,
+    layout: list[tuple[int, int, int, int, int]],
+) -> list[tuple[int, Image.Image]]:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        images = []
+        for page_number, width, height, stride, start in layout:
+            with shm.buf[start : start + stride * height] as view:
+                images.append((page_number, Image.frombytes("RGB", (width, height), view, "raw", "RGB", stride)))
+        return images
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _render_context() -> multiprocessing.context.BaseContext:
+    # The pool starts lazily from request and ingest threads, when forking could copy locks held by loguru,
+    # the allocator or OpenMP into the children. A forkserver forks from a clean process that has only
+    # imported the worker module, so workers neither inherit that state nor re-import the app and torch.
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([pdf_render_worker.__name__])
+    return context
+
+
+class PdfRenderPool:
+    def __init__(self, processes: int | None = None, chunk_pages: int = 8) -> None:
+        self._processes = processes or os.cpu_count() or 1
+        self._chunk_pages = max(1, chunk_pages)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Workers must share the parent's tracker, or each would report the segments we unlink as leaked.
+                resource_tracker.ensure_running()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._processes,
+                    mp_context=_render_context(),
+                )
+                logger.info(f"Started PDF render pool with {self._processes} processes")
+            return self._executor
+
+    def render(self, file_path: str | Path, dpi: int, page_numbers: list[int]) -> list[tuple[int, Image.Image]]:
+        return list(self.iter_render(file_path, dpi, page_numbers))
+
+    def iter_render(
+        self,
+        file_path: str | Path,
+        dpi: int,
+        page_numbers: list[int],
+        lookahead: int | None = None,
+    ) -> Iterator[tuple[int, Image.Image]]:
+        pending = deque(_page_chunks(page_numbers, self._processes, self._chunk_pages))
+        in_flight: deque[Future[tuple[str, list[tuple[int, int, int, int, int]]]]] = deque()
+        limit = lookahead or len(pending)
+
+        try:
+            while pending or in_flight:
+                executor = self._get_executor()
+                while pending and len(in_flight) < limit:
+                    in_flight.append(
+                        executor.submit(
+                            pdf_render_worker.render_chunk_to_shared_memory, str(file_path), pending.popleft(), dpi
+                        )
+                    )
+
+                shm_name, layout = in_flight.popleft().result()
+                yield from _images_from_shared_memory(shm_name, layout)
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+        finally:
+            for future in in_flight:
+                future.cancel()
+            for future in in_flight:
+                if future.cancelled() or future.exception() is not None:
+                    continue
+                shm_name, _ = future.result()
+                _images_from_shared_memory(shm_name, [])
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+                logger.info("Stopped PDF render pool")
+
+
+_pdf_render_pool: PdfRenderPool | None = None
+
+
+def get_pdf_render_pool() -> PdfRenderPool:
+    global _pdf_render_pool
+    if _pdf_render_pool is None:
+        _pdf_render_pool = PdfRenderPool(
+            processes=settings.pdf_render_processes or None,
+            chunk_pages=settings.pdf_render_chunk_pages,
+        )
+    return _pdf_render_pool
+
+
 def save_images(
     images: list[tuple[int, Image.Image]],
     output_dir: str | Path,
@@ -219,6 +450,7 @@ def process_pdf_document(
     save_images_flag: bool = True,
     use_parallel: bool = False,
     max_workers: int = 4,
+    doc_id: str | None = None,
 ) -> tuple[str, Path | None, list[Path], list[tuple[int, Image.Image]]]:
     try:
         pdf_path = Path(pdf_path)
@@ -230,7 +462,8 @@ def process_pdf_document(
 
         logger.info(f"Processing PDF document: {pdf_path} as '{doc_name}'")
 
-        doc_id = generate_doc_id(pdf_path)
+        if doc_id is None:
+            doc_id = generate_doc_id(pdf_path)
 
         saved_pdf_path = None
         if save_pdf:
@@ -261,15 +494,11 @@ def _process_page(
 ) -> Image.Image:
     pdf_document = pymupdf.open(file_path)
     try:
-        page = pdf_document[page_num]
-        pix = page.get_pixmap(matrix=matrix)
-
-        img_data = pix.tobytes("png")
-        image = Image.open(io.BytesIO(img_data))
-
-        if image.mode != "RGB":
-            image = image.convert("RGB")
-
-        return image
+        return _rasterize_page(pdf_document[page_num], matrix)
     finally:
         pdf_document.close()
+
+
+def _rasterize_page(page: pymupdf.Page, matrix: pymupdf.Matrix) -> Image.Image:
+    pix = page.get_pixmap(matrix=matrix, colorspace=pymupdf.csRGB, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride)
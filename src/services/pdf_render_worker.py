@@ -0,0 +1,41 @@
+# Entry point for PdfRenderPool workers. Keep the imports to pymupdf and the standard library: the forkserver
+# preloads this module, and anything imported here is paid for once per pool rather than once per worker.
+from multiprocessing import shared_memory
+
+import pymupdf
+
+
+def render_chunk_to_shared_memory(
+    file_path: str,
+    page_numbers: list[int],
+    dpi: int,
+) -> tuple[str, list[tuple[int, int, int, int, int]]]:
+    zoom = dpi / 72
+    matrix = pymupdf.Matrix(zoom, zoom)
+
+    with pymupdf.open(file_path) as pdf_document:
+        pixmaps = [
+            (
+                page_number,
+                pdf_document[page_number - 1].get_pixmap(matrix=matrix, colorspace=pymupdf.csRGB, alpha=False),
+            )
+            for page_number in page_numbers
+        ]
+
+    layout = []
+    offset = 0
+    for page_number, pix in pixmaps:
+        layout.append((page_number, pix.width, pix.height, pix.stride, offset))
+        offset += pix.stride * pix.height
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    try:
+        for (_, pix), (_, _, height, stride, start) in zip(pixmaps, layout, strict=True):
+            shm.buf[start : start + stride * height] = pix.samples_mv
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+
+    shm.close()
+    return shm.name, layout
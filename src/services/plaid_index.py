@@ -0,0 +1,675 @@
+import threading
+from collections.abc import Collection
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from loguru import logger
+
+from src.core.config import settings
+from src.core.sqlite_store import SQLiteStore
+from src.utils.clustering_utils import spherical_kmeans
+from src.utils.embedding_utils import stack_page_embeddings
+from src.utils.scoring_utils import maxsim_from_similarities, maxsim_scores
+
+
+class ResidualCodec:
+    COMPRESS_CHUNK_SIZE = 8192
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        bucket_cutoffs: np.ndarray,
+        bucket_weights: np.ndarray,
+        nbits: int,
+    ) -> None:
+        self.centroids = centroids.astype(np.float32)
+        self.bucket_cutoffs = bucket_cutoffs.astype(np.float32)
+        self.bucket_weights = bucket_weights.astype(np.float32)
+        self.nbits = nbits
+        self.dim = centroids.shape[1]
+
+    @property
+    def packed_width(self) -> int:
+        return self.dim * self.nbits // 8
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, num_centroids: int, nbits: int) -> "ResidualCodec":
+        if (vectors.shape[1] * nbits) % 8 != 0:
+            raise ValueError(f"Embedding dim {vectors.shape[1]} with {nbits} bits is not byte aligned")
+
+        centroids, assignments = spherical_kmeans(torch.from_numpy(vectors), num_centroids)
+        centroids_np = centroids.numpy()
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        residuals = normalized - centroids_np[assignments.numpy()]
+
+        num_buckets = 2**nbits
+        bucket_cutoffs = np.quantile(residuals, np.arange(1, num_buckets) / num_buckets)
+        bucket_weights = np.quantile(residuals, (np.arange(num_buckets) + 0.5) / num_buckets)
+
+        logger.info(f"Trained residual codec: centroids={centroids_np.shape[0]}, nbits={nbits}")
+        return cls(centroids_np, bucket_cutoffs, bucket_weights, nbits)
+
+    @classmethod
+    def load(cls, path: Path) -> "ResidualCodec":
+        data = np.load(path)
+        return cls(data["centroids"], data["bucket_cutoffs"], data["bucket_weights"], int(data["nbits"]))
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                bucket_cutoffs=self.bucket_cutoffs,
+                bucket_weights=self.bucket_weights,
+                nbits=self.nbits,
+            )
+
+    def compress(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        codes_chunks = []
+        packed_chunks = []
+
+        for start in range(0, len(vectors), self.COMPRESS_CHUNK_SIZE):
+            chunk = vectors[start : start + self.COMPRESS_CHUNK_SIZE].astype(np.float32)
+            chunk = chunk / np.linalg.norm(chunk, axis=1, keepdims=True).clip(min=1e-12)
+
+            codes = (chunk @ self.centroids.T).argmax(axis=1).astype(np.int32)
+            residuals = chunk - self.centroids[codes]
+
+            buckets = np.searchsorted(self.bucket_cutoffs, residuals).astype(np.uint8)
+            bits = (buckets[..., None] >> np.arange(self.nbits, dtype=np.uint8)) & 1
+            packed = np.packbits(bits.reshape(len(chunk), -1), axis=1)
+
+            codes_chunks.append(codes)
+            packed_chunks.append(packed)
+
+        if not codes_chunks:
+            return np.empty(0, dtype=np.int32), np.empty((0, self.packed_width), dtype=np.uint8)
+
+        return np.concatenate(codes_chunks), np.concatenate(packed_chunks)
+
+    def decompress(self, codes: np.ndarray, packed: np.ndarray) -> np.ndarray:
+        bits = np.unpackbits(packed, axis=1, count=self.dim * self.nbits).reshape(len(codes), self.dim, self.nbits)
+        buckets = (bits.astype(np.int64) << np.arange(self.nbits)).sum(axis=-1)
+
+        vectors = self.centroids[codes] + self.bucket_weights[buckets]
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+
+
+class CentroidInvertedLists:
+    def __init__(self, offsets: np.ndarray, slots: np.ndarray, covered_slots: int) -> None:
+        self.offsets = offsets.astype(np.int64)
+        self.slots = slots.astype(np.int64)
+        self.covered_slots = covered_slots
+        self._tail: dict[int, list[int]] = {}
+
+    @classmethod
+    def build(cls, pages: list[dict[str, Any]], codes: np.ndarray, num_centroids: int) -> "CentroidInvertedLists":
+        centroid_chunks = []
+        slot_chunks = []
+        for slot, page in enumerate(pages):
+            if page["store"] != "compressed" or page["deleted"]:
+                continue
+            page_centroids = np.unique(codes[page["offset"] : page["offset"] + page["length"]])
+            centroid_chunks.append(page_centroids)
+            slot_chunks.append(np.full(len(page_centroids), slot, dtype=np.int64))
+
+        centroids = np.concatenate(centroid_chunks) if centroid_chunks else np.empty(0, dtype=np.int32)
+        slots = np.concatenate(slot_chunks) if slot_chunks else np.empty(0, dtype=np.int64)
+
+        offsets = np.zeros(num_centroids + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(centroids, minlength=num_centroids))
+        return cls(offsets, slots[np.argsort(centroids, kind="stable")], len(pages))
+
+    @classmethod
+    def load(cls, path: Path) -> "CentroidInvertedLists":
+        data = np.load(path)
+        return cls(data["offsets"], data["slots"], int(data["covered_slots"]))
+
+    def save(self, path: Path) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, offsets=self.offsets, slots=self.slots, covered_slots=self.covered_slots)
+
+    def add(self, slot: int, page_codes: np.ndarray) -> None:
+        for centroid in np.unique(page_codes).tolist():
+            self._tail.setdefault(centroid, []).append(slot)
+
+    def lookup(self, centroids: np.ndarray) -> np.ndarray:
+        chunks = [self.slots[self.offsets[c] : self.offsets[c + 1]] for c in centroids.tolist()]
+        chunks.extend(np.asarray(self._tail[c], dtype=np.int64) for c in centroids.tolist() if c in self._tail)
+        return np.unique(np.concatenate(chunks)) if chunks else np.empty(0, dtype=np.int64)
+
+
+class PlaidPageStore(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            slot INTEGER PRIMARY KEY,
+            doc_id TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            store TEXT NOT NULL,
+            row_offset INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS index_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def load(self) -> tuple[list[dict[str, Any]], int]:
+        rows = self.fetchall(
+            "SELECT doc_id, page_number, store, row_offset, row_count, deleted FROM pages ORDER BY slot"
+        )
+        pages = [
+            {
+                "doc_id": row["doc_id"],
+                "page_number": row["page_number"],
+                "store": row["store"],
+                "offset": row["row_offset"],
+                "length": row["row_count"],
+                "deleted": bool(row["deleted"]),
+            }
+            for row in rows
+        ]
+
+        generation = self.fetchone("SELECT value FROM index_state WHERE key = 'generation'")
+        return pages, generation["value"] if generation is not None else 0
+
+    def append(self, first_slot: int, pages: list[dict[str, Any]]) -> None:
+        with self.transaction() as conn:
+            self._insert(conn, first_slot, pages)
+
+    def mark_deleted(self, slots: list[int]) -> None:
+        with self.transaction() as conn:
+            conn.executemany("UPDATE pages SET deleted = 1 WHERE slot = ?", [(slot,) for slot in slots])
+
+    def move_pending(self, base_offset: int) -> None:
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE pages SET store = 'compressed', row_offset = row_offset + ? WHERE store = 'pending'",
+                (base_offset,),
+            )
+
+    def replace(self, pages: list[dict[str, Any]], generation: int) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM pages")
+            self._insert(conn, 0, pages)
+            conn.execute(
+                "INSERT OR REPLACE INTO index_state (key, value) VALUES ('generation', ?)",
+                (generation,),
+            )
+
+    @staticmethod
+    def _insert(conn: Any, first_slot: int, pages: list[dict[str, Any]]) -> None:
+        conn.executemany(
+            "INSERT INTO pages (slot, doc_id, page_number, store, row_offset, row_count, deleted) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    first_slot + i,
+                    page["doc_id"],
+                    page["page_number"],
+                    page["store"],
+                    page["offset"],
+                    page["length"],
+                    int(page["deleted"]),
+                )
+                for i, page in enumerate(pages)
+            ],
+        )
+
+
+class PlaidIndexService:
+    EMBEDDING_DIM = 128
+    MAX_PATCHES_PER_PAGE = 1030
+
+    CODEC_FILE = "codec.npz"
+    PAGE_STORE_FILE = "pages.db"
+    CODES_FILE = "codes.bin"
+    RESIDUALS_FILE = "residuals.bin"
+    PENDING_FILE = "pending.bin"
+    INVERTED_LISTS_FILE = "ivf.npz"
+
+    def __init__(self, index_dir: str | Path | None = None) -> None:
+        self._index_dir = Path(index_dir or settings.plaid_index_dir)
+        self._lock = threading.RLock()
+        self._codec: ResidualCodec | None = None
+        self._pages: list[dict[str, Any]] | None = None
+        self._page_store: PlaidPageStore | None = None
+        self._generation = 0
+        self._inverted_lists: CentroidInvertedLists | None = None
+
+    def _load(self) -> list[dict[str, Any]]:
+        if self._pages is not None:
+            return self._pages
+
+        self._index_dir.mkdir(parents=True, exist_ok=True)
+
+        codec_path = self._index_dir / self.CODEC_FILE
+        if codec_path.exists():
+            self._codec = ResidualCodec.load(codec_path)
+
+        if self._page_store is None:
+            self._page_store = PlaidPageStore(self._index_dir / self.PAGE_STORE_FILE)
+        self._pages, self._generation = self._page_store.load()
+
+        logger.info(
+            f"Loaded PLAID index from {self._index_dir}: pages={len(self._pages)}, trained={self._codec is not None}"
+        )
+        return self._pages
+
+    def _data_path(self, file_name: str, generation: int | None = None) -> Path:
+        # Compaction writes the next generation beside the current one and only switches over once the page
+        # store commits, so a crash part-way through leaves the previous files and offsets intact.
+        generation = self._generation if generation is None else generation
+        if generation == 0:
+            return self._index_dir / file_name
+        path = Path(file_name)
+        return self._index_dir / f"{path.stem}.{generation}{path.suffix}"
+
+    def _read_rows(
+        self,
+        file_name: str,
+        dtype: type,
+        width: int | None = None,
+        generation: int | None = None,
+    ) -> np.ndarray:
+        path = self._data_path(file_name, generation)
+        if not path.exists() or path.stat().st_size == 0:
+            shape = (0,) if width is None else (0, width)
+            return np.empty(shape, dtype=dtype)
+
+        rows = np.memmap(path, dtype=dtype, mode="r")
+        return rows if width is None else rows.reshape(-1, width)
+
+    def _append_rows(self, file_name: str, rows: np.ndarray) -> int:
+        path = self._data_path(file_name)
+        row_bytes = rows.itemsize * (rows.shape[1] if rows.ndim == 2 else 1)
+        offset = path.stat().st_size // row_bytes if path.exists() else 0
+        with open(path, "ab") as f:
+            f.write(np.ascontiguousarray(rows).tobytes())
+        return offset
+
+    def _codes(self, generation: int | None = None) -> np.ndarray:
+        return self._read_rows(self.CODES_FILE, np.int32, generation=generation)
+
+    def _residuals(self) -> np.ndarray:
+        return self._read_rows(self.RESIDUALS_FILE, np.uint8, self._codec.packed_width)
+
+    def _pending(self) -> np.ndarray:
+        return self._read_rows(self.PENDING_FILE, np.float16, self.EMBEDDING_DIM)
+
+    def _get_inverted_lists(self) -> CentroidInvertedLists:
+        if self._inverted_lists is not None:
+            return self._inverted_lists
+
+        # The lists are written when the codec is trained and on compaction; pages compressed since then are
+        # indexed from their own codes rather than rescanning the whole codes file.
+        path = self._data_path(self.INVERTED_LISTS_FILE)
+        codes = self._codes()
+        if path.exists():
+            inverted_lists = CentroidInvertedLists.load(path)
+        else:
+            inverted_lists = CentroidInvertedLists.build([], codes, len(self._codec.centroids))
+
+        for slot in range(inverted_lists.covered_slots, len(self._pages)):
+            page = self._pages[slot]
+            if page["store"] == "compressed" and not page["deleted"]:
+                inverted_lists.add(slot, codes[page["offset"] : page["offset"] + page["length"]])
+
+        self._inverted_lists = inverted_lists
+        return inverted_lists
+
+    def _save_inverted_lists(self, pages: list[dict[str, Any]], generation: int) -> CentroidInvertedLists:
+        inverted_lists = CentroidInvertedLists.build(pages, self._codes(generation), len(self._codec.centroids))
+        inverted_lists.save(self._data_path(self.INVERTED_LISTS_FILE, generation))
+        return inverted_lists
+
+    def insert_page_embeddings(
+        self,
+        doc_id: str,
+        page_number: int,
+        embeddings: torch.Tensor,
+    ) -> int:
+        return self.insert_pages(doc_id, [(page_number, embeddings)])
+
+    def insert_pages(
+        self,
+        doc_id: str,
+        pages: list[tuple[int, torch.Tensor]],
+    ) -> int:
+        embedding_matrix, page_numbers, patch_indexes = stack_page_embeddings(
+            pages,
+            max_patches_per_page=self.MAX_PATCHES_PER_PAGE,
+            embedding_dim=self.EMBEDDING_DIM,
+        )
+        return self.insert_patches(doc_id, embedding_matrix, page_numbers, patch_indexes)
+
+    def insert_patches(
+        self,
+        doc_id: str,
+        embeddings: np.ndarray,
+        page_numbers: np.ndarray,
+        patch_indexes: np.ndarray,
+    ) -> int:
+        if embeddings.ndim != 2:
+            raise ValueError(f"Expected 2D embedding matrix, got {embeddings.ndim}D")
+
+        if embeddings.shape[1] != self.EMBEDDING_DIM:
+            raise ValueError(f"Expected embedding dim {self.EMBEDDING_DIM}, got {embeddings.shape[1]}")
+
+        num_patches = embeddings.shape[0]
+        if len(page_numbers) != num_patches or len(patch_indexes) != num_patches:
+            raise ValueError("Embedding, page_number and patch_index columns must have the same length")
+
+        order = np.lexsort((patch_indexes, page_numbers))
+        vectors = np.asarray(embeddings, dtype=np.float32)[order]
+        page_numbers = np.asarray(page_numbers)[order]
+        run_pages, run_starts, run_lengths = np.unique(page_numbers, return_index=True, return_counts=True)
+
+        with self._lock:
+            pages = self._load()
+
+            if self._codec is not None:
+                codes, packed = self._codec.compress(vectors)
+                offset = self._append_rows(self.CODES_FILE, codes)
+                self._append_rows(self.RESIDUALS_FILE, packed)
+                store = "compressed"
+            else:
+                offset = self._append_rows(self.PENDING_FILE, vectors.astype(np.float16))
+                store = "pending"
+
+            new_pages = [
+                {
+                    "doc_id": doc_id,
+                    "page_number": page_number,
+                    "store": store,
+                    "offset": offset + run_start,
+                    "length": run_length,
+                    "deleted": False,
+                }
+                for page_number, run_start, run_length in zip(
+                    run_pages.tolist(), run_starts.tolist(), run_lengths.tolist(), strict=True
+                )
+            ]
+            first_slot = len(pages)
+            self._page_store.append(first_slot, new_pages)
+            pages.extend(new_pages)
+
+            if store == "compressed" and self._inverted_lists is not None:
+                for slot, run_start, run_length in zip(
+                    range(first_slot, len(pages)), run_starts.tolist(), run_lengths.tolist(), strict=True
+                ):
+                    self._inverted_lists.add(slot, codes[run_start : run_start + run_length])
+
+            if self._codec is None and len(self._pending()) >= settings.plaid_train_min_patches:
+                self._train_and_compress_pending()
+
+        logger.info(f"Inserted {num_patches} patches across {len(run_pages)} pages for doc={doc_id} into PLAID index")
+        return num_patches
+
+    def _train_and_compress_pending(self) -> None:
+        pending = self._pending()
+        logger.info(f"Training PLAID codec on {len(pending)} pending patches")
+
+        sample_size = min(len(pending), settings.plaid_train_sample_size)
+        sample_rows = np.random.default_rng(0).choice(len(pending), size=sample_size, replace=False)
+        sample = np.asarray(pending[np.sort(sample_rows)], dtype=np.float32)
+
+        self._codec = ResidualCodec.train(sample, settings.plaid_num_centroids, settings.plaid_residual_bits)
+        self._codec.save(self._index_dir / self.CODEC_FILE)
+
+        codes, packed = self._codec.compress(np.asarray(pending, dtype=np.float32))
+        base_offset = self._append_rows(self.CODES_FILE, codes)
+        self._append_rows(self.RESIDUALS_FILE, packed)
+
+        self._page_store.move_pending(base_offset)
+        for page in self._pages:
+            if page["store"] == "pending":
+                page["store"] = "compressed"
+                page["offset"] += base_offset
+        self._inverted_lists = self._save_inverted_lists(self._pages, self._generation)
+
+        del pending
+        self._data_path(self.PENDING_FILE).unlink()
+        logger.success(f"Compressed {len(codes)} patches into PLAID index")
+
+    def search_pages(
+        self,
+        query_embeddings: torch.Tensor,
+        top_k: int = 10,
+        doc_id_filter: str | None = None,
+        rerank_candidates: int = 0,
+    ) -> list[dict[str, Any]]:
+        if query_embeddings.dim() == 1:
+            query_embeddings = query_embeddings.unsqueeze(0)
+
+        query = query_embeddings.cpu().float()
+
+        with self._lock:
+            pages = self._load()
+            live_slots = [
+                slot
+                for slot, page in enumerate(pages)
+                if not page["deleted"] and (doc_id_filter is None or page["doc_id"] == doc_id_filter)
+            ]
+
+            compressed_slots = [slot for slot in live_slots if pages[slot]["store"] == "compressed"]
+            pending_slots = [slot for slot in live_slots if pages[slot]["store"] == "pending"]
+
+            slot_scores: dict[int, float] = {}
+            if compressed_slots:
+                candidate_pages = max(settings.plaid_candidate_pages, rerank_candidates, top_k)
+                slot_scores.update(self._search_compressed(query, set(compressed_slots), candidate_pages, top_k))
+            if pending_slots:
+                slot_scores.update(self._score_exact(query, pending_slots))
+
+        aggregated = [
+            {"doc_id": pages[slot]["doc_id"], "page_number": pages[slot]["page_number"], "score": score}
+            for slot, score in slot_scores.items()
+        ]
+        aggregated.sort(key=lambda x: x["score"], reverse=True)
+
+        matches = aggregated[:top_k]
+        logger.info(f"PLAID search returned {len(matches)} page results")
+        return matches
+
+    def _search_compressed(
+        self,
+        query: torch.Tensor,
+        allowed_slots: set[int],
+        candidate_pages: int,
+        top_k: int,
+    ) -> dict[int, float]:
+        if len(allowed_slots) <= candidate_pages:
+            return self._score_exact(query, sorted(allowed_slots))
+
+        centroid_scores = query @ torch.from_numpy(self._codec.centroids).T
+        nprobe = min(settings.plaid_nprobe, centroid_scores.shape[1])
+        probed = centroid_scores.topk(nprobe, dim=1).indices.unique().numpy()
+
+        slots = [slot for slot in self._get_inverted_lists().lookup(probed).tolist() if slot in allowed_slots]
+        if len(slots) < top_k:
+            # A filter can leave too few pages near the probed centroids; rank every allowed page instead.
+            slots = sorted(allowed_slots)
+        candidate_count = len(slots)
+
+        patch_rows, page_index = self._page_rows(slots)
+        approx_scores = maxsim_from_similarities(
+            centroid_scores[:, torch.from_numpy(self._codes()[patch_rows].astype(np.int64))],
+            page_index,
+            len(slots),
+        )
+
+        keep = approx_scores.topk(min(candidate_pages, len(slots))).indices.tolist()
+        slots = [slots[i] for i in keep]
+        logger.debug(f"PLAID centroid interaction kept {len(slots)} of {candidate_count} candidate pages")
+
+        return self._score_exact(query, slots)
+
+    def _page_rows(self, slots: list[int]) -> tuple[np.ndarray, torch.Tensor]:
+        rows = np.concatenate(
+            [np.arange(self._pages[s]["offset"], self._pages[s]["offset"] + self._pages[s]["length"]) for s in slots]
+        )
+        page_index = torch.cat(
+            [torch.full((self._pages[s]["length"],), i, dtype=torch.long) for i, s in enumerate(slots)]
+        )
+        return rows, page_index
+
+    def _page_vectors(self, slots: list[int]) -> np.ndarray:
+        rows, _ = self._page_rows(slots)
+        store = self._pages[slots[0]]["store"]
+
+        if store == "compressed":
+            return self._codec.decompress(self._codes()[rows], self._residuals()[rows])
+        return np.asarray(self._pending()[rows], dtype=np.float32)
+
+    def _score_exact(self, query: torch.Tensor, slots: list[int]) -> dict[int, float]:
+        _, page_index = self._page_rows(slots)
+        doc_embeddings = torch.from_numpy(self._page_vectors(slots))
+        scores = maxsim_scores(query, doc_embeddings, page_index, len(slots))
+        return dict(zip(slots, scores.tolist(), strict=True))
+
+    def get_page_embeddings(self, pages: list[tuple[str, int]]) -> dict[tuple[str, int], np.ndarray]:
+        wanted = set(pages)
+        page_embeddings = {}
+
+        with self._lock:
+            for slot, page in enumerate(self._load()):
+                key = (page["doc_id"], page["page_number"])
+                if not page["deleted"] and key in wanted:
+                    page_embeddings[key] = self._page_vectors([slot])
+
+        return page_embeddings
+
+    def document_exists(self, doc_id: str) -> bool:
+        with self._lock:
+            return any(page["doc_id"] == doc_id and not page["deleted"] for page in self._load())
+
+    def delete_document(self, doc_id: str, except_pages: Collection[int] | None = None) -> int:
+        keep = set(except_pages or ())
+
+        with self._lock:
+            pages = self._load()
+            slots = [
+                slot
+                for slot, page in enumerate(pages)
+                if page["doc_id"] == doc_id and not page["deleted"] and page["page_number"] not in keep
+            ]
+
+            if slots:
+                self._page_store.mark_deleted(slots)
+                for slot in slots:
+                    pages[slot]["deleted"] = True
+
+            delete_count = sum(pages[slot]["length"] for slot in slots)
+            logger.info(f"Deleted {delete_count} patches for doc={doc_id} from PLAID index")
+
+            if slots and 0 < settings.plaid_compact_dead_ratio <= self._dead_ratio():
+                self.compact()
+
+        return delete_count
+
+    def _dead_ratio(self) -> float:
+        total_rows = sum(page["length"] for page in self._pages)
+        dead_rows = sum(page["length"] for page in self._pages if page["deleted"])
+        return dead_rows / total_rows if total_rows else 0.0
+
+    def compact(self) -> int:
+        with self._lock:
+            pages = self._load()
+            live_pages = [dict(page) for page in pages if not page["deleted"]]
+            dropped_rows = sum(page["length"] for page in pages if page["deleted"])
+            if len(live_pages) == len(pages):
+                return 0
+
+            generation = self._generation + 1
+            store_files = {
+                "compressed": [(self.CODES_FILE, self._codes), (self.RESIDUALS_FILE, self._residuals)],
+                "pending": [(self.PENDING_FILE, self._pending)],
+            }
+            for store, files in store_files.items():
+                store_pages = [page for page in live_pages if page["store"] == store]
+                if not store_pages:
+                    continue
+
+                for file_name, read_rows in files:
+                    rows = read_rows()
+                    with open(self._data_path(file_name, generation), "wb") as f:
+                        for page in store_pages:
+                            f.write(np.ascontiguousarray(rows[page["offset"] : page["offset"] + page["length"]]))
+                    del rows
+
+                offset = 0
+                for page in store_pages:
+                    page["offset"] = offset
+                    offset += page["length"]
+
+            inverted_lists = None
+            if self._codec is not None:
+                inverted_lists = self._save_inverted_lists(live_pages, generation)
+
+            self._page_store.replace(live_pages, generation)
+            for file_name in (self.CODES_FILE, self.RESIDUALS_FILE, self.PENDING_FILE, self.INVERTED_LISTS_FILE):
+                self._data_path(file_name).unlink(missing_ok=True)
+
+            self._pages = live_pages
+            self._generation = generation
+            self._inverted_lists = inverted_lists
+
+        logger.info(f"Compacted PLAID index: dropped {dropped_rows} dead patches, {len(live_pages)} pages remain")
+        return dropped_rows
+
+    def get_collection_stats(self) -> dict[str, Any]:
+        with self._lock:
+            pages = self._load()
+            live_pages = [page for page in pages if not page["deleted"]]
+            index_bytes = sum(
+                self._data_path(name).stat().st_size
+                for name in (self.CODES_FILE, self.RESIDUALS_FILE, self.PENDING_FILE)
+                if self._data_path(name).exists()
+            )
+
+        return {
+            "row_count": sum(page["length"] for page in live_pages),
+            "dead_row_count": sum(page["length"] for page in pages if page["deleted"]),
+            "page_count": len(live_pages),
+            "trained": self._codec is not None,
+            "index_bytes": index_bytes,
+        }
+
+    def drop_collection(self) -> None:
+        with self._lock:
+            self._load()
+            for name in (self.CODES_FILE, self.RESIDUALS_FILE, self.PENDING_FILE, self.INVERTED_LISTS_FILE):
+                self._data_path(name).unlink(missing_ok=True)
+            (self._index_dir / self.CODEC_FILE).unlink(missing_ok=True)
+            self._page_store.replace([], 0)
+
+            self._codec = None
+            self._pages = None
+            self._generation = 0
+            self._inverted_lists = None
+
+        logger.info(f"Dropped PLAID index at {self._index_dir}")
+
+    def disconnect(self) -> None:
+        with self._lock:
+            if self._page_store is not None:
+                self._page_store.close()
+            self._page_store = None
+            self._pages = None
+            self._inverted_lists = None
+
+
+_plaid_index_service: PlaidIndexService | None = None
+
+
+def get_plaid_index_service() -> PlaidIndexService:
+    global _plaid_index_service
+    if _plaid_index_service is None:
+        _plaid_index_service = PlaidIndexService()
+    return _plaid_index_service
@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+
+import torch
+from loguru import logger
+
+
+class QueryBatcher:
+    def __init__(
+        self,
+        encode_batch: Callable[[list[str]], list[torch.Tensor]],
+        window_ms: float,
+        max_batch_size: int,
+    ) -> None:
+        if max_batch_size <= 0:
+            raise ValueError("Batch size must be positive")
+
+        if window_ms < 0:
+            raise ValueError(f"Batch window must not be negative, got {window_ms}")
+
+        self._encode_batch = encode_batch
+        self._window_seconds = window_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._requests: queue.Queue[tuple[str, Future[torch.Tensor]] | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, query: str) -> Future[torch.Tensor]:
+        self._ensure_started()
+        future: Future[torch.Tensor] = Future()
+        self._requests.put((query, future))
+        return future
+
+    def encode(self, query: str, timeout: float | None = None) -> torch.Tensor:
+        return self.submit(query).result(timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+        logger.info("Stopped query batcher")
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self._window_seconds
+            stop = False
+
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch: list[tuple[str, Future[torch.Tensor]]]) -> None:
+        active = [(query, future) for query, future in batch if future.set_running_or_notify_cancel()]
+        if not active:
+            return
+
+        try:
+            embeddings = self._encode_batch([query for query, _ in active])
+        except Exception as exc:
+            for _, future in active:
+                future.set_exception(exc)
+            return
+
+        logger.debug(f"Encoded micro-batch of {len(active)} queries")
+        for (_, future), query_embeddings in zip(active, embeddings, strict=True):
+            future.set_result(query_embeddings)
@@ -1,11 +1,13 @@
 from typing import Any
 
+import torch
 from loguru import logger
 from pydantic import BaseModel
 
 from src.core.config import settings
 from src.services.embedding_service import get_embedding_service
-from src.services.milvus_service import get_milvus_service
+from src.services.index_backend import get_index_backend
+from src.utils.embedding_utils import prune_query_tokens
 
 
 class RetrievalResult(BaseModel):
@@ -17,7 +19,7 @@ class RetrievalResult(BaseModel):
 class RetrievalService:
     def __init__(self) -> None:
         self._embedding_service = get_embedding_service()
-        self._milvus_service = get_milvus_service()
+        self._milvus_service = get_index_backend()
 
     def retrieve(
         self,
@@ -33,16 +35,13 @@ class RetrievalService:
 
         logger.info(f"Retrieving top {top_k} pages for query: {query}")
 
-        query_embeddings = self._embedding_service.encode_query(query)
-        logger.debug(f"Query embeddings shape: {query_embeddings.shape}")
-
-        if query_embeddings.dim() == 3:
-            query_embeddings = query_embeddings.squeeze(0)
+        query_embeddings = self._encode_query(query)
 
         raw_results = self._milvus_service.search_pages(
             query_embeddings=query_embeddings,
             top_k=top_k,
             doc_id_filter=doc_id_filter,
+            rerank_candidates=self._rerank_candidates(),
         )
 
         results = [
@@ -69,17 +68,39 @@ class RetrievalService:
         if top_k is None:
             top_k = settings.top_k
 
-        query_embeddings = self._embedding_service.encode_query(query)
-
-        if query_embeddings.dim() == 3:
-            query_embeddings = query_embeddings.squeeze(0)
+        query_embeddings = self._encode_query(query)
 
         return self._milvus_service.search_pages(
             query_embeddings=query_embeddings,
             top_k=top_k,
             doc_id_filter=doc_id_filter,
+            rerank_candidates=self._rerank_candidates(),
         )
 
+    def _encode_query(self, query: str) -> torch.Tensor:
+        query_embeddings = self._embedding_service.encode_query(query)
+        logger.debug(f"Query embeddings shape: {query_embeddings.shape}")
+
+        if query_embeddings.dim() == 3:
+            query_embeddings = query_embeddings.squeeze(0)
+
+        if settings.query_pruning_enabled:
+            num_tokens = query_embeddings.shape[0]
+            query_embeddings = prune_query_tokens(
+                query_embeddings,
+                max_tokens=settings.query_prune_max_tokens,
+                similarity_threshold=settings.query_prune_similarity,
+            )
+            logger.debug(f"Pruned query tokens from {num_tokens} to {query_embeddings.shape[0]}")
+
+        return query_embeddings
+
+    @staticmethod
+    def _rerank_candidates() -> int:
+        if not settings.retrieval_rerank_enabled:
+            return 0
+        return settings.retrieval_rerank_candidates
+
 
 _retrieval_service: RetrievalService | None = None
 
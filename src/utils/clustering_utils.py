@@ -0,0 +1,58 @@
+import torch
+import torch.nn.functional as F
+
+
+def spherical_kmeans(
+    vectors: torch.Tensor,
+    num_clusters: int,
+    num_iterations: int = 10,
+    seed: int = 0,
+    initial_centroids: torch.Tensor | None = None,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    if vectors.dim() != 2:
+        raise ValueError(f"Expected 2D tensor, got {vectors.dim()}D")
+
+    if num_clusters <= 0:
+        raise ValueError(f"num_clusters must be positive, got {num_clusters}")
+
+    vectors = F.normalize(vectors.float(), dim=-1)
+    num_clusters = min(num_clusters, vectors.shape[0])
+
+    if initial_centroids is not None:
+        centroids = F.normalize(initial_centroids.float(), dim=-1)
+        num_clusters = centroids.shape[0]
+    else:
+        generator = torch.Generator().manual_seed(seed)
+        initial = torch.randperm(vectors.shape[0], generator=generator)[:num_clusters]
+        centroids = vectors[initial].clone()
+
+    assignments = torch.zeros(vectors.shape[0], dtype=torch.long)
+    for _ in range(num_iterations):
+        assignments = (vectors @ centroids.T).argmax(dim=1)
+
+        sums = torch.zeros_like(centroids).index_add_(0, assignments, vectors)
+        counts = torch.bincount(assignments, minlength=num_clusters)
+
+        empty = counts == 0
+        sums[empty] = centroids[empty]
+        centroids = F.normalize(sums, dim=-1)
+
+    assignments = (vectors @ centroids.T).argmax(dim=1)
+    return centroids, assignments
+
+
+def farthest_point_centroids(vectors: torch.Tensor, num_clusters: int) -> torch.Tensor:
+    if vectors.dim() != 2:
+        raise ValueError(f"Expected 2D tensor, got {vectors.dim()}D")
+
+    vectors = F.normalize(vectors.float(), dim=-1)
+    num_clusters = min(num_clusters, vectors.shape[0])
+
+    chosen = [0]
+    nearest = vectors @ vectors[0]
+    for _ in range(1, num_clusters):
+        candidate = int(nearest.argmin())
+        chosen.append(candidate)
+        nearest = torch.maximum(nearest, vectors @ vectors[candidate])
+
+    return vectors[chosen].clone()
@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from loguru import logger
+
+from src.utils.clustering_utils import farthest_point_centroids, spherical_kmeans
+
+
+def stack_page_embeddings(
+    pages: list[tuple[int, torch.Tensor]],
+    max_patches_per_page: int,
+    embedding_dim: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    matrices = []
+    page_columns = []
+    patch_columns = []
+
+    for page_number, embeddings in pages:
+        if embeddings.dim() != 2:
+            raise ValueError(f"Expected 2D tensor, got {embeddings.dim()}D")
+
+        if embeddings.shape[1] != embedding_dim:
+            raise ValueError(f"Expected embedding dim {embedding_dim}, got {embeddings.shape[1]}")
+
+        if embeddings.shape[0] > max_patches_per_page:
+            logger.warning(f"Truncating patches from {embeddings.shape[0]} to {max_patches_per_page}")
+            embeddings = embeddings[:max_patches_per_page]
+
+        num_patches = embeddings.shape[0]
+        matrices.append(embeddings.detach().cpu().float().numpy())
+        page_columns.append(np.full(num_patches, page_number, dtype=np.int32))
+        patch_columns.append(np.arange(num_patches, dtype=np.int32))
+
+    if not matrices:
+        return (
+            np.empty((0, embedding_dim), dtype=np.float32),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int32),
+        )
+
+    return np.concatenate(matrices), np.concatenate(page_columns), np.concatenate(patch_columns)
+
+
+def binarize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    if embeddings.ndim != 2:
+        raise ValueError(f"Expected 2D embedding matrix, got {embeddings.ndim}D")
+    if embeddings.shape[1] % 8 != 0:
+        raise ValueError(f"Embedding dim must be a multiple of 8 to pack bits, got {embeddings.shape[1]}")
+
+    return np.packbits(embeddings > 0, axis=1)
+
+
+def hamming_to_similarity(distance: float, embedding_dim: int) -> float:
+    return float(embedding_dim) - 2.0 * float(distance)
+
+
+def pool_patch_embeddings(embeddings: torch.Tensor, pool_factor: int, num_iterations: int = 10) -> torch.Tensor:
+    if embeddings.dim() != 2:
+        raise ValueError(f"Expected 2D tensor, got {embeddings.dim()}D")
+    if pool_factor < 1:
+        raise ValueError(f"Pool factor must be at least 1, got {pool_factor}")
+
+    num_patches = embeddings.shape[0]
+    if pool_factor == 1 or num_patches <= 1:
+        return embeddings
+
+    vectors = embeddings.detach().float().cpu()
+    num_clusters = math.ceil(num_patches / pool_factor)
+    centroids, assignments = spherical_kmeans(
+        vectors,
+        num_clusters,
+        num_iterations=num_iterations,
+        initial_centroids=farthest_point_centroids(vectors, num_clusters),
+    )
+
+    counts = torch.bincount(assignments, minlength=centroids.shape[0])
+    norm_sums = torch.zeros(centroids.shape[0]).index_add_(0, assignments, vectors.norm(dim=-1))
+    used = counts > 0
+    pooled = centroids[used] * (norm_sums[used] / counts[used]).unsqueeze(1)
+
+    return pooled.to(embeddings.dtype)
+
+
+def prune_query_tokens(query_embeddings: torch.Tensor, max_tokens: int, similarity_threshold: float) -> torch.Tensor:
+    if query_embeddings.dim() != 2:
+        raise ValueError(f"Expected 2D tensor, got {query_embeddings.dim()}D")
+
+    num_tokens = query_embeddings.shape[0]
+    if num_tokens <= 1:
+        return query_embeddings
+
+    vectors = F.normalize(query_embeddings.detach().float().cpu(), dim=-1)
+    similarities = vectors @ vectors.T
+    redundancy = (similarities.sum(dim=1) - 1.0) / (num_tokens - 1)
+
+    kept: list[int] = []
+    for index in redundancy.argsort().tolist():
+        if kept and similarities[index, kept].max() >= similarity_threshold:
+            continue
+        kept.append(index)
+        if 0 < max_tokens <= len(kept):
+            break
+
+    return query_embeddings[sorted(kept)]
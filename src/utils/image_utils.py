@@ -1,4 +1,5 @@
 import base64
+import hashlib
 from io import BytesIO
 
 from loguru import logger
@@ -59,3 +60,9 @@ def get_image_dimensions(image: Image.Image) -> tuple[int, int]:
     except Exception as exc:
         logger.opt(exception=exc).error("Failed to get image dimensions")
         raise ValueError(f"Failed to get image dimensions: {exc}") from exc
+
+
+def hash_page_image(image: Image.Image) -> str:
+    page_hash = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    page_hash.update(image.tobytes())
+    return page_hash.hexdigest()
@@ -0,0 +1,35 @@
+import torch
+
+
+def maxsim_scores(
+    query_embeddings: torch.Tensor,
+    doc_embeddings: torch.Tensor,
+    page_index: torch.Tensor,
+    num_pages: int,
+) -> torch.Tensor:
+    if query_embeddings.dim() != 2 or doc_embeddings.dim() != 2:
+        raise ValueError("Expected 2D query and document embeddings")
+
+    if doc_embeddings.shape[0] != page_index.shape[0]:
+        raise ValueError(f"Got {doc_embeddings.shape[0]} document embeddings but {page_index.shape[0]} page indices")
+
+    similarities = query_embeddings.float() @ doc_embeddings.float().T
+    return maxsim_from_similarities(similarities, page_index, num_pages)
+
+
+def maxsim_from_similarities(
+    similarities: torch.Tensor,
+    page_index: torch.Tensor,
+    num_pages: int,
+) -> torch.Tensor:
+    num_tokens = similarities.shape[0]
+
+    page_max = torch.full((num_tokens, num_pages), float("-inf"), dtype=similarities.dtype)
+    page_max = page_max.scatter_reduce(
+        1,
+        page_index.long().unsqueeze(0).expand(num_tokens, -1),
+        similarities,
+        reduce="amax",
+    )
+
+    return page_max.sum(dim=0)
@@ -0,0 +1,41 @@
+import hashlib
+from pathlib import Path
+
+from fastapi import UploadFile
+from loguru import logger
+
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+async def stream_upload_to_file(
+    file: UploadFile,
+    dest_path: Path,
+    max_bytes: int | None = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> tuple[str, int]:
+    if chunk_bytes <= 0:
+        raise ValueError(f"chunk_bytes must be positive, got {chunk_bytes}")
+
+    sha256_hash = hashlib.sha256()
+    size_bytes = 0
+
+    try:
+        with open(dest_path, "wb") as f:
+            while chunk := await file.read(chunk_bytes):
+                size_bytes += len(chunk)
+                if max_bytes and size_bytes > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds maximum size of {max_bytes} bytes")
+
+                sha256_hash.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        dest_path.unlink(missing_ok=True)
+        raise
+
+    doc_id = sha256_hash.hexdigest()
+    logger.debug(f"Streamed upload to {dest_path}: {size_bytes} bytes, doc_id={doc_id}")
+    return doc_id, size_bytes
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.v1 import generate
+from src.models.document import GenerateRequest, SourceReference
+from src.services.generation_service import PageImage
+
+
+class FakeGenerationService:
+    def __init__(self, tokens, fail_after=None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+
+    async def stream_answer(self, query, images, model=None):
+        for i, token in enumerate(self.tokens):
+            if i == self.fail_after:
+                raise RuntimeError("upstream broke")
+            yield token
+
+
+class StalledGenerationService:
+    def __init__(self):
+        self.closed = False
+
+    async def stream_answer(self, query, images, model=None):
+        try:
+            await asyncio.Event().wait()
+            yield "never"
+        finally:
+            self.closed = True
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    async def retrieve_sources(request):
+        page = PageImage(doc_id="doc", page_number=2, path=tmp_path / "page_02.png")
+        return [page], [SourceReference(doc_id="doc", page_number=2, score=12.5)]
+
+    monkeypatch.setattr(generate, "_retrieve_sources", retrieve_sources)
+    app = FastAPI()
+    app.include_router(generate.router, prefix="/api/v1")
+    return TestClient(app)
+
+
+def _events(response):
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+@pytest.mark.unit
+def test_stream_sends_sources_then_tokens(client, monkeypatch):
+    monkeypatch.setattr(generate, "get_generation_service", lambda: FakeGenerationService(["The ", "answer"]))
+
+    with client.stream("POST", "/api/v1/generate/stream", json={"query": "What?"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = _events(response)
+
+    assert events[0] == {"type": "sources", "sources": [{"doc_id": "doc", "page_number": 2, "score": 12.5}]}
+    assert [event["text"] for event in events[1:-1]] == ["The ", "answer"]
+    assert events[-1]["type"] == "done"
+    assert "generation_time_ms" in events[-1]
+
+
+@pytest.mark.unit
+def test_stream_reports_midstream_failure(client, monkeypatch):
+    monkeypatch.setattr(generate, "get_generation_service", lambda: FakeGenerationService(["a", "b"], fail_after=1))
+
+    with client.stream("POST", "/api/v1/generate/stream", json={"query": "What?"}) as response:
+        events = _events(response)
+
+    assert [event["type"] for event in events] == ["sources", "token", "error"]
+
+
+@pytest.mark.unit
+def test_stream_rejects_requests_without_sources(client, monkeypatch):
+    async def no_sources(request):
+        raise ValueError("No relevant documents found for the query")
+
+    monkeypatch.setattr(generate, "_retrieve_sources", no_sources)
+
+    response = client.post("/api/v1/generate/stream", json={"query": "What?"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.unit
+async def test_stream_closes_upstream_when_client_disconnects_before_first_token(monkeypatch):
+    service = StalledGenerationService()
+    monkeypatch.setattr(generate, "get_generation_service", lambda: service)
+
+    async def collect():
+        stream = generate._stream_events(
+            DisconnectedRequest(), GenerateRequest(query="What?"), [], [], time.perf_counter()
+        )
+        return [json.loads(line) async for line in stream]
+
+    events = await asyncio.wait_for(collect(), timeout=5)
+
+    assert [event["type"] for event in events] == ["sources"]
+    assert service.closed
@@ -0,0 +1,127 @@
+import os
+import shutil
+from pathlib import Path
+
+import pymupdf
+import pytest
+
+from src.core.config import settings
+from src.services import document_catalog as catalog_module
+from src.services.document_catalog import DocumentCatalog
+from src.services.pdf_processor import generate_doc_id
+
+
+def _write_pdf(path: Path, num_pages: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = pymupdf.open()
+    for i in range(num_pages):
+        page = document.new_page()
+        page.insert_text((72, 72), f"page {i + 1}")
+    document.save(path)
+    document.close()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    _write_pdf(tmp_path / "documents" / "alpha" / "original.pdf", 2)
+    _write_pdf(tmp_path / "documents" / "beta" / "original.pdf", 3)
+    return tmp_path
+
+
+@pytest.fixture
+def catalog(data_dir):
+    catalog = DocumentCatalog(data_dir)
+    yield catalog
+    catalog.close()
+
+
+@pytest.fixture
+def count_hashes(monkeypatch):
+    calls = []
+
+    def counting_generate_doc_id(path):
+        calls.append(Path(path))
+        return generate_doc_id(path)
+
+    monkeypatch.setattr(catalog_module, "generate_doc_id", counting_generate_doc_id)
+    return calls
+
+
+@pytest.mark.unit
+def test_list_documents_discovers_out_of_band_files(catalog, data_dir):
+    documents = catalog.list_documents()
+
+    assert [doc.doc_name for doc in documents] == ["alpha", "beta"]
+    assert [doc.page_count for doc in documents] == [2, 3]
+    assert documents[0].doc_id == generate_doc_id(data_dir / "documents" / "alpha" / "original.pdf")
+
+
+@pytest.mark.unit
+def test_page_count_respects_pdf_max_pages(catalog, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_max_pages", 2)
+
+    assert [doc.page_count for doc in catalog.list_documents()] == [2, 2]
+
+
+@pytest.mark.unit
+def test_lookups_do_not_rehash_unchanged_files(catalog, count_hashes):
+    catalog.list_documents()
+    count_hashes.clear()
+
+    documents = catalog.list_documents()
+    by_name = catalog.get_by_name("alpha")
+    by_id = catalog.get_by_id(documents[1].doc_id)
+    mapping = catalog.doc_id_to_name([doc.doc_id for doc in documents])
+
+    assert count_hashes == []
+    assert by_name.doc_name == "alpha"
+    assert by_id.doc_name == "beta"
+    assert mapping == {doc.doc_id: doc.doc_name for doc in documents}
+
+
+@pytest.mark.unit
+def test_modified_file_is_refreshed(catalog, data_dir):
+    old_id = catalog.get_by_name("alpha").doc_id
+    pdf_path = data_dir / "documents" / "alpha" / "original.pdf"
+    _write_pdf(pdf_path, 5)
+    stat = pdf_path.stat()
+    os.utime(pdf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    document = catalog.get_by_name("alpha")
+
+    assert document.page_count == 5
+    assert document.doc_id != old_id
+    assert catalog.get_by_id(old_id) is None
+
+
+@pytest.mark.unit
+def test_removed_document_is_dropped(catalog, data_dir):
+    catalog.list_documents()
+    shutil.rmtree(data_dir / "documents" / "beta")
+
+    assert catalog.get_by_name("beta") is None
+    assert [doc.doc_name for doc in catalog.list_documents()] == ["alpha"]
+
+
+@pytest.mark.unit
+def test_ingest_status_is_reported(catalog):
+    document = catalog.get_by_name("alpha")
+    assert document.ingest_status is None
+
+    catalog.set_ingest_status(document.doc_id, "completed")
+
+    assert catalog.get_ingest_status(document.doc_id) == "completed"
+    assert catalog.get_by_name("alpha").ingest_status == "completed"
+
+
+@pytest.mark.unit
+def test_catalog_persists_across_instances(catalog, data_dir, count_hashes):
+    catalog.list_documents()
+    count_hashes.clear()
+
+    reopened = DocumentCatalog(data_dir)
+    try:
+        assert [doc.doc_name for doc in reopened.list_documents()] == ["alpha", "beta"]
+        assert count_hashes == []
+    finally:
+        reopened.close()
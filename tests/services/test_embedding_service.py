@@ -1,8 +1,12 @@
+import threading
+
 import pytest
 import torch
 from PIL import Image
 
-from src.services.embedding_service import EmbeddingService
+import src.services.embedding_service as embedding_module
+from src.core.config import settings
+from src.services.embedding_service import EmbeddingService, get_query_embedding_cache
 
 
 @pytest.fixture
@@ -110,3 +114,119 @@ def test_encode_images_batch_invalid_batch_size(embedding_service, sample_images
 def test_encode_images_batch_empty_list(embedding_service):
     with pytest.raises(ValueError, match="Images list cannot be empty"):
         embedding_service.encode_images_batch([], 2)
+
+
+class FakeBatch(dict):
+    def to(self, device):
+        return self
+
+
+class FakeProcessor:
+    image_token_id = 7
+
+    def process_images(self, images):
+        return FakeBatch(
+            input_ids=torch.tensor([[1, 7, 7, 7, 2, 0], [1, 7, 7, 2, 0, 0]])[: len(images)],
+            attention_mask=torch.tensor([[1, 1, 1, 1, 1, 0], [1, 1, 1, 1, 0, 0]])[: len(images)],
+        )
+
+    def get_image_mask(self, batch_images):
+        return batch_images["input_ids"] == self.image_token_id
+
+    def process_queries(self, queries):
+        return FakeBatch(
+            input_ids=torch.ones(len(queries), 4, dtype=torch.long),
+            attention_mask=torch.ones(len(queries), 4, dtype=torch.long),
+        )
+
+
+class FakeModel:
+    device = "cpu"
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        return torch.randn(*kwargs["input_ids"].shape, 128, dtype=torch.bfloat16)
+
+
+class FakeLoader:
+    def __init__(self):
+        self.model = FakeModel()
+        self.processor = FakeProcessor()
+        self.inference_lock = threading.Lock()
+
+
+@pytest.fixture
+def cached_embedding_service(monkeypatch):
+    monkeypatch.setattr(embedding_module, "_query_embedding_cache", None)
+    monkeypatch.setattr(settings, "query_batching_enabled", False)
+    service = EmbeddingService()
+    service._loader = FakeLoader()
+    return service
+
+
+@pytest.mark.unit
+def test_encode_query_cache_hit_skips_model(cached_embedding_service):
+    first = cached_embedding_service.encode_query("What is ViDoRe?")
+    second = cached_embedding_service.encode_query("  What is   ViDoRe? ")
+
+    assert cached_embedding_service._loader.model.calls == 1
+    assert second.dtype == torch.bfloat16
+    assert torch.allclose(first.float(), second.float(), atol=1e-2)
+
+    stats = get_query_embedding_cache().stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+
+
+@pytest.mark.unit
+def test_encode_query_cache_keyed_by_model(cached_embedding_service, monkeypatch):
+    cached_embedding_service.encode_query("same query")
+    monkeypatch.setattr(settings, "colqwen2_model_name", "other-model")
+    cached_embedding_service.encode_query("same query")
+
+    assert cached_embedding_service._loader.model.calls == 2
+
+
+@pytest.mark.unit
+def test_encode_queries_strips_padding(cached_embedding_service):
+    processor = cached_embedding_service._loader.processor
+    padded = FakeBatch(
+        input_ids=torch.ones(2, 4, dtype=torch.long),
+        attention_mask=torch.tensor([[0, 0, 1, 1], [1, 1, 1, 1]]),
+    )
+    processor.process_queries = lambda queries: padded
+
+    embeddings = cached_embedding_service.encode_queries(["short", "a longer query"])
+
+    assert [e.shape for e in embeddings] == [(1, 2, 128), (1, 4, 128)]
+
+
+@pytest.mark.unit
+def test_encode_page_images_keeps_only_image_tokens(cached_embedding_service, sample_images):
+    embeddings = cached_embedding_service.encode_page_images(sample_images)
+
+    assert [e.shape for e in embeddings] == [(3, 128), (2, 128)]
+
+
+@pytest.mark.unit
+def test_encode_page_images_without_image_mask_keeps_attended_tokens(
+    cached_embedding_service, sample_images, monkeypatch
+):
+    monkeypatch.setattr(settings, "colqwen2_image_tokens_only", False)
+
+    embeddings = cached_embedding_service.encode_page_images(sample_images)
+
+    assert [e.shape for e in embeddings] == [(5, 128), (4, 128)]
+
+
+@pytest.mark.unit
+def test_image_without_image_tokens_falls_back_to_attention_mask(cached_embedding_service, sample_images):
+    processor = cached_embedding_service._loader.processor
+    processor.get_image_mask = lambda batch: torch.zeros_like(batch["input_ids"], dtype=torch.bool)
+
+    embeddings = cached_embedding_service.encode_page_images(sample_images)
+
+    assert [e.shape for e in embeddings] == [(5, 128), (4, 128)]
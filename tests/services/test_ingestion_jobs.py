@@ -0,0 +1,245 @@
+import threading
+import time
+
+import pytest
+
+from src.services.ingestion_jobs import IngestionJobStore, IngestionWorkerPool
+from src.services.ingestion_pipeline import IngestionCancelledError, IngestionInterruptedError, StageStats
+
+
+@pytest.fixture
+def job_store(tmp_path):
+    store = IngestionJobStore(tmp_path / "jobs.db")
+    yield store
+    store.close()
+
+
+def _create_job(store, tmp_path, job_id="job-1", pages_total=3):
+    pdf_path = tmp_path / f"{job_id}.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+    return store.create(job_id, f"doc-{job_id}", "report.pdf", pdf_path, 150, None, pages_total)
+
+
+def _wait_for_status(store, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}, last status {store.get(job_id).status}")
+
+
+class FakeIngestionService:
+    def __init__(self, pages=3, block=None, fail=False):
+        self.pages = pages
+        self.block = block
+        self.fail = fail
+        self.calls = []
+        self.discarded = []
+        self.last_stage_stats = [StageStats(name="encode", items=pages, busy_seconds=1.0, utilization=0.5)]
+
+    def ingest_pdf_from_path(
+        self, pdf_path, dpi, max_pages, doc_id, should_cancel=None, on_progress=None, should_interrupt=None
+    ):
+        self.calls.append((pdf_path, dpi, max_pages, doc_id))
+        if self.fail:
+            raise RuntimeError("model exploded")
+
+        for page in range(1, self.pages + 1):
+            if self.block is not None:
+                self.block.wait(5.0)
+            if should_cancel():
+                raise IngestionCancelledError("Ingestion cancelled")
+            if should_interrupt():
+                raise IngestionInterruptedError("Ingestion interrupted")
+            on_progress(page, page * 10)
+
+        return doc_id, self.pages, self.pages * 10
+
+    def discard_partial_document(self, doc_id):
+        self.discarded.append(doc_id)
+        return True
+
+
+@pytest.mark.unit
+def test_store_job_lifecycle(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    assert job.status == "queued"
+
+    claimed = job_store.claim_next()
+    assert claimed.job_id == job.job_id
+    assert claimed.status == "running"
+    assert job_store.claim_next() is None
+
+    job_store.update_progress(job.job_id, 2, 20)
+    assert job_store.get(job.job_id).pages_indexed == 2
+
+    job_store.finish(job.job_id, "completed", pages_indexed=3, patches_stored=30, stage_utilization={"encode": 0.9})
+    finished = job_store.get(job.job_id)
+    assert finished.status == "completed"
+    assert finished.stage_utilization == {"encode": 0.9}
+
+
+@pytest.mark.unit
+def test_store_claims_oldest_job_first(job_store, tmp_path):
+    _create_job(job_store, tmp_path, "first")
+    _create_job(job_store, tmp_path, "second")
+
+    assert job_store.claim_next().job_id == "first"
+    assert job_store.claim_next().job_id == "second"
+
+
+@pytest.mark.unit
+def test_cancel_queued_job_is_immediate(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+
+    cancelled = job_store.request_cancel(job.job_id)
+
+    assert cancelled.status == "cancelled"
+    assert job_store.claim_next() is None
+
+
+@pytest.mark.unit
+def test_interrupted_jobs_are_requeued(job_store, tmp_path):
+    _create_job(job_store, tmp_path, "a")
+    _create_job(job_store, tmp_path, "b")
+    job_store.claim_next()
+    job_store.claim_next()
+    job_store.request_cancel("b")
+
+    assert [job.job_id for job in job_store.cancel_interrupted()] == ["b"]
+    assert job_store.requeue_interrupted() == 1
+    assert job_store.get("a").status == "queued"
+    assert job_store.get("b").status == "cancelled"
+
+
+@pytest.mark.unit
+def test_restart_rolls_back_job_cancelled_while_running(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    job_store.claim_next()
+    job_store.request_cancel(job.job_id)
+    service = FakeIngestionService()
+    pool = IngestionWorkerPool(job_store, num_workers=1, poll_interval_seconds=0.01, service_factory=lambda: service)
+
+    pool.start()
+    pool.stop(timeout=5)
+
+    assert job_store.get(job.job_id).status == "cancelled"
+    assert service.discarded == [job.doc_id]
+    assert service.calls == []
+    assert not (tmp_path / "job-1.pdf").exists()
+
+
+@pytest.mark.unit
+def test_worker_pool_completes_jobs(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    service = FakeIngestionService()
+    pool = IngestionWorkerPool(job_store, num_workers=2, poll_interval_seconds=0.01, service_factory=lambda: service)
+
+    pool.start()
+    try:
+        finished = _wait_for_status(job_store, job.job_id, ("completed",))
+    finally:
+        pool.stop(timeout=5)
+
+    assert finished.pages_indexed == 3
+    assert finished.patches_stored == 30
+    assert finished.stage_utilization == {"encode": 0.5}
+    assert service.calls[0][3] == job.doc_id
+    assert not (tmp_path / "job-1.pdf").exists()
+
+
+@pytest.mark.unit
+def test_worker_pool_records_failures(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    pool = IngestionWorkerPool(
+        job_store, num_workers=1, poll_interval_seconds=0.01, service_factory=lambda: FakeIngestionService(fail=True)
+    )
+
+    pool.start()
+    try:
+        failed = _wait_for_status(job_store, job.job_id, ("failed",))
+    finally:
+        pool.stop(timeout=5)
+
+    assert failed.error == "model exploded"
+
+
+@pytest.mark.unit
+def test_failed_job_can_be_resumed(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    service = FakeIngestionService(fail=True)
+    pool = IngestionWorkerPool(job_store, num_workers=1, poll_interval_seconds=0.01, service_factory=lambda: service)
+
+    pool.start()
+    try:
+        _wait_for_status(job_store, job.job_id, ("failed",))
+        assert (tmp_path / "job-1.pdf").exists()
+
+        service.fail = False
+        resumed = pool.resume(job.job_id)
+        assert resumed.status in ("queued", "running", "completed")
+        assert resumed.error is None
+        finished = _wait_for_status(job_store, job.job_id, ("completed",))
+    finally:
+        pool.stop(timeout=5)
+
+    assert finished.pages_indexed == 3
+    assert pool.resume(job.job_id).status == "completed"
+    assert pool.resume("missing") is None
+
+
+@pytest.mark.unit
+def test_cancelling_failed_job_removes_its_upload_and_pages(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    service = FakeIngestionService(fail=True)
+    pool = IngestionWorkerPool(job_store, num_workers=1, poll_interval_seconds=0.01, service_factory=lambda: service)
+
+    pool.start()
+    try:
+        _wait_for_status(job_store, job.job_id, ("failed",))
+        cancelled = pool.cancel(job.job_id)
+    finally:
+        pool.stop(timeout=5)
+
+    assert cancelled.status == "cancelled"
+    assert service.discarded == [job.doc_id]
+    assert not (tmp_path / "job-1.pdf").exists()
+
+
+@pytest.mark.unit
+def test_running_job_can_be_cancelled(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    block = threading.Event()
+    pool = IngestionWorkerPool(
+        job_store, num_workers=1, poll_interval_seconds=0.01, service_factory=lambda: FakeIngestionService(block=block)
+    )
+
+    pool.start()
+    try:
+        _wait_for_status(job_store, job.job_id, ("running",))
+        assert pool.cancel(job.job_id).cancel_requested
+        block.set()
+        cancelled = _wait_for_status(job_store, job.job_id, ("cancelled",))
+    finally:
+        pool.stop(timeout=5)
+
+    assert cancelled.status == "cancelled"
+
+
+@pytest.mark.unit
+def test_shutdown_requeues_running_job(job_store, tmp_path):
+    job = _create_job(job_store, tmp_path)
+    block = threading.Event()
+    pool = IngestionWorkerPool(
+        job_store, num_workers=1, poll_interval_seconds=0.01, service_factory=lambda: FakeIngestionService(block=block)
+    )
+
+    pool.start()
+    _wait_for_status(job_store, job.job_id, ("running",))
+    threading.Timer(0.05, block.set).start()
+    pool.stop(timeout=5)
+
+    assert job_store.get(job.job_id).status == "queued"
+    assert (tmp_path / "job-1.pdf").exists()
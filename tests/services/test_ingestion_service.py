@@ -1,8 +1,23 @@
 from pathlib import Path
 
+import numpy as np
+import pymupdf
 import pytest
+import torch
+from PIL import Image
 
+from src.core.config import settings
+from src.services import pdf_processor
+from src.services.document_catalog import DocumentCatalog
+from src.services.ingestion_pipeline import IngestionCancelledError, IngestionInterruptedError
 from src.services.ingestion_service import IngestionService
+from src.services.page_hash_index import PageHashIndex
+from src.utils.image_utils import hash_page_image
+
+
+@pytest.fixture(autouse=True)
+def disable_page_dedup(monkeypatch):
+    monkeypatch.setattr(settings, "page_dedup_enabled", False)
 
 
 @pytest.fixture
@@ -46,3 +61,373 @@ def test_ingest_pdf_custom_doc_id(ingestion_service, sample_pdf_path):
     assert doc_id == custom_id
     assert pages == 1
     assert patches > 0
+
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def encode_page_images(self, images):
+        self.batch_sizes.append(len(images))
+        return [torch.randn(10 + i, 128) for i in range(len(images))]
+
+
+class FakeIndexBackend:
+    def __init__(self, fail_on_page=None):
+        self.fail_on_page = fail_on_page
+        self.inserted = []
+        self.deleted = []
+        self.stored = {}
+
+    def insert_pages(self, doc_id, pages):
+        if any(page_number == self.fail_on_page for page_number, _ in pages):
+            raise RuntimeError("insert failed")
+        self.inserted.extend((doc_id, page_number, embeddings.shape[0]) for page_number, embeddings in pages)
+        self.stored.update(((doc_id, page_number), embeddings.float().numpy()) for page_number, embeddings in pages)
+        return sum(embeddings.shape[0] for _, embeddings in pages)
+
+    def document_exists(self, doc_id):
+        return False
+
+    def get_page_embeddings(self, pages):
+        return {key: self.stored[key] for key in pages if key in self.stored}
+
+    def delete_document(self, doc_id, except_pages=None):
+        self.deleted.append(doc_id)
+        keep = set(except_pages or ())
+        self.stored = {key: value for key, value in self.stored.items() if key[0] != doc_id or key[1] in keep}
+        return 0
+
+
+@pytest.fixture
+def page_numbers():
+    return [1, 2, 3, 4, 5]
+
+
+def _render_page(page_number):
+    return Image.new("RGB", (64, 64), color=(page_number, 0, 0))
+
+
+def _pages(page_numbers, render_page=_render_page):
+    return ((page_number, render_page(page_number)) for page_number in page_numbers)
+
+
+@pytest.mark.unit
+def test_pages_encoded_in_configured_batches(page_numbers, monkeypatch):
+    monkeypatch.setattr(settings, "colqwen2_batch_size", 2)
+    embedding_service = FakeEmbeddingService()
+    backend = FakeIndexBackend()
+    service = IngestionService(embedding_service=embedding_service, milvus_service=backend)
+
+    total_patches = service._process_and_store_pages("doc", _pages(page_numbers))
+
+    assert embedding_service.batch_sizes == [2, 2, 1]
+    assert [page for _, page, _ in backend.inserted] == [1, 2, 3, 4, 5]
+    assert total_patches == 10 + 11 + 10 + 11 + 10
+
+
+@pytest.mark.unit
+def test_failed_batch_keeps_stored_pages(page_numbers, monkeypatch):
+    monkeypatch.setattr(settings, "colqwen2_batch_size", 2)
+    monkeypatch.setattr(settings, "milvus_insert_batch_rows", 1)
+    backend = FakeIndexBackend(fail_on_page=4)
+    service = IngestionService(embedding_service=FakeEmbeddingService(), milvus_service=backend)
+
+    with pytest.raises(RuntimeError):
+        service._process_and_store_pages("doc", _pages(page_numbers))
+
+    assert backend.deleted == []
+    assert [page for _, page, _ in backend.inserted] == [1, 2, 3]
+
+
+@pytest.mark.unit
+def test_token_pooling_shrinks_stored_patches(page_numbers, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_token_pool_factor", 2)
+    monkeypatch.setattr(settings, "colqwen2_batch_size", 1)
+    backend = FakeIndexBackend()
+    service = IngestionService(embedding_service=FakeEmbeddingService(), milvus_service=backend)
+
+    total_patches = service._process_and_store_pages("doc", _pages(page_numbers))
+
+    assert all(0 < patches <= 5 for _, _, patches in backend.inserted)
+    assert total_patches == sum(patches for _, _, patches in backend.inserted)
+
+
+@pytest.mark.unit
+def test_pipeline_reports_stage_utilization(page_numbers):
+    service = IngestionService(embedding_service=FakeEmbeddingService(), milvus_service=FakeIndexBackend())
+
+    service._process_and_store_pages("doc", _pages(page_numbers))
+
+    stats = {stage.name: stage for stage in service.last_stage_stats}
+    assert set(stats) == {"render", "encode", "insert"}
+    assert stats["render"].items == 5
+    assert stats["insert"].items == 5
+    assert all(0.0 <= stage.utilization <= 1.0 for stage in stats.values())
+
+
+@pytest.mark.unit
+def test_render_failure_stops_pipeline(page_numbers):
+    backend = FakeIndexBackend()
+    service = IngestionService(embedding_service=FakeEmbeddingService(), milvus_service=backend)
+
+    def failing_render(page_number):
+        if page_number == 3:
+            raise ValueError("render failed")
+        return _render_page(page_number)
+
+    with pytest.raises(ValueError, match="render failed"):
+        service._process_and_store_pages("doc", _pages(page_numbers, failing_render))
+
+    assert service.last_pages_indexed <= 2
+
+
+@pytest.mark.unit
+def test_ingest_renders_only_requested_pages(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "long.pdf"
+    document = pymupdf.open()
+    for _ in range(12):
+        document.new_page(width=72, height=72)
+    document.save(pdf_path)
+    document.close()
+
+    rendered = []
+    original = pdf_processor._rasterize_page
+
+    def tracking_rasterize(page, matrix):
+        rendered.append(page.number + 1)
+        return original(page, matrix)
+
+    monkeypatch.setattr(pdf_processor, "_rasterize_page", tracking_rasterize)
+    monkeypatch.setattr(settings, "pdf_render_backend", "thread")
+    monkeypatch.setattr(settings, "pdf_max_pages", 10)
+    backend = FakeIndexBackend()
+    catalog = DocumentCatalog(tmp_path / "data")
+    service = IngestionService(
+        embedding_service=FakeEmbeddingService(), milvus_service=backend, document_catalog=catalog
+    )
+
+    _, pages, _ = service.ingest_pdf_from_path(pdf_path, dpi=72, max_pages=3)
+    assert pages == 3
+    assert sorted(rendered) == [1, 2, 3]
+
+    rendered.clear()
+    _, pages, _ = service.ingest_pdf_from_path(pdf_path, dpi=72)
+    assert pages == 10
+    assert sorted(rendered) == list(range(1, 11))
+    catalog.close()
+
+
+@pytest.mark.unit
+def test_failed_insert_stops_consuming_pages(page_numbers):
+    consumed = []
+
+    def pages():
+        for page_number in range(1, 1000):
+            consumed.append(page_number)
+            yield page_number, _render_page(page_number)
+
+    backend = FakeIndexBackend(fail_on_page=1)
+    service = IngestionService(embedding_service=FakeEmbeddingService(), milvus_service=backend)
+
+    with pytest.raises(RuntimeError):
+        service._process_and_store_pages("doc", pages())
+
+    assert len(consumed) < 1000
+
+
+@pytest.fixture
+def page_hash_index(tmp_path):
+    index = PageHashIndex(tmp_path / "page_hashes.db")
+    yield index
+    index.close()
+
+
+def _service_with_index(embedding_service, backend, page_hash_index):
+    return IngestionService(
+        embedding_service=embedding_service, milvus_service=backend, page_hash_index=page_hash_index
+    )
+
+
+@pytest.mark.unit
+def test_shared_pages_reuse_stored_embeddings(page_hash_index):
+    embedding_service = FakeEmbeddingService()
+    backend = FakeIndexBackend()
+    service = _service_with_index(embedding_service, backend, page_hash_index)
+
+    service._process_and_store_pages("doc-a", _pages([1, 2, 3]))
+    encoded_before = sum(embedding_service.batch_sizes)
+
+    shared = {1: _render_page(1), 2: _render_page(3), 3: _render_page(200)}
+    service._process_and_store_pages("doc-b", ((page, shared[page]) for page in (1, 2, 3)))
+
+    assert sum(embedding_service.batch_sizes) - encoded_before == 1
+    assert np.array_equal(backend.stored[("doc-b", 1)], backend.stored[("doc-a", 1)])
+    assert np.array_equal(backend.stored[("doc-b", 2)], backend.stored[("doc-a", 3)])
+
+
+@pytest.mark.unit
+def test_deleted_source_pages_are_re_encoded(page_hash_index):
+    embedding_service = FakeEmbeddingService()
+    backend = FakeIndexBackend()
+    service = _service_with_index(embedding_service, backend, page_hash_index)
+
+    service._process_and_store_pages("doc-a", _pages([1, 2]))
+    backend.delete_document("doc-a")
+    encoded_before = sum(embedding_service.batch_sizes)
+
+    service._process_and_store_pages("doc-b", _pages([1, 2]))
+
+    assert sum(embedding_service.batch_sizes) - encoded_before == 2
+    assert page_hash_index.lookup([hash_page_image(_render_page(1))]) == {
+        hash_page_image(_render_page(1)): ("doc-b", 1)
+    }
+
+
+@pytest.mark.unit
+def test_cancel_rolls_back_and_removes_page_hashes(tmp_path, page_hash_index):
+    backend = FakeIndexBackend()
+    catalog = DocumentCatalog(tmp_path / "data")
+    service = IngestionService(
+        embedding_service=FakeEmbeddingService(),
+        milvus_service=backend,
+        document_catalog=catalog,
+        page_hash_index=page_hash_index,
+    )
+    page_hash_index.add("doc", [(1, "stale")])
+
+    with pytest.raises(IngestionCancelledError):
+        service.ingest_pdf_from_path(_write_pdf(tmp_path, 4), dpi=72, doc_id="doc", should_cancel=lambda: True)
+
+    assert backend.deleted == ["doc"]
+    assert page_hash_index.lookup(["stale"]) == {}
+    assert catalog.get_ingest_status("doc") == "cancelled"
+    assert catalog.get_ingested_pages("doc") == set()
+    catalog.close()
+
+
+def _write_pdf(tmp_path, page_count):
+    pdf_path = tmp_path / f"{page_count}-pages.pdf"
+    document = pymupdf.open()
+    for _ in range(page_count):
+        document.new_page(width=72, height=72)
+    document.save(pdf_path)
+    document.close()
+    return pdf_path
+
+
+class ResumableIndexBackend(FakeIndexBackend):
+    def document_exists(self, doc_id):
+        return any(key[0] == doc_id for key in self.stored)
+
+
+@pytest.mark.unit
+def test_failed_ingest_resumes_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "milvus_insert_batch_rows", 1)
+    monkeypatch.setattr(settings, "colqwen2_batch_size", 1)
+    pdf_path = _write_pdf(tmp_path, 6)
+    rendered = []
+    original = pdf_processor._rasterize_page
+
+    def tracking_rasterize(page, matrix):
+        rendered.append(page.number + 1)
+        return original(page, matrix)
+
+    monkeypatch.setattr(pdf_processor, "_rasterize_page", tracking_rasterize)
+    monkeypatch.setattr(settings, "pdf_render_backend", "thread")
+    backend = ResumableIndexBackend(fail_on_page=4)
+    catalog = DocumentCatalog(tmp_path / "data")
+    service = IngestionService(
+        embedding_service=FakeEmbeddingService(), milvus_service=backend, document_catalog=catalog
+    )
+
+    with pytest.raises(RuntimeError, match="insert failed"):
+        service.ingest_pdf_from_path(pdf_path, dpi=72, doc_id="doc")
+
+    assert catalog.get_ingested_pages("doc") == {1, 2, 3}
+    assert service.document_state("doc") == "partial"
+
+    backend.fail_on_page = None
+    rendered.clear()
+    _, pages, _ = service.ingest_pdf_from_path(pdf_path, dpi=72, doc_id="doc")
+
+    assert sorted(rendered) == [4, 5, 6]
+    assert pages == 6
+    assert backend.deleted == ["doc"]
+    assert sorted(page for doc_id, page in backend.stored if doc_id == "doc") == [1, 2, 3, 4, 5, 6]
+    assert catalog.get_ingest_status("doc") == "completed"
+    assert service.document_state("doc") == "complete"
+    catalog.close()
+
+
+@pytest.mark.unit
+def test_interrupted_ingest_keeps_pages_for_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "milvus_insert_batch_rows", 1)
+    monkeypatch.setattr(settings, "colqwen2_batch_size", 1)
+    # The interrupt is observed between rendered pages; a warm process pool can finish all six first.
+    monkeypatch.setattr(settings, "pdf_render_backend", "thread")
+    backend = ResumableIndexBackend()
+    catalog = DocumentCatalog(tmp_path / "data")
+    service = IngestionService(
+        embedding_service=FakeEmbeddingService(), milvus_service=backend, document_catalog=catalog
+    )
+    progress = []
+
+    with pytest.raises(IngestionInterruptedError):
+        service.ingest_pdf_from_path(
+            _write_pdf(tmp_path, 6),
+            dpi=72,
+            doc_id="doc",
+            on_progress=lambda pages, patches: progress.append(pages),
+            should_interrupt=lambda: len(progress) >= 2,
+        )
+
+    assert backend.deleted == []
+    assert catalog.get_ingest_status("doc") == "partial"
+    assert len(catalog.get_ingested_pages("doc")) >= 2
+    catalog.close()
+
+
+@pytest.mark.unit
+def test_discard_partial_document_rolls_back_stored_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "milvus_insert_batch_rows", 1)
+    monkeypatch.setattr(settings, "colqwen2_batch_size", 1)
+    monkeypatch.setattr(settings, "pdf_render_backend", "thread")
+    backend = ResumableIndexBackend(fail_on_page=3)
+    catalog = DocumentCatalog(tmp_path / "data")
+    service = IngestionService(
+        embedding_service=FakeEmbeddingService(), milvus_service=backend, document_catalog=catalog
+    )
+    with pytest.raises(RuntimeError, match="insert failed"):
+        service.ingest_pdf_from_path(_write_pdf(tmp_path, 4), dpi=72, doc_id="doc")
+
+    assert service.discard_partial_document("doc")
+
+    assert backend.deleted == ["doc"]
+    assert catalog.get_ingested_pages("doc") == set()
+    assert catalog.get_ingest_status("doc") == "cancelled"
+    assert not service.discard_partial_document("doc")
+    catalog.close()
+
+
+@pytest.mark.unit
+def test_ingest_refuses_to_mix_pool_factors(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_render_backend", "thread")
+    backend = ResumableIndexBackend()
+    catalog = DocumentCatalog(tmp_path / "data")
+    service = IngestionService(
+        embedding_service=FakeEmbeddingService(), milvus_service=backend, document_catalog=catalog
+    )
+    pdf_path = _write_pdf(tmp_path, 2)
+    service.ingest_pdf_from_path(pdf_path, dpi=72, doc_id="unpooled")
+    assert catalog.get_pool_factors() == {1}
+
+    monkeypatch.setattr(settings, "ingest_token_pool_factor", 2)
+    with pytest.raises(ValueError, match="INGEST_TOKEN_POOL_FACTOR=2"):
+        service.ingest_pdf_from_path(pdf_path, dpi=72, doc_id="pooled")
+    assert not backend.document_exists("pooled")
+
+    catalog.clear_ingested_pages("unpooled")
+    service.ingest_pdf_from_path(pdf_path, dpi=72, doc_id="pooled")
+    assert catalog.get_pool_factors() == {2}
+    catalog.close()
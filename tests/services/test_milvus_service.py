@@ -1,8 +1,11 @@
+import numpy as np
 import pytest
 import torch
+from pymilvus import DataType, MilvusClient
 
 from src.core.config import settings
 from src.services.milvus_service import MilvusService, get_milvus_service
+from src.services.patch_vector_store import PatchVectorStore
 
 TEST_COLLECTION_NAME = "visual_rag_patches_test"
 
@@ -161,3 +164,298 @@ def test_get_milvus_service_singleton(monkeypatch):
     service1.drop_collection()
     service1.disconnect()
     monkeypatch.setattr(milvus_module, "_milvus_service", None)
+
+
+class FakeMilvusClient:
+    create_schema = staticmethod(MilvusClient.create_schema)
+    prepare_index_params = staticmethod(MilvusClient.prepare_index_params)
+
+    def __init__(self):
+        self.collections = {}
+        self.inserted = {}
+        self.batches = []
+        self.scripted_hits = {}
+        self.search_calls = []
+        self.consistency_levels = []
+
+    def script_hits(self, collection_name, hits_per_token):
+        self.scripted_hits[collection_name] = hits_per_token
+
+    def has_collection(self, collection_name):
+        return collection_name in self.collections
+
+    def create_collection(self, collection_name, schema, consistency_level=None, **kwargs):
+        self.collections[collection_name] = {"schema": schema, "consistency_level": consistency_level}
+
+    def describe_collection(self, collection_name):
+        collection = self.collections[collection_name]
+        return {**collection["schema"].to_dict(), "consistency_level": collection["consistency_level"]}
+
+    def create_index(self, collection_name, index_params):
+        pass
+
+    def load_collection(self, collection_name):
+        pass
+
+    def get_load_state(self, collection_name):
+        return {"state": "Loaded"}
+
+    def insert(self, collection_name, data):
+        self.batches.append(data)
+        self.inserted.setdefault(collection_name, []).extend(data)
+        return {"insert_count": len(data)}
+
+    def search(self, collection_name, data, filter=None, search_params=None, limit=10, **kwargs):
+        offset = sum(len(call[1]) for call in self.search_calls if call[0] == collection_name)
+        self.search_calls.append((collection_name, data, filter))
+        self.consistency_levels.append(kwargs.get("consistency_level"))
+
+        if collection_name in self.scripted_hits:
+            return [self.scripted_hits[collection_name][offset + i] for i in range(len(data))]
+        return [self._nearest_by_hamming(collection_name, query, search_params, limit) for query in data]
+
+    def _nearest_by_hamming(self, collection_name, query, search_params, limit):
+        assert search_params["metric_type"] == "HAMMING"
+        rows = self.inserted[collection_name]
+        stored = np.unpackbits(np.frombuffer(b"".join(row["embedding"] for row in rows), dtype=np.uint8))
+        stored = stored.reshape(len(rows), -1)
+
+        bits = np.unpackbits(np.frombuffer(query, dtype=np.uint8))
+        distances = (stored != bits).sum(axis=1)
+        nearest = np.argsort(distances, kind="stable")[:limit]
+        return [_hit(rows[i]["doc_id"], rows[i]["page_number"], int(distances[i])) for i in nearest]
+
+    def delete(self, collection_name, filter, **kwargs):
+        return {"delete_count": 0}
+
+    def flush(self, collection_name):
+        raise AssertionError("search must not flush")
+
+
+def _hit(doc_id, page_number, score):
+    return {"entity": {"doc_id": doc_id, "page_number": page_number}, "distance": score}
+
+
+@pytest.fixture
+def fake_milvus(monkeypatch, tmp_path):
+    client = FakeMilvusClient()
+    store = PatchVectorStore(tmp_path / "patch_vectors.db")
+    service = MilvusService(vector_store=store)
+    monkeypatch.setattr(service, "_get_client", lambda: client)
+    yield service, client, store
+    store.close()
+
+
+TOKEN_HITS = [
+    [_hit("doc_a", 1, 0.9), _hit("doc_a", 1, 0.5), _hit("doc_b", 2, 0.7)],
+    [_hit("doc_b", 2, 0.8), _hit("doc_a", 1, 0.1)],
+    [_hit("doc_a", 3, 0.6)],
+]
+
+
+@pytest.mark.unit
+def test_search_pages_batches_query_tokens(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    client.script_hits(settings.milvus_collection_name, TOKEN_HITS)
+    monkeypatch.setattr(settings, "milvus_search_batch_size", 2)
+
+    results = service.search_pages(torch.randn(3, 128), top_k=10)
+
+    assert [len(call[1]) for call in client.search_calls] == [2, 1]
+    assert results[0] == {"doc_id": "doc_b", "page_number": 2, "score": pytest.approx(1.5)}
+    assert results[1] == {"doc_id": "doc_a", "page_number": 1, "score": pytest.approx(1.0)}
+    assert results[2] == {"doc_id": "doc_a", "page_number": 3, "score": pytest.approx(0.6)}
+
+
+@pytest.mark.unit
+def test_search_pages_single_request_for_all_tokens(fake_milvus):
+    service, client, _ = fake_milvus
+    client.script_hits(settings.milvus_collection_name, TOKEN_HITS)
+
+    results = service.search_pages(torch.randn(3, 128), top_k=2)
+
+    assert len(client.search_calls) == 1
+    assert len(results) == 2
+
+
+@pytest.mark.unit
+def test_search_pages_rerank_uses_exact_maxsim(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    client.script_hits(settings.milvus_collection_name, TOKEN_HITS)
+    page_vectors = {
+        ("doc_a", 1): np.zeros((2, 128), dtype=np.float32),
+        ("doc_b", 2): np.zeros((2, 128), dtype=np.float32),
+        ("doc_a", 3): np.zeros((2, 128), dtype=np.float32),
+    }
+    page_vectors[("doc_a", 3)][0, 0] = 1.0
+    monkeypatch.setattr(service, "get_page_embeddings", lambda pages: {p: page_vectors[p] for p in pages})
+
+    query = torch.zeros(3, 128)
+    query[:, 0] = 1.0
+
+    results = service.search_pages(query, top_k=1, rerank_candidates=3)
+
+    assert results == [{"doc_id": "doc_a", "page_number": 3, "score": pytest.approx(3.0)}]
+
+
+@pytest.mark.unit
+def test_pages_filter_groups_by_document():
+    expr = MilvusService._pages_filter([("doc_a", 2), ("doc_b", 1), ("doc_a", 1)])
+
+    assert expr == '(doc_id == "doc_a" and page_number in [1, 2]) or (doc_id == "doc_b" and page_number in [1])'
+
+
+@pytest.mark.unit
+def test_insert_pages_sends_size_capped_batches(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    monkeypatch.setattr(settings, "milvus_insert_batch_rows", 16)
+
+    num_patches = service.insert_pages("doc", [(1, torch.randn(10, 128)), (2, torch.randn(12, 128))])
+
+    assert num_patches == 22
+    assert [len(batch) for batch in client.batches] == [16, 6]
+    rows = [row for batch in client.batches for row in batch]
+    assert [(row["page_number"], row["patch_index"]) for row in rows[9:11]] == [(1, 9), (2, 0)]
+    assert rows[0]["embedding"].dtype == np.float32
+
+
+@pytest.mark.unit
+def test_search_uses_configured_consistency_level(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    client.script_hits(settings.milvus_collection_name, TOKEN_HITS)
+    monkeypatch.setattr(settings, "milvus_consistency_level", "Bounded")
+
+    service.search_pages(torch.randn(3, 128))
+
+    assert client.consistency_levels == ["Bounded"]
+
+
+@pytest.mark.unit
+def test_search_after_write_reads_own_writes(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    client.script_hits(settings.milvus_collection_name, TOKEN_HITS)
+    monkeypatch.setattr(settings, "milvus_consistency_level", "Eventually")
+
+    service._record_write()
+    service.search_pages(torch.randn(3, 128))
+
+    assert client.consistency_levels == ["Session"]
+
+
+@pytest.mark.unit
+def test_unknown_consistency_level(monkeypatch):
+    monkeypatch.setattr(settings, "milvus_consistency_level", "Sometimes")
+
+    with pytest.raises(ValueError, match="Unknown Milvus consistency level"):
+        MilvusService()._read_consistency_level()
+
+
+@pytest.mark.unit
+def test_binary_mode_stores_packed_bits_and_rescores_with_float_vectors(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    monkeypatch.setattr(settings, "milvus_vector_type", "binary")
+    monkeypatch.setattr(settings, "milvus_binary_rescore_candidates", 5)
+    generator = torch.Generator().manual_seed(0)
+    pages = [(page, torch.randn(30, 128, generator=generator)) for page in range(1, 21)]
+
+    service.insert_pages("doc", pages)
+
+    assert all(len(row["embedding"]) == 16 for row in client.inserted[settings.milvus_collection_name])
+    assert np.array_equal(service.get_page_embeddings([("doc", 7)])[("doc", 7)], pages[6][1].numpy())
+
+    query = pages[6][1][:8] + 0.3 * torch.randn(8, 128, generator=generator)
+    results = service.search_pages(query, top_k=3)
+
+    exact = (query @ pages[6][1].T).max(dim=1).values.sum().item()
+    assert (results[0]["doc_id"], results[0]["page_number"]) == ("doc", 7)
+    assert results[0]["score"] == pytest.approx(exact, rel=1e-5)
+
+
+@pytest.mark.unit
+def test_binary_mode_delete_removes_side_store_vectors(fake_milvus, monkeypatch):
+    service, _, store = fake_milvus
+    monkeypatch.setattr(settings, "milvus_vector_type", "binary")
+    service.insert_pages("doc", [(1, torch.randn(4, 128)), (2, torch.randn(4, 128))])
+
+    service.delete_document("doc", except_pages={2})
+
+    assert set(store.get_pages([("doc", 1), ("doc", 2)])) == {("doc", 2)}
+
+
+@pytest.mark.unit
+def test_unknown_vector_type(monkeypatch):
+    monkeypatch.setattr(settings, "milvus_vector_type", "int4")
+
+    with pytest.raises(ValueError, match="Unknown Milvus vector type"):
+        _ = MilvusService().binary_vectors
+
+
+@pytest.mark.unit
+def test_page_summaries_written_with_patches(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    monkeypatch.setattr(settings, "milvus_page_summary_enabled", True)
+    monkeypatch.setattr(settings, "milvus_page_summary_vectors", 4)
+
+    service.insert_pages("doc", [(1, torch.randn(30, 128)), (2, torch.randn(3, 128))])
+
+    summaries = client.inserted[service.summary_collection_name]
+    assert sum(row["page_number"] == 1 for row in summaries) <= 4
+    assert sum(row["page_number"] == 2 for row in summaries) == 3
+    assert len(client.inserted[settings.milvus_collection_name]) == 33
+
+
+@pytest.mark.unit
+def test_coarse_stage_restricts_patch_search_to_candidate_pages(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    monkeypatch.setattr(settings, "milvus_page_summary_enabled", True)
+    monkeypatch.setattr(settings, "milvus_page_summary_candidates", 1)
+    client.script_hits(
+        service.summary_collection_name, [[_hit("doc_a", 2, 0.9), _hit("doc_b", 5, 0.4), _hit("doc_a", 2, 0.8)]] * 3
+    )
+    client.script_hits(settings.milvus_collection_name, [[_hit("doc_a", 2, 0.7), _hit("doc_b", 5, 0.6)]] * 3)
+
+    results = service.search_pages(torch.randn(3, 128), top_k=5, doc_id_filter="doc_a")
+
+    searches = [(collection_name, filter) for collection_name, _, filter in client.search_calls]
+    assert searches == [
+        (service.summary_collection_name, 'doc_id == "doc_a"'),
+        (settings.milvus_collection_name, '(doc_id == "doc_a" and page_number in [2])'),
+    ]
+    assert results[0]["page_number"] == 2
+
+
+@pytest.mark.unit
+def test_created_collection_uses_configured_vector_type(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    monkeypatch.setattr(settings, "milvus_vector_type", "binary")
+
+    service._ensure_collection()
+
+    fields = client.describe_collection(settings.milvus_collection_name)["fields"]
+    assert next(field["type"] for field in fields if field["name"] == "embedding") == DataType.BINARY_VECTOR
+
+
+@pytest.mark.unit
+def test_existing_collection_with_other_vector_type_is_rejected(fake_milvus, monkeypatch):
+    service, client, store = fake_milvus
+    service._ensure_collection()
+
+    monkeypatch.setattr(settings, "milvus_vector_type", "binary")
+    restarted = MilvusService(vector_store=store)
+    monkeypatch.setattr(restarted, "_get_client", lambda: client)
+
+    with pytest.raises(ValueError, match="stores FLOAT_VECTOR embeddings"):
+        restarted.insert_pages("doc", [(1, torch.randn(4, 128))])
+    assert client.batches == []
+
+
+@pytest.mark.unit
+def test_created_collections_use_configured_consistency_level(fake_milvus, monkeypatch):
+    service, client, _ = fake_milvus
+    monkeypatch.setattr(settings, "milvus_consistency_level", "Eventually")
+    monkeypatch.setattr(settings, "milvus_page_summary_enabled", True)
+
+    service._ensure_collection()
+
+    for name in (settings.milvus_collection_name, service.summary_collection_name):
+        assert client.describe_collection(name)["consistency_level"] == "Eventually"
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.services.patch_vector_store import PatchVectorStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PatchVectorStore(tmp_path / "patch_vectors.db")
+    yield store
+    store.close()
+
+
+@pytest.mark.unit
+def test_pages_round_trip_at_full_precision(store):
+    vectors = np.random.default_rng(0).standard_normal((5, 128)).astype(np.float32)
+    store.add_pages("doc", [(1, vectors), (2, vectors[:2])])
+
+    pages = store.get_pages([("doc", 1), ("doc", 2), ("doc", 3), ("other", 1)])
+
+    assert set(pages) == {("doc", 1), ("doc", 2)}
+    assert np.array_equal(pages[("doc", 1)], vectors)
+    assert pages[("doc", 2)].shape == (2, 128)
+
+
+@pytest.mark.unit
+def test_remove_document_keeps_excepted_pages(store):
+    vectors = np.ones((2, 128), dtype=np.float32)
+    store.add_pages("doc", [(1, vectors), (2, vectors), (3, vectors)])
+
+    assert store.remove_document("doc", except_pages={2}) == 2
+    assert set(store.get_pages([("doc", 1), ("doc", 2), ("doc", 3)])) == {("doc", 2)}
+    assert store.remove_document("doc") == 1
@@ -1,14 +1,24 @@
+import io
+import multiprocessing
 import tempfile
 from pathlib import Path
 
+import numpy as np
+import pymupdf
 import pytest
 from PIL import Image
 
+from src.core.config import settings
+from src.services import pdf_processor
 from src.services.pdf_processor import (
+    PdfRenderPool,
+    _page_chunks,
     convert_pdf_to_images,
     convert_pdf_to_images_parallel,
     generate_doc_id,
+    iter_pdf_pages,
     process_pdf_document,
+    render_pdf_page,
     save_images,
     save_pdf_document,
 )
@@ -202,3 +212,144 @@ def test_process_pdf_document_without_saving(colpali_pdf, tmp_path):
     assert pdf_path is None
     assert len(image_paths) == 0
     assert len(images) > 0
+
+
+@pytest.fixture
+def drawn_pdf(tmp_path):
+    pdf_path = tmp_path / "drawn.pdf"
+    document = pymupdf.open()
+    page = document.new_page(width=200, height=100)
+    page.draw_rect(pymupdf.Rect(10, 10, 90, 60), color=(1, 0, 0), fill=(0, 0.5, 1))
+    page.insert_text((20, 85), "raster", color=(0, 0, 0))
+    document.save(pdf_path)
+    document.close()
+    return pdf_path
+
+
+def test_render_matches_png_round_trip(drawn_pdf):
+    image = render_pdf_page(drawn_pdf, 1, dpi=150)
+
+    document = pymupdf.open(drawn_pdf)
+    zoom = 150 / 72
+    pix = document[0].get_pixmap(matrix=pymupdf.Matrix(zoom, zoom))
+    expected = Image.open(io.BytesIO(pix.tobytes("png"))).convert("RGB")
+    document.close()
+
+    assert image.mode == "RGB"
+    assert image.size == expected.size
+    assert np.array_equal(np.asarray(image), np.asarray(expected))
+
+
+@pytest.fixture
+def multipage_pdf(tmp_path):
+    pdf_path = tmp_path / "multipage.pdf"
+    document = pymupdf.open()
+    for i in range(7):
+        page = document.new_page(width=144, height=144)
+        page.draw_rect(pymupdf.Rect(10, 10, 20 + i * 10, 60), fill=(i / 7, 0.2, 0.8))
+    document.save(pdf_path)
+    document.close()
+    return pdf_path
+
+
+def test_page_chunks_are_contiguous_ranges():
+    chunks = _page_chunks(list(range(1, 11)), workers=3, max_chunk_pages=8)
+
+    assert chunks == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert _page_chunks(list(range(1, 11)), workers=1, max_chunk_pages=4)[0] == [1, 2, 3, 4]
+    assert _page_chunks([], workers=4, max_chunk_pages=8) == []
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_parallel_backends_match_serial_render(multipage_pdf, backend):
+    expected = convert_pdf_to_images(multipage_pdf, dpi=72)
+
+    results = convert_pdf_to_images_parallel(multipage_pdf, dpi=72, max_workers=2, backend=backend)
+
+    assert [page for page, _ in results] == list(range(1, 8))
+    for (_, image), (_, expected_image) in zip(results, expected, strict=True):
+        assert np.array_equal(np.asarray(image), np.asarray(expected_image))
+
+
+def test_render_pool_is_reusable_across_documents(multipage_pdf, drawn_pdf):
+    pool = PdfRenderPool(processes=2, chunk_pages=2)
+    try:
+        first = pool.render(multipage_pdf, 72, [1, 2, 3])
+        second = pool.render(drawn_pdf, 72, [1])
+    finally:
+        pool.shutdown()
+
+    assert [page for page, _ in first] == [1, 2, 3]
+    assert second[0][1].size == render_pdf_page(drawn_pdf, 1, dpi=72).size
+
+
+def test_render_workers_start_from_forkserver():
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        pytest.skip("forkserver start method is not available")
+
+    assert pdf_processor._render_context().get_start_method() == "forkserver"
+
+
+def test_render_pool_propagates_worker_errors(multipage_pdf):
+    pool = PdfRenderPool(processes=2, chunk_pages=2)
+    try:
+        with pytest.raises(IndexError):
+            pool.render(multipage_pdf, 72, [1, 2, 99])
+    finally:
+        pool.shutdown()
+
+
+def test_iter_pdf_pages_is_lazy(multipage_pdf, monkeypatch):
+    rendered = []
+    original = pdf_processor._rasterize_page
+
+    def tracking_rasterize(page, matrix):
+        rendered.append(page.number + 1)
+        return original(page, matrix)
+
+    monkeypatch.setattr(pdf_processor, "_rasterize_page", tracking_rasterize)
+
+    pages = iter_pdf_pages(multipage_pdf, dpi=72, backend="thread")
+    assert rendered == []
+
+    first_page, first_image = next(pages)
+    pages.close()
+
+    assert first_page == 1
+    assert first_image.mode == "RGB"
+    assert rendered == [1]
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_iter_pdf_pages_respects_page_limits(multipage_pdf, monkeypatch, workers, backend):
+    monkeypatch.setattr(settings, "pdf_max_pages", 5)
+
+    pages = iter_pdf_pages(multipage_pdf, dpi=72, workers=workers, backend=backend)
+    assert [page for page, _ in pages] == [1, 2, 3, 4, 5]
+    pages = iter_pdf_pages(multipage_pdf, dpi=72, max_pages=2, workers=workers, backend=backend)
+    assert [page for page, _ in pages] == [1, 2]
+
+
+def test_iter_pdf_pages_renders_through_process_pool(multipage_pdf, monkeypatch):
+    monkeypatch.setattr(pdf_processor, "_pdf_render_pool", PdfRenderPool(processes=2, chunk_pages=2))
+    expected = dict(convert_pdf_to_images(multipage_pdf, dpi=72))
+
+    try:
+        pages = iter_pdf_pages(multipage_pdf, dpi=72, workers=2, skip_pages={2, 5}, backend="process")
+        results = list(pages)
+
+        partial = iter_pdf_pages(multipage_pdf, dpi=72, workers=2, backend="process")
+        assert next(partial)[0] == 1
+        partial.close()
+    finally:
+        pdf_processor.get_pdf_render_pool().shutdown()
+
+    assert [page for page, _ in results] == [1, 3, 4, 6, 7]
+    for page, image in results:
+        assert np.array_equal(np.asarray(image), np.asarray(expected[page]))
+
+
+def test_convert_pdf_to_images_applies_max_pages(multipage_pdf):
+    assert len(convert_pdf_to_images(multipage_pdf, dpi=72, max_pages=3)) == 3
+    assert len(convert_pdf_to_images_parallel(multipage_pdf, dpi=72, backend="thread", max_pages=3)) == 3
@@ -0,0 +1,169 @@
+import pytest
+import torch
+import torch.nn.functional as F
+
+from src.core.config import settings
+from src.services.plaid_index import PlaidIndexService, ResidualCodec
+
+
+@pytest.fixture
+def plaid_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "plaid_num_centroids", 16)
+    monkeypatch.setattr(settings, "plaid_train_min_patches", 200)
+    monkeypatch.setattr(settings, "plaid_nprobe", 4)
+    return PlaidIndexService(index_dir=tmp_path)
+
+
+@pytest.fixture
+def page_embeddings():
+    generator = torch.Generator().manual_seed(42)
+    return [F.normalize(torch.randn(50, 128, generator=generator), dim=-1) for _ in range(6)]
+
+
+def _insert_pages(index, page_embeddings, doc_id="doc_a"):
+    for page_number, embeddings in enumerate(page_embeddings, start=1):
+        index.insert_page_embeddings(doc_id, page_number, embeddings)
+
+
+@pytest.mark.unit
+def test_residual_codec_roundtrip(page_embeddings):
+    vectors = torch.cat(page_embeddings).numpy()
+    codec = ResidualCodec.train(vectors, num_centroids=16, nbits=2)
+
+    codes, packed = codec.compress(vectors)
+    restored = codec.decompress(codes, packed)
+
+    assert packed.shape == (len(vectors), 32)
+    cosine = (restored * vectors).sum(axis=1)
+    assert cosine.mean() > 0.5
+
+
+@pytest.mark.unit
+def test_search_pending_pages_is_exact(plaid_index, page_embeddings):
+    _insert_pages(plaid_index, page_embeddings[:2])
+
+    results = plaid_index.search_pages(page_embeddings[1][:5], top_k=1)
+
+    assert plaid_index.get_collection_stats()["trained"] is False
+    assert results[0]["page_number"] == 2
+    assert results[0]["score"] == pytest.approx(5.0, rel=1e-2)
+
+
+@pytest.mark.unit
+def test_search_after_training_finds_page(plaid_index, page_embeddings):
+    _insert_pages(plaid_index, page_embeddings)
+
+    results = plaid_index.search_pages(page_embeddings[3][:8], top_k=3)
+
+    assert plaid_index.get_collection_stats()["trained"] is True
+    assert results[0] == {"doc_id": "doc_a", "page_number": 4, "score": pytest.approx(results[0]["score"])}
+
+
+@pytest.mark.unit
+def test_index_persists_across_instances(plaid_index, page_embeddings, tmp_path):
+    _insert_pages(plaid_index, page_embeddings)
+
+    reopened = PlaidIndexService(index_dir=tmp_path)
+
+    assert reopened.document_exists("doc_a")
+    assert reopened.get_collection_stats()["row_count"] == 300
+
+
+@pytest.mark.unit
+def test_delete_document(plaid_index, page_embeddings):
+    _insert_pages(plaid_index, page_embeddings[:3], doc_id="doc_a")
+    _insert_pages(plaid_index, page_embeddings[3:], doc_id="doc_b")
+
+    delete_count = plaid_index.delete_document("doc_a")
+    results = plaid_index.search_pages(page_embeddings[0][:5], top_k=10)
+
+    assert delete_count == 150
+    assert not plaid_index.document_exists("doc_a")
+    assert all(r["doc_id"] == "doc_b" for r in results)
+
+
+@pytest.mark.unit
+def test_delete_document_keeps_excepted_pages(plaid_index, page_embeddings):
+    _insert_pages(plaid_index, page_embeddings[:3], doc_id="doc_a")
+
+    delete_count = plaid_index.delete_document("doc_a", except_pages={1, 2})
+
+    assert delete_count == 50
+    assert plaid_index.document_exists("doc_a")
+    assert plaid_index.delete_document("doc_a") == 100
+
+
+@pytest.mark.unit
+def test_delete_compacts_storage_and_search_rows(plaid_index, page_embeddings, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "plaid_compact_dead_ratio", 0.25)
+    _insert_pages(plaid_index, page_embeddings[:3], doc_id="doc_a")
+    _insert_pages(plaid_index, page_embeddings[3:], doc_id="doc_b")
+    before = plaid_index.get_collection_stats()
+    expected = plaid_index.search_pages(page_embeddings[4][:8], top_k=3, doc_id_filter="doc_b")
+
+    plaid_index.delete_document("doc_a")
+    after = plaid_index.get_collection_stats()
+
+    assert after["index_bytes"] == before["index_bytes"] // 2
+    assert after["dead_row_count"] == 0
+    assert len(plaid_index._codes()) == 150
+    assert plaid_index._get_inverted_lists().covered_slots == 3
+    assert plaid_index.search_pages(page_embeddings[4][:8], top_k=3) == expected
+
+    reopened = PlaidIndexService(index_dir=tmp_path)
+    assert reopened.get_collection_stats()["row_count"] == 150
+    assert reopened.search_pages(page_embeddings[4][:8], top_k=3) == expected
+
+
+@pytest.mark.unit
+def test_compact_on_demand(plaid_index, page_embeddings, monkeypatch):
+    monkeypatch.setattr(settings, "plaid_compact_dead_ratio", 0.0)
+    _insert_pages(plaid_index, page_embeddings[:2], doc_id="doc_a")
+    bytes_before = plaid_index.get_collection_stats()["index_bytes"]
+
+    plaid_index.delete_document("doc_a", except_pages={2})
+
+    assert plaid_index.get_collection_stats()["index_bytes"] == bytes_before
+    assert plaid_index.compact() == 50
+    assert plaid_index.compact() == 0
+
+    stats = plaid_index.get_collection_stats()
+    assert stats["index_bytes"] == bytes_before // 2
+    assert stats["dead_row_count"] == 0
+    results = plaid_index.search_pages(page_embeddings[1][:5], top_k=1)
+    assert results[0]["page_number"] == 2
+    assert results[0]["score"] == pytest.approx(5.0, rel=1e-2)
+
+
+@pytest.mark.unit
+def test_filtered_search_ranks_pages_outside_probed_centroids(plaid_index, page_embeddings, monkeypatch):
+    monkeypatch.setattr(settings, "plaid_nprobe", 1)
+    monkeypatch.setattr(settings, "plaid_candidate_pages", 2)
+    _insert_pages(plaid_index, page_embeddings[:4], doc_id="doc_a")
+    direction = F.normalize(-page_embeddings[0][:5].sum(dim=0), dim=0)
+    generator = torch.Generator().manual_seed(7)
+    clustered = [F.normalize(direction + 0.01 * torch.randn(50, 128, generator=generator), dim=-1) for _ in range(5)]
+    _insert_pages(plaid_index, clustered, doc_id="doc_b")
+
+    query = page_embeddings[0][:5]
+    probed = (query @ torch.from_numpy(plaid_index._codec.centroids).T).topk(1, dim=1).indices.unique().numpy()
+    doc_b_slots = {slot for slot, page in enumerate(plaid_index._pages) if page["doc_id"] == "doc_b"}
+    assert not doc_b_slots & set(plaid_index._get_inverted_lists().lookup(probed).tolist())
+
+    results = plaid_index.search_pages(query, top_k=2, doc_id_filter="doc_b")
+
+    assert len(results) == 2
+    assert all(result["doc_id"] == "doc_b" for result in results)
+
+
+@pytest.mark.unit
+def test_inverted_lists_cover_pages_inserted_after_training(plaid_index, page_embeddings, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "plaid_candidate_pages", 2)
+    _insert_pages(plaid_index, page_embeddings)
+
+    assert plaid_index._get_inverted_lists().covered_slots == 4
+    expected = plaid_index.search_pages(page_embeddings[5][:8], top_k=1)
+    reopened = PlaidIndexService(index_dir=tmp_path)
+
+    assert expected[0]["page_number"] == 6
+    assert reopened.search_pages(page_embeddings[5][:8], top_k=1) == expected
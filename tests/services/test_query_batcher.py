@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+import torch
+
+from src.services.query_batcher import QueryBatcher
+
+
+class RecordingEncoder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, queries):
+        self.batches.append(list(queries))
+        return [torch.full((1, len(query), 128), float(len(query))) for query in queries]
+
+
+@pytest.fixture
+def encoder():
+    return RecordingEncoder()
+
+
+@pytest.mark.unit
+def test_concurrent_queries_share_a_batch(encoder):
+    batcher = QueryBatcher(encode_batch=encoder, window_ms=200, max_batch_size=8)
+    queries = ["a", "bb", "ccc", "dddd"]
+    results = {}
+    barrier = threading.Barrier(len(queries))
+
+    def worker(query):
+        barrier.wait()
+        results[query] = batcher.encode(query, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(q,)) for q in queries]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert sum(len(batch) for batch in encoder.batches) == 4
+    assert len(encoder.batches) < 4
+    for query in queries:
+        assert results[query].shape == (1, len(query), 128)
+        assert results[query][0, 0, 0].item() == len(query)
+
+
+@pytest.mark.unit
+def test_batch_size_is_capped(encoder):
+    batcher = QueryBatcher(encode_batch=encoder, window_ms=100, max_batch_size=2)
+    futures = [batcher.submit(q) for q in ["a", "b", "c", "d", "e"]]
+
+    for future in futures:
+        future.result(timeout=5)
+    batcher.close()
+
+    assert all(len(batch) <= 2 for batch in encoder.batches)
+
+
+@pytest.mark.unit
+def test_encoder_error_propagates_to_callers():
+    def failing_encoder(queries):
+        raise RuntimeError("model failed")
+
+    batcher = QueryBatcher(encode_batch=failing_encoder, window_ms=0, max_batch_size=4)
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.encode("query", timeout=5)
+    batcher.close()
+
+
+@pytest.mark.unit
+def test_invalid_batch_size():
+    with pytest.raises(ValueError, match="Batch size must be positive"):
+        QueryBatcher(encode_batch=RecordingEncoder(), window_ms=5, max_batch_size=0)
@@ -1,8 +1,19 @@
+import base64
+import io
+
 import httpx
 import pytest
 from PIL import Image
 
-from src.services.generation_service import GenerationService, get_generation_service
+import src.services.generation_service as generation_module
+from src.core.config import settings
+from src.services.generation_service import (
+    GenerationService,
+    PageImage,
+    get_generation_service,
+    get_page_payload_cache,
+    invalidate_page_payloads,
+)
 
 
 def is_ollama_available() -> bool:
@@ -59,3 +70,116 @@ def test_get_generation_service_singleton() -> None:
     service1 = get_generation_service()
     service2 = get_generation_service()
     assert service1 is service2
+
+
+class TestPagePayloadCache:
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(generation_module, "_page_payload_cache", None)
+
+    @pytest.fixture
+    def page(self, tmp_path) -> PageImage:
+        path = tmp_path / "page_01.png"
+        Image.new("RGB", (400, 200), color="white").save(path, format="PNG")
+        return PageImage(doc_id="doc", page_number=1, path=path)
+
+    @pytest.mark.asyncio
+    async def test_png_pages_sent_without_recompression(self, page: PageImage) -> None:
+        payload = await GenerationService()._page_payload(page)
+
+        assert base64.b64decode(payload) == page.path.read_bytes()
+
+    @pytest.mark.asyncio
+    async def test_repeated_pages_served_from_cache(self, page: PageImage) -> None:
+        service = GenerationService()
+        first = await service._page_payload(page)
+        page.path.unlink()
+
+        assert await service._page_payload(page) == first
+        assert get_page_payload_cache().stats().hits == 1
+
+    @pytest.mark.asyncio
+    async def test_resized_payload_keyed_by_size_and_format(self, page: PageImage, monkeypatch) -> None:
+        service = GenerationService()
+        original = await service._page_payload(page)
+        monkeypatch.setattr(settings, "vlm_image_max_size", 100)
+        monkeypatch.setattr(settings, "vlm_image_format", "jpeg")
+
+        resized = await service._page_payload(page)
+
+        image = Image.open(io.BytesIO(base64.b64decode(resized)))
+        assert resized != original
+        assert image.format == "JPEG"
+        assert image.size == (100, 50)
+        assert get_page_payload_cache().stats().entries == 2
+
+    @pytest.mark.asyncio
+    async def test_deleted_document_payloads_invalidated(self, page: PageImage) -> None:
+        await GenerationService()._page_payload(page)
+
+        assert invalidate_page_payloads("other") == 0
+        assert invalidate_page_payloads("doc") == 1
+        assert get_page_payload_cache().stats().entries == 0
+
+
+class ClosableStream(httpx.AsyncByteStream):
+    def __init__(self, lines: list[str]) -> None:
+        self.lines = lines
+        self.closed = False
+
+    async def __aiter__(self):
+        for line in self.lines:
+            yield (line + "\n").encode()
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class TestStreamAnswer:
+    @pytest.fixture
+    def sample_image(self) -> Image.Image:
+        return Image.new("RGB", (10, 10), color="white")
+
+    def _service(self, stream: ClosableStream, requests: list) -> GenerationService:
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, stream=stream)
+
+        service = GenerationService()
+        service._client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+        return service
+
+    @pytest.mark.unit
+    async def test_tokens_relayed_as_emitted(self, sample_image: Image.Image) -> None:
+        lines = [
+            '{"response": "Hel", "done": false}',
+            "",
+            '{"response": "lo", "done": false}',
+            '{"response": "", "done": true}',
+        ]
+        requests = []
+        service = self._service(ClosableStream(lines), requests)
+
+        tokens = [token async for token in service.stream_answer("Hi?", [sample_image])]
+
+        assert tokens == ["Hel", "lo"]
+        assert requests[0].url.path == "/api/generate"
+        assert b'"stream":true' in requests[0].content.replace(b" ", b"")
+
+    @pytest.mark.unit
+    async def test_closing_stream_closes_upstream_response(self, sample_image: Image.Image) -> None:
+        stream = ClosableStream([f'{{"response": "t{i}", "done": false}}' for i in range(100)])
+        service = self._service(stream, [])
+
+        tokens = service.stream_answer("Hi?", [sample_image])
+        assert await tokens.__anext__() == "t0"
+        await tokens.aclose()
+
+        assert stream.closed
+
+    @pytest.mark.unit
+    async def test_ollama_stream_error_raises(self, sample_image: Image.Image) -> None:
+        service = self._service(ClosableStream(['{"error": "model not found"}']), [])
+
+        with pytest.raises(RuntimeError, match="model not found"):
+            _ = [token async for token in service.stream_answer("Hi?", [sample_image])]
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.core.inference_executor import InferenceExecutor, InferenceQueueFullError
+
+
+@pytest.mark.unit
+async def test_run_executes_off_event_loop():
+    executor = InferenceExecutor(max_concurrency=1, max_queue_size=0, queue_timeout_seconds=1.0)
+    loop_thread = threading.get_ident()
+
+    worker_thread = await executor.run(threading.get_ident)
+
+    assert worker_thread != loop_thread
+    executor.shutdown()
+
+
+@pytest.mark.unit
+async def test_run_passes_arguments():
+    executor = InferenceExecutor(max_concurrency=2, max_queue_size=0, queue_timeout_seconds=1.0)
+
+    result = await executor.run(lambda a, b=0: a + b, 2, b=3)
+
+    assert result == 5
+    executor.shutdown()
+
+
+@pytest.mark.unit
+async def test_full_queue_rejects_immediately_without_timeout():
+    executor = InferenceExecutor(max_concurrency=1, max_queue_size=0, queue_timeout_seconds=0)
+    release = threading.Event()
+
+    running = asyncio.create_task(executor.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(InferenceQueueFullError):
+        await executor.run(lambda: None)
+
+    release.set()
+    await running
+    executor.shutdown()
+
+
+@pytest.mark.unit
+async def test_full_queue_waits_then_times_out():
+    executor = InferenceExecutor(max_concurrency=1, max_queue_size=0, queue_timeout_seconds=0.05)
+    release = threading.Event()
+
+    running = asyncio.create_task(executor.run(release.wait))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(InferenceQueueFullError, match="waited"):
+        await executor.run(lambda: None)
+
+    release.set()
+    await running
+    executor.shutdown()
+
+
+@pytest.mark.unit
+async def test_event_loop_stays_responsive():
+    executor = InferenceExecutor(max_concurrency=1, max_queue_size=1, queue_timeout_seconds=1.0)
+    release = threading.Event()
+
+    running = asyncio.create_task(executor.run(release.wait))
+    await asyncio.sleep(0.01)
+    assert not running.done()
+
+    release.set()
+    assert await running is True
+    executor.shutdown()
+
+
+@pytest.mark.unit
+async def test_worker_threads_let_admitted_calls_wait_together():
+    executor = InferenceExecutor(max_concurrency=1, max_queue_size=2, queue_timeout_seconds=1.0, worker_threads=3)
+    barrier = threading.Barrier(3, timeout=1.0)
+
+    results = await asyncio.gather(*(executor.run(barrier.wait) for _ in range(3)))
+
+    assert sorted(results) == [0, 1, 2]
+    executor.shutdown()
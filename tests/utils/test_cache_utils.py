@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from src.utils.cache_utils import ByteSizeLRUCache
+
+
+@pytest.fixture
+def cache():
+    return ByteSizeLRUCache(max_bytes=10, size_of=len)
+
+
+def test_get_missing_key_counts_miss(cache):
+    assert cache.get("missing") is None
+    assert cache.stats().misses == 1
+
+
+def test_put_and_get(cache):
+    cache.put("a", "xyz")
+
+    assert cache.get("a") == "xyz"
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.size_bytes == 3
+
+
+def test_evicts_least_recently_used_by_size(cache):
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a")
+    cache.put("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.stats().evictions == 1
+    assert cache.stats().size_bytes == 8
+
+
+def test_value_larger_than_cache_is_not_stored(cache):
+    cache.put("big", "x" * 11)
+
+    assert cache.get("big") is None
+    assert cache.stats().entries == 0
+
+
+def test_ttl_expires_entries():
+    cache = ByteSizeLRUCache(max_bytes=10, size_of=len, ttl_seconds=0.01)
+    cache.put("a", "abc")
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats().size_bytes == 0
+
+
+def test_invalidate_by_predicate(cache):
+    cache.put(("doc_a", 1), "a")
+    cache.put(("doc_a", 2), "b")
+    cache.put(("doc_b", 1), "c")
+
+    removed = cache.invalidate(lambda key: key[0] == "doc_a")
+
+    assert removed == 2
+    assert cache.get(("doc_b", 1)) == "c"
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+import torch
+import torch.nn.functional as F
+
+from src.utils.embedding_utils import (
+    binarize_embeddings,
+    hamming_to_similarity,
+    pool_patch_embeddings,
+    prune_query_tokens,
+)
+
+
+@pytest.mark.unit
+def test_binarize_packs_sign_bits():
+    embeddings = np.array([[1.0, -1.0, 0.5, 0.0, -0.2, 3.0, -4.0, 0.1] * 2], dtype=np.float32)
+
+    packed = binarize_embeddings(embeddings)
+
+    assert packed.dtype == np.uint8
+    assert packed.shape == (1, 2)
+    assert packed[0, 0] == 0b10100101
+
+
+@pytest.mark.unit
+def test_hamming_similarity_matches_sign_inner_product():
+    rng = np.random.default_rng(0)
+    a, b = rng.standard_normal((2, 128)).astype(np.float32)
+
+    distance = np.unpackbits(binarize_embeddings(a[None]) ^ binarize_embeddings(b[None])).sum()
+
+    assert hamming_to_similarity(distance, 128) == float(np.sign(a) @ np.sign(b))
+
+
+@pytest.mark.unit
+def test_binarize_rejects_unpackable_dim():
+    with pytest.raises(ValueError, match="multiple of 8"):
+        binarize_embeddings(np.ones((2, 12), dtype=np.float32))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("pool_factor", [2, 3, 4])
+def test_pooling_shrinks_patch_count(pool_factor):
+    embeddings = F.normalize(torch.randn(103, 128), dim=-1)
+
+    pooled = pool_patch_embeddings(embeddings, pool_factor)
+
+    assert 0 < pooled.shape[0] <= -(-103 // pool_factor)
+    assert torch.allclose(pooled.norm(dim=-1), torch.ones(pooled.shape[0]), atol=1e-5)
+
+
+@pytest.mark.unit
+def test_pooling_collapses_duplicate_patches():
+    torch.manual_seed(0)
+    distinct = F.normalize(torch.randn(4, 128), dim=-1)
+    embeddings = distinct.repeat_interleave(8, dim=0).to(torch.bfloat16)
+    query = F.normalize(torch.randn(6, 128), dim=-1)
+
+    pooled = pool_patch_embeddings(embeddings, 8)
+
+    assert pooled.dtype == torch.bfloat16
+    exact = (query @ embeddings.float().T).max(dim=1).values.sum()
+    approx = (query @ pooled.float().T).max(dim=1).values.sum()
+    assert approx.item() == pytest.approx(exact.item(), abs=0.05)
+
+
+@pytest.mark.unit
+def test_pool_factor_one_is_identity():
+    embeddings = torch.randn(10, 128)
+
+    assert pool_patch_embeddings(embeddings, 1) is embeddings
+
+
+@pytest.fixture
+def padded_query():
+    torch.manual_seed(0)
+    text_tokens = F.normalize(torch.randn(6, 128), dim=-1)
+    padding = F.normalize(torch.randn(1, 128), dim=-1)
+    augmentation = F.normalize(padding + 0.01 * torch.randn(10, 128), dim=-1)
+    return torch.cat([text_tokens, augmentation]).to(torch.bfloat16)
+
+
+@pytest.mark.unit
+def test_pruning_collapses_augmentation_tokens(padded_query):
+    pruned = prune_query_tokens(padded_query, max_tokens=0, similarity_threshold=0.95)
+
+    assert pruned.shape == (7, 128)
+    assert pruned.dtype == torch.bfloat16
+    assert torch.equal(pruned[:6], padded_query[:6])
+
+
+@pytest.mark.unit
+def test_pruning_caps_token_count_keeping_distinct_tokens(padded_query):
+    pruned = prune_query_tokens(padded_query, max_tokens=4, similarity_threshold=0.95)
+
+    assert pruned.shape == (4, 128)
+    assert all(any(torch.equal(row, text) for text in padded_query[:6]) for row in pruned)
+
+
+@pytest.mark.unit
+def test_pruning_threshold_above_one_keeps_all_tokens(padded_query):
+    assert prune_query_tokens(padded_query, max_tokens=0, similarity_threshold=1.1).shape == padded_query.shape
@@ -0,0 +1,48 @@
+import pytest
+import torch
+
+from src.utils.scoring_utils import maxsim_scores
+
+
+@pytest.fixture
+def query_embeddings():
+    return torch.tensor([[1.0, 0.0], [0.0, 1.0]])
+
+
+@pytest.fixture
+def doc_embeddings():
+    return torch.tensor(
+        [
+            [0.9, 0.1],
+            [0.2, 0.8],
+            [0.5, 0.5],
+            [0.0, 0.3],
+        ]
+    )
+
+
+def test_maxsim_scores_per_page(query_embeddings, doc_embeddings):
+    page_index = torch.tensor([0, 0, 1, 1])
+
+    scores = maxsim_scores(query_embeddings, doc_embeddings, page_index, num_pages=2)
+
+    assert scores.shape == (2,)
+    assert scores[0].item() == pytest.approx(0.9 + 0.8)
+    assert scores[1].item() == pytest.approx(0.5 + 0.5)
+
+
+def test_maxsim_scores_matches_loop(query_embeddings):
+    doc_embeddings = torch.randn(30, 2)
+    page_index = torch.arange(30) % 3
+
+    scores = maxsim_scores(query_embeddings, doc_embeddings, page_index, num_pages=3)
+
+    for page in range(3):
+        page_vectors = doc_embeddings[page_index == page]
+        expected = (query_embeddings @ page_vectors.T).max(dim=1).values.sum()
+        assert scores[page].item() == pytest.approx(expected.item(), rel=1e-5)
+
+
+def test_maxsim_scores_mismatched_index(query_embeddings, doc_embeddings):
+    with pytest.raises(ValueError, match="page indices"):
+        maxsim_scores(query_embeddings, doc_embeddings, torch.tensor([0, 1]), num_pages=2)
@@ -0,0 +1,52 @@
+import hashlib
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+
+from src.utils.upload_utils import UploadTooLargeError, stream_upload_to_file
+
+
+class CountingUploadFile(UploadFile):
+    def __init__(self, content: bytes):
+        super().__init__(file=BytesIO(content), filename="doc.pdf")
+        self.read_sizes = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.read_sizes.append(size)
+        return await super().read(size)
+
+
+@pytest.mark.unit
+async def test_stream_upload_hashes_while_writing(tmp_path):
+    content = bytes(range(256)) * 1000
+    upload = CountingUploadFile(content)
+    dest = tmp_path / "upload.pdf"
+
+    doc_id, size_bytes = await stream_upload_to_file(upload, dest, chunk_bytes=64 * 1024)
+
+    assert doc_id == hashlib.sha256(content).hexdigest()
+    assert size_bytes == len(content)
+    assert dest.read_bytes() == content
+    assert all(size == 64 * 1024 for size in upload.read_sizes)
+
+
+@pytest.mark.unit
+async def test_stream_upload_enforces_max_size(tmp_path):
+    upload = CountingUploadFile(b"x" * 10_000)
+    dest = tmp_path / "upload.pdf"
+
+    with pytest.raises(UploadTooLargeError, match="exceeds maximum size"):
+        await stream_upload_to_file(upload, dest, max_bytes=4096, chunk_bytes=1024)
+
+    assert not dest.exists()
+    assert len(upload.read_sizes) == 5
+
+
+@pytest.mark.unit
+async def test_stream_upload_without_limit(tmp_path):
+    upload = CountingUploadFile(b"x" * 10_000)
+
+    _, size_bytes = await stream_upload_to_file(upload, tmp_path / "upload.pdf", max_bytes=0, chunk_bytes=1024)
+
+    assert size_bytes == 10_000